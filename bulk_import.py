@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Bulk student import from an uploaded CSV or XLSX file.
+
+Rows are streamed from the upload (openpyxl read-only mode for XLSX), checked
+with the same rules as the entry form, and GR# duplicates are found in one
+pass against the GR# index and the file itself. Valid rows are then written
+with GoogleSheetsDataEntry.add_student_records(), which reserves serial
+numbers per class and appends main and class sheet rows in a few batchUpdate
+calls, so thousands of students take a handful of API requests.
+"""
+
+import io
+import os
+import re
+import csv
+from datetime import date, datetime
+from google_sheets_data_entry import HEADERS, CLASS_NAMES
+
+# Fields the entry form marks as required
+REQUIRED_FIELDS = ['GR#', 'Student Name', "Father's Name", 'Student Class', 'Religion']
+
+# Fields checked by GoogleSheetsDataEntry.validate_input()
+VALIDATED_FIELDS = ['Contact Number', 'CNIC / B-Form', "Father/Mother's CNIC", 'Guardian CNIC']
+
+CNIC_FIELDS = ['CNIC / B-Form', "Father/Mother's CNIC", 'Guardian CNIC']
+
+
+def _column_key(name):
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+# Column names accepted in the upload: the sheet headers plus the form field names
+COLUMN_ALIASES = {_column_key(header): header for header in HEADERS}
+COLUMN_ALIASES.update({
+    'grnumber': 'GR#',
+    'grno': 'GR#',
+    'fathername': "Father's Name",
+    'parentcnic': "Father/Mother's CNIC",
+    'class': 'Student Class',
+    'section': 'Class Section',
+})
+
+
+def map_columns(header_row):
+    """Sheet header for each upload column (None for columns that are ignored)"""
+    return [COLUMN_ALIASES.get(_column_key(name)) if name is not None else None for name in header_row]
+
+
+def cell_text(value):
+    """Upload cell as the string the form would have sent"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheet programs store GR numbers and phone numbers as floats
+        return str(int(value))
+    return str(value).strip()
+
+
+def _csv_rows(stream):
+    yield from csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+
+
+def _xlsx_rows(stream):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_upload_rows(stream, filename):
+    """Yield (row number, record dict) for each non-blank data row of a CSV or XLSX upload"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv':
+        rows = _csv_rows(stream)
+    elif extension in ('.xlsx', '.xlsm'):
+        rows = _xlsx_rows(stream)
+    else:
+        raise ValueError('Upload a .csv or .xlsx file')
+
+    columns = None
+    for row_number, row in enumerate(rows, start=1):
+        cells = [cell_text(value) for value in row]
+        if not any(cells):
+            continue
+        if columns is None:
+            columns = map_columns(cells)
+            if 'GR#' not in columns:
+                raise ValueError('The first row must contain column headers including GR#')
+            continue
+        record = {}
+        for field, value in zip(columns, cells):
+            if field and value:
+                record[field] = value
+        yield row_number, record
+
+
+def validate_record(data_entry, record):
+    """Problems with one record, using the entry form's rules"""
+    errors = [f'{field} is required' for field in REQUIRED_FIELDS if not record.get(field)]
+
+    student_class = record.get('Student Class')
+    if student_class and student_class not in CLASS_NAMES:
+        errors.append(f'Unknown class {student_class}')
+
+    for field in VALIDATED_FIELDS:
+        if record.get(field):
+            is_valid, message = data_entry.validate_input(field, record[field])
+            if not is_valid:
+                errors.append(message)
+
+    return errors
+
+
+def import_students(data_entry, rows, chunk_size=None, max_rows=None):
+    """Validate and add (row number, record) pairs; returns a per-row report"""
+    chunk_size = chunk_size or int(os.environ.get('BULK_IMPORT_CHUNK_ROWS', 500))
+    max_rows = max_rows or int(os.environ.get('BULK_IMPORT_MAX_ROWS', 10000))
+
+    # Catch up on GRs other workers added, so they count as duplicates
+    if data_entry.store is None:
+        if data_entry.gr_index.is_stale():
+            data_entry.rebuild_gr_index()
+        else:
+            data_entry.sync_gr_index_tail()
+
+    errors = []
+    valid = []
+    seen = {}
+    total = 0
+    for row_number, record in rows:
+        total += 1
+        if total > max_rows:
+            raise ValueError(f'Upload has more than {max_rows} rows')
+
+        row_errors = validate_record(data_entry, record)
+        gr_number = record.get('GR#', '')
+        if gr_number:
+            if gr_number in seen:
+                row_errors.append(f'GR Number {gr_number} repeats row {seen[gr_number]}')
+            elif data_entry.check_duplicate_gr(gr_number):
+                row_errors.append(f'GR Number {gr_number} already exists')
+            else:
+                seen[gr_number] = row_number
+
+        if row_errors:
+            errors.append({'row': row_number, 'gr': gr_number, 'errors': row_errors})
+            continue
+
+        for field in CNIC_FIELDS:
+            if record.get(field):
+                record[field] = data_entry.format_cnic(record[field])
+        valid.append((row_number, record))
+
+    failed = data_entry.add_student_records([record for _, record in valid], chunk_size=chunk_size) \
+        if valid else {}
+    for index, message in sorted(failed.items()):
+        row_number, record = valid[index]
+        errors.append({'row': row_number, 'gr': record.get('GR#', ''), 'errors': [f'Not saved: {message}']})
+
+    errors.sort(key=lambda error: error['row'])
+    imported = len(valid) - len(failed)
+    return {
+        'success': imported > 0 and not errors,
+        'total': total,
+        'imported': imported,
+        'failed': len(errors),
+        'errors': errors
+    }
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+TTLs, size estimates and hit/miss counters for DataCache.
+
+Cache keys fall into families: each cached payload has its own family, and
+the class_<name> rosters share one. Every family gets its own TTL. Next
+serial numbers expire quickly. The rosters, snapshot and counts are patched
+in place on writes, so their TTL only limits how long an edit made directly
+in the spreadsheet goes unseen. DataCache keeps its entries under an LRU
+byte budget and counts hits, misses and evictions per family, so TTLs can
+be tuned from /api/cache_stats instead of guessed.
+
+TTLs are overridden with CACHE_TTL_<FAMILY> (e.g. CACHE_TTL_ALL_STUDENTS=600,
+CACHE_TTL_CLASS=600); CACHE_MAX_MB sets the per-worker memory budget.
+"""
+
+import os
+import sys
+import threading
+
+# Keys cached under their own name; any other class_<name> key is a class roster
+NAMED_KEYS = ('school_snapshot', 'all_students', 'class_aggregates', 'class_wise_data', 'next_snos')
+
+ROSTER_FAMILIES = ('school_snapshot', 'all_students', 'class_aggregates', 'class_wise_data', 'class')
+
+# Roster data is patched in place by write events, so it can live much longer than the default
+ROSTER_MIN_TTL = 1800
+NEXT_SNO_TTL = 30
+
+
+def key_family(key):
+    """Family a cache key is counted and expired under"""
+    if key in NAMED_KEYS:
+        return key
+    if key.startswith('class_'):
+        return 'class'
+    return key
+
+
+def ttls_from_env(default_ttl):
+    """Per-family TTLs in seconds, derived from the configured cache duration"""
+    ttls = {family: max(default_ttl, ROSTER_MIN_TTL) for family in ROSTER_FAMILIES}
+    ttls['next_snos'] = min(default_ttl, NEXT_SNO_TTL)
+    for family in ttls:
+        override = os.environ.get(f'CACHE_TTL_{family.upper()}')
+        if override:
+            ttls[family] = int(override)
+    return ttls
+
+
+def max_bytes_from_env():
+    return int(float(os.environ.get('CACHE_MAX_MB', 64)) * 1024 * 1024)
+
+
+def estimate_size(value):
+    """Rough deep size in bytes of JSON-like data (dicts, lists, strings, numbers)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class CacheStats:
+    """Hit, miss, stale, eviction and load counters per key family"""
+
+    COUNTERS = ('hits', 'shared_hits', 'misses', 'stale', 'loads', 'load_errors', 'evictions')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.families = {}
+        self.load_seconds = {}
+
+    def record(self, key, counter, count=1):
+        family = key_family(key)
+        with self.lock:
+            counters = self.families.setdefault(family, dict.fromkeys(self.COUNTERS, 0))
+            counters[counter] += count
+
+    def record_load(self, key, seconds):
+        self.record(key, 'loads')
+        family = key_family(key)
+        with self.lock:
+            self.load_seconds[family] = self.load_seconds.get(family, 0.0) + seconds
+
+    def snapshot(self):
+        """Counters per family with hit rate and mean load time"""
+        with self.lock:
+            result = {}
+            for family, counters in self.families.items():
+                lookups = counters['hits'] + counters['shared_hits'] + counters['misses']
+                seconds = self.load_seconds.get(family, 0.0)
+                result[family] = dict(
+                    counters,
+                    hit_rate=round((counters['hits'] + counters['shared_hits']) / lookups, 3) if lookups else None,
+                    mean_load_seconds=round(seconds / counters['loads'], 3) if counters['loads'] else None
+                )
+            return result
+
+    def reset(self):
+        with self.lock:
+            self.families.clear()
+            self.load_seconds.clear()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Background cache refresher with one leader per host.
+
+The old background_sync thread ran in every worker that started it and was
+left disabled. CacheRefresher runs a thread in every worker, but only the
+one holding an exclusive, non-blocking flock on the leader file refreshes.
+The others check again every interval and take over when the leader's
+process exits (the kernel drops its lock). Each refresh gets a few attempts
+with full-jitter backoff before waiting for the next round.
+
+Like SheetsSupervisor, the thread starts lazily with ensure_started(), so a
+--preload master never holds the lock itself.
+"""
+
+import os
+import time
+import random
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process refreshes on its own
+    fcntl = None
+
+
+class CacheRefresher:
+    """Runs refresh() every `interval` seconds in whichever worker holds the leader lock"""
+
+    def __init__(self, refresh, lock_path=None, interval=300.0, max_attempts=3, initial_backoff=2.0):
+        self.refresh = refresh
+        # None means no coordination: this process always refreshes
+        self.lock_path = lock_path
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+
+        self.is_leader = False
+        self.last_refresh = None
+        self.last_duration = None
+        self.last_error = None
+        self.refreshes = 0
+        self.failures = 0
+        self._lock_file = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, refresh, lock_path=None):
+        """Build a refresher from CACHE_REFRESH_* environment variables"""
+        return cls(
+            refresh,
+            lock_path=lock_path,
+            interval=float(os.environ.get('CACHE_REFRESH_INTERVAL_SECONDS', 300)),
+            max_attempts=int(os.environ.get('CACHE_REFRESH_MAX_ATTEMPTS', 3)),
+            initial_backoff=float(os.environ.get('CACHE_REFRESH_BACKOFF_SECONDS', 2)),
+        )
+
+    def ensure_started(self):
+        """Start the refresher thread in this process if it isn't running"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            # A forked child doesn't inherit leadership
+            self.is_leader = False
+            self._lock_file = None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='cache-refresher', daemon=True)
+            self._thread.start()
+
+    def status(self):
+        return {
+            'leader': self.is_leader,
+            'pid': os.getpid(),
+            'interval': self.interval,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_refresh_seconds_ago': round(time.time() - self.last_refresh, 1) if self.last_refresh else None,
+            'last_duration': self.last_duration,
+            'last_error': self.last_error,
+        }
+
+    def _try_lead(self):
+        """Take the leader lock if it is free; keeps it for the life of the process"""
+        if self.is_leader:
+            return True
+        if self.lock_path is None or fcntl is None:
+            self.is_leader = True
+            return True
+        f = open(self.lock_path, 'a+')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        self.is_leader = True
+        print(f"✅ Cache refresher leader is pid {os.getpid()}")
+        return True
+
+    def refresh_once(self):
+        """Run refresh() with bounded, jittered retries; returns True on success"""
+        backoff = self.initial_backoff
+        for attempt in range(1, self.max_attempts + 1):
+            start = time.time()
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Cache refresh attempt {attempt}/{self.max_attempts} failed: {e}")
+                if attempt < self.max_attempts:
+                    time.sleep(random.uniform(0, backoff))
+                    backoff *= 2
+                continue
+            self.last_refresh = time.time()
+            self.last_duration = round(self.last_refresh - start, 2)
+            self.last_error = None
+            self.refreshes += 1
+            return True
+        self.failures += 1
+        return False
+
+    def _run(self):
+        while True:
+            # Spread rounds out so followers don't all probe the lock at once
+            time.sleep(self.interval * random.uniform(0.9, 1.1))
+            if self._try_lead():
+                self.refresh_once()
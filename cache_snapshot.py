@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+On-disk copy of the cached school snapshot and aggregates for warm restarts.
+
+Gunicorn recycles workers (--max-requests) and every deploy starts with an
+empty DataCache, so the first dashboard hits used to pay the full Sheets
+fan-out. The snapshot, class-wise counts and student list are written to a
+gzip-compressed JSON file (temp file + rename, so readers never see a
+partial write). A new worker loads it on boot, serves from it right away and
+revalidates against Sheets in the background.
+
+The file records a format version and a schema string (the sheet headers);
+a file from another version or schema, or older than CACHE_SNAPSHOT_MAX_AGE
+seconds, is ignored. Set CACHE_SNAPSHOT=off to disable; CACHE_SNAPSHOT_DIR
+picks the directory (use a persistent volume to survive deploys).
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+FORMAT_VERSION = 1
+
+
+class CacheSnapshot:
+    """Versioned, atomically replaced gzip JSON file of cache entries"""
+
+    def __init__(self, path, schema='', max_age=86400, save_delay=30.0):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        # Digest of whatever the cached values' shape depends on (e.g. the sheet headers)
+        self.schema = hashlib.sha1(schema.encode('utf-8')).hexdigest()[:16]
+        self.max_age = max_age
+        self.save_delay = save_delay
+        self._timer = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, key, schema=''):
+        """Snapshot file for a spreadsheet, or None when CACHE_SNAPSHOT is off"""
+        if os.environ.get('CACHE_SNAPSHOT', 'on').lower() in ('0', 'off', 'false', 'no'):
+            return None
+        digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:12]
+        directory = os.environ.get('CACHE_SNAPSHOT_DIR') or os.environ.get('SHARED_CACHE_DIR') or tempfile.gettempdir()
+        return cls(
+            os.path.join(directory, f'cache_snapshot_{digest}.json.gz'),
+            schema=schema,
+            max_age=float(os.environ.get('CACHE_SNAPSHOT_MAX_AGE', 86400)),
+            save_delay=float(os.environ.get('CACHE_SNAPSHOT_SAVE_DELAY', 30))
+        )
+
+    def load(self):
+        """(entries, saved_at) from the file, or None if it is missing, stale or from another version"""
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable cache snapshot {self.path}: {e}")
+            return None
+
+        if payload.get('version') != FORMAT_VERSION or payload.get('schema') != self.schema:
+            print("⚠️ Ignoring cache snapshot from another version")
+            return None
+        saved_at = payload.get('saved_at', 0)
+        if time.time() - saved_at > self.max_age:
+            return None
+        return payload.get('entries') or {}, saved_at
+
+    def save(self, entries):
+        """Write entries atomically; returns False if nothing was written"""
+        entries = {key: value for key, value in entries.items() if value is not None}
+        if not entries:
+            return False
+        payload = {'version': FORMAT_VERSION, 'schema': self.schema, 'saved_at': time.time(), 'entries': entries}
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix='.cache_snapshot_', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as f:
+                    f.write(json.dumps(payload).encode('utf-8'))
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Cache snapshot write failed: {e}")
+            return False
+        return True
+
+    def save_later(self, collect):
+        """Save collect() after save_delay seconds, coalescing the writes made meanwhile"""
+        with self._lock:
+            if self._timer is not None:
+                return
+
+            def run():
+                with self._lock:
+                    self._timer = None
+                self.save(collect())
+
+            self._timer = threading.Timer(self.save_delay, run)
+            self._timer.daemon = True
+            self._timer.start()
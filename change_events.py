@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Typed change events for student rows.
+
+Every write (add, edit, delete) tells GoogleSheetsDataEntry's change
+listeners exactly which class sheet row changed, so caches can patch their
+copies of the roster and counts instead of being cleared and refetched.
+"""
+
+ADDED = 'added'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+
+class StudentChange:
+    """A student row added to, rewritten in or deleted from a class sheet.
+
+    values maps header -> cell value for added and updated rows. row_number
+    is None for appends the write's reply couldn't place; consumers drop
+    whatever depends on it rather than guess. old_values is the row before
+    an update or delete, when a consumer has it.
+    """
+
+    def __init__(self, kind, sheet_name, row_number=None, values=None, old_values=None):
+        self.kind = kind
+        self.sheet_name = sheet_name
+        self.row_number = row_number
+        self.values = values or {}
+        self.old_values = old_values
+
+    @property
+    def class_name(self):
+        return self.sheet_name[len('Class_'):] if self.sheet_name.startswith('Class_') else None
+
+    def __repr__(self):
+        return f"StudentChange({self.kind}, {self.sheet_name}, row {self.row_number})"
+
+
+def is_class_sheet(sheet_name):
+    """Caches are built from the class sheets; the main sheet (408070227) mirrors them"""
+    return str(sheet_name).startswith('Class_')
+
+
+def deletion_events(locations):
+    """DELETED events for class sheet rows, bottom-up per sheet so row numbers stay valid in order"""
+    return [StudentChange(DELETED, sheet_name, row_number)
+            for sheet_name, row_number in sorted(locations, key=lambda loc: (loc[0], -loc[1]))
+            if is_class_sheet(sheet_name)]
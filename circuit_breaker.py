@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker for Google Sheets API calls.
+
+During a Sheets outage every request would otherwise spend its full retry
+budget before failing, tying up Gunicorn workers until they time out. After
+enough consecutive failures the breaker opens and calls fail immediately
+with CircuitOpenError. Once the reset timeout passes, one trial call is let
+through (half-open); its result closes the breaker or opens it again.
+"""
+
+import os
+import time
+import threading
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Sheets calls are short-circuited until the breaker resets"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker shared by the threads of one process"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, name='sheets'):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a breaker from SHEETS_CIRCUIT_* environment variables"""
+        return cls(
+            failure_threshold=int(os.environ.get('SHEETS_CIRCUIT_FAILURES', 5)),
+            reset_timeout=float(os.environ.get('SHEETS_CIRCUIT_RESET_SECONDS', 30)),
+        )
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            retry_in = max(0.0, self.reset_timeout - (time.time() - self.opened_at))
+            raise CircuitOpenError(
+                f"Google Sheets circuit is open after {self.failures} failures; retry in {retry_in:.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"✅ {self.name} circuit closed")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"⚠️ {self.name} circuit opened after {self.failures} consecutive failures")
+                self.state = OPEN
+                self.opened_at = time.time()
+                self._trial_in_flight = False
+
+    def is_open(self):
+        """True while calls are being short-circuited"""
+        with self._lock:
+            return self.state == OPEN and time.time() - self.opened_at < self.reset_timeout
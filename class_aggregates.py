@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Per-class student counts kept up to date by write events.
+
+The class-wise overview, class dashboard and class report used to count
+students by scanning (and often re-fetching) the class sheets on every
+request. The aggregates are built once from the school snapshot and then
+adjusted by the added / updated / deleted rows in each write's change
+events, so every dashboard and report is a dictionary lookup.
+
+Each class keeps:
+  total      students listed (rows with a Class_S.No)
+  male       rows whose Gender is exactly male / female, as the class-wise
+  female     overview and class dashboard have always counted them
+  gender     {'Male', 'Female'} for the class report (listed students; boy/girl accepted)
+  sections   listed students per Class Section
+  ages       listed students per age band, from Date of Birth
+  max_sno    highest Class_S.No number seen (only raised by events, like next_sno)
+
+Age bands depend on today's date, so aggregates record the day they were
+built and callers rebuild them once it changes.
+"""
+
+from datetime import date, datetime
+from serial_allocator import max_class_serial, parse_class_serial
+from change_events import ADDED, DELETED
+
+DATE_FORMATS = ['%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%m/%d/%Y']
+
+
+def age_band(date_of_birth, today=None):
+    """'0-5', '6-10', '11-15' or '16+' for a Date of Birth in a supported format, else None"""
+    text = str(date_of_birth or '').strip()
+    if not text:
+        return None
+    today = today or date.today()
+    for date_format in DATE_FORMATS:
+        try:
+            birth_date = datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+        age = today.year - birth_date.year
+        if (today.month, today.day) < (birth_date.month, birth_date.day):
+            age -= 1
+        if age <= 5:
+            return '0-5'
+        if age <= 10:
+            return '6-10'
+        if age <= 15:
+            return '11-15'
+        return '16+'
+    return None
+
+
+def empty_counts():
+    return {'total': 0, 'male': 0, 'female': 0, 'gender': {'Male': 0, 'Female': 0},
+            'sections': {}, 'ages': {}, 'max_sno': 0}
+
+
+def _bump(bucket, key, sign):
+    count = bucket.get(key, 0) + sign
+    if count > 0:
+        bucket[key] = count
+    else:
+        bucket.pop(key, None)
+
+
+def count_student(counts, values, sign=1, today=None):
+    """Add (sign=1) or remove (sign=-1) one row, given as header -> value, from a class's counts"""
+    gender = str(values.get('Gender', '') or '').strip().lower()
+    if gender == 'male':
+        counts['male'] += sign
+    elif gender == 'female':
+        counts['female'] += sign
+
+    if not values.get('Class_S.No'):
+        return
+    counts['total'] += sign
+    if gender in ('male', 'boy'):
+        counts['gender']['Male'] += sign
+    elif gender in ('female', 'girl'):
+        counts['gender']['Female'] += sign
+    section = str(values.get('Class Section', '') or '').strip()
+    if section:
+        _bump(counts['sections'], section, sign)
+    band = age_band(values.get('Date of Birth'), today)
+    if band:
+        _bump(counts['ages'], band, sign)
+
+
+def count_sheet(class_name, headers, rows, today=None):
+    """Counts for one class sheet's data rows"""
+    today = today or date.today()
+    counts = empty_counts()
+    for row in rows:
+        count_student(counts, dict(zip(headers, row)), today=today)
+    counts['max_sno'] = max_class_serial(class_name, [row[0] for row in rows if row])
+    return counts
+
+
+def build_aggregates(snapshot, class_names, today=None):
+    """Aggregates for every class from a school snapshot"""
+    today = today or date.today()
+    classes = {}
+    for class_name in class_names:
+        sheet = snapshot.get(class_name) or {'headers': [], 'rows': []}
+        classes[class_name] = count_sheet(class_name, sheet['headers'], sheet['rows'], today)
+    return {'built_on': today.isoformat(), 'classes': classes}
+
+
+def is_current(aggregates, today=None):
+    """False once the day changes and the age bands need rebuilding"""
+    return aggregates.get('built_on') == (today or date.today()).isoformat()
+
+
+def apply_events(aggregates, events):
+    """Aggregates with change events applied, or None if an event lacks the old row it replaces"""
+    classes = dict(aggregates['classes'])
+    copied = set()
+    for event in events:
+        counts = classes.get(event.class_name)
+        if counts is None:
+            continue
+        if event.class_name not in copied:
+            counts = classes[event.class_name] = dict(
+                counts, gender=dict(counts['gender']), sections=dict(counts['sections']), ages=dict(counts['ages']))
+            copied.add(event.class_name)
+        if event.kind != ADDED:
+            if event.old_values is None:
+                return None
+            count_student(counts, event.old_values, -1)
+        if event.kind != DELETED:
+            count_student(counts, event.values, 1)
+            number = parse_class_serial(event.class_name, event.values.get('Class_S.No'))
+            if number:
+                counts['max_sno'] = max(counts['max_sno'], number)
+    return dict(aggregates, classes=classes)
+
+
+def class_wise_result(aggregates, class_names):
+    """/api/class_wise_data payload"""
+    classes = []
+    for class_name in class_names:
+        counts = aggregates['classes'].get(class_name) or empty_counts()
+        classes.append({
+            'name': class_name,
+            'total_students': counts['total'],
+            'male_students': counts['male'],
+            'female_students': counts['female'],
+            'next_sno': counts['max_sno'] + 1
+        })
+    return {
+        'success': True,
+        'classes': classes,
+        'summary': {
+            'total_students': sum(c['total_students'] for c in classes),
+            'total_male': sum(c['male_students'] for c in classes),
+            'total_female': sum(c['female_students'] for c in classes)
+        }
+    }
+
+
+def report_payload(counts):
+    """/api/class_report_data payload for one class"""
+    return {
+        'success': True,
+        'gender_data': dict(counts['gender']),
+        'section_data': dict(counts['sections']),
+        'age_data': dict(counts['ages']),
+        'total_students': counts['total']
+    }
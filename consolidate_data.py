@@ -146,13 +146,16 @@ def consolidate_student_data():
         
         print("\nStarting data consolidation...\n")
         
+        # Read every class sheet with one batchGet up front
+        values_by_sheet = data_entry.load_sheet_values([f"Class_{c}" for c in class_order])
+        
         for class_name in class_order:
             sheet_name = f"Class_{class_name}"
             print(f"Processing {sheet_name}...")
             
             try:
                 # Get data from Google Sheets
-                sheet_data = data_entry.get_sheet_data(sheet_name)
+                sheet_data = values_by_sheet.get(sheet_name, [])
                 
                 if not sheet_data or len(sheet_data) <= 1:  # Only headers or empty
                     print(f"- No data found in {sheet_name}")
@@ -265,8 +268,8 @@ if __name__ == "__main__":
         print("\nChecking environment...")
         load_dotenv()
 
-        # Check if credentials.json exists
-        if not os.path.exists('credentials.json'):
+        # Check if credentials.json exists (not needed for the offline fake backend)
+        if os.environ.get('SHEETS_BACKEND', 'google').lower() != 'fake' and not os.path.exists('credentials.json'):
             print("❌ Error: credentials.json not found!")
             print("Please ensure you have placed the Google Sheets API credentials file in the project directory.")
             exit(1)
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Fake Google Sheets Service
+In-process stand-in for the googleapiclient Sheets v4 service, backed by
+in-memory grids. Used for offline benchmarking and load testing.
+
+Select it with SHEETS_BACKEND=fake. Tuning (all optional):
+    FAKE_SHEETS_LATENCY_MS          base latency added to every call (default 0)
+    FAKE_SHEETS_LATENCY_JITTER_MS   extra random latency up to this value (default 0)
+    FAKE_SHEETS_429_RATE            probability of a 429 response (default 0)
+    FAKE_SHEETS_5XX_RATE            probability of a 503 response (default 0)
+    FAKE_SHEETS_STUDENTS_PER_CLASS  synthetic students seeded into each class (default 0)
+    FAKE_SHEETS_SEED_FILE           JSON file {sheet title: [[row], ...]} to seed from
+"""
+
+import os
+import json
+import copy
+import time
+import random
+import threading
+import httplib2
+from googleapiclient.errors import HttpError
+from google_sheets_data_entry import CLASS_NAMES, HEADERS, index_to_column, parse_a1_range
+
+# Spreadsheets shared by every fake service in this process, keyed by spreadsheetId
+_spreadsheets = {}
+_spreadsheets_lock = threading.Lock()
+
+
+def _http_error(status, message):
+    """Build an HttpError shaped like the ones googleapiclient raises"""
+    resp = httplib2.Response({'status': status, 'reason': message})
+    content = json.dumps({'error': {'code': status, 'message': message}}).encode('utf-8')
+    return HttpError(resp, content)
+
+
+class FakeSpreadsheet:
+    """In-memory spreadsheet: ordered sheets, each a list of string rows"""
+
+    def __init__(self, spreadsheet_id):
+        self.spreadsheet_id = spreadsheet_id
+        self.sheets = {}  # title -> {'sheetId', 'rows', 'rowCount', 'columnCount'}
+        self.next_sheet_id = 0
+        self.lock = threading.RLock()
+
+    def add_sheet(self, title, rows=None):
+        if title in self.sheets:
+            raise _http_error(400, f'A sheet with the name "{title}" already exists.')
+        sheet_id = self.next_sheet_id
+        self.next_sheet_id += 1
+        rows = [[str(v) for v in row] for row in (rows or [])]
+        self.sheets[title] = {
+            'sheetId': sheet_id,
+            'rows': rows,
+            'rowCount': max(1000, len(rows)),
+            'columnCount': 26
+        }
+        return self.sheet_properties(title)
+
+    def sheet_properties(self, title):
+        sheet = self.sheets[title]
+        return {
+            'sheetId': sheet['sheetId'],
+            'title': title,
+            'index': list(self.sheets).index(title),
+            'gridProperties': {
+                'rowCount': sheet['rowCount'],
+                'columnCount': sheet['columnCount']
+            }
+        }
+
+    def sheet(self, title):
+        if title not in self.sheets:
+            raise _http_error(400, f'Unable to parse range: {title}')
+        return self.sheets[title]
+
+    def sheet_by_id(self, sheet_id):
+        for title, sheet in self.sheets.items():
+            if sheet['sheetId'] == sheet_id:
+                return title, sheet
+        raise _http_error(400, f'No grid with id: {sheet_id}')
+
+    @staticmethod
+    def last_data_row(rows):
+        """Index of the row after the last non-empty row"""
+        for index in range(len(rows) - 1, -1, -1):
+            if any(cell != '' for cell in rows[index]):
+                return index + 1
+        return 0
+
+    def write_cells(self, sheet, start_row, start_col, values):
+        rows = sheet['rows']
+        for r, row_values in enumerate(values):
+            row_index = start_row + r
+            while len(rows) <= row_index:
+                rows.append([])
+            row = rows[row_index]
+            for c, value in enumerate(row_values):
+                col_index = start_col + c
+                while len(row) <= col_index:
+                    row.append('')
+                row[col_index] = '' if value is None else str(value)
+        sheet['rowCount'] = max(sheet['rowCount'], len(rows))
+
+    def read_range(self, a1_range):
+        title, start_row, start_col, end_row, end_col = parse_a1_range(a1_range)
+        sheet = self.sheet(title)
+        rows = sheet['rows']
+        last_row = len(rows) - 1 if end_row is None else min(end_row, len(rows) - 1)
+
+        values = []
+        for row in rows[start_row:last_row + 1]:
+            cells = row[start_col:] if end_col is None else row[start_col:end_col + 1]
+            # Trailing empty cells are trimmed, like the real API
+            while cells and cells[-1] == '':
+                cells = cells[:-1]
+            values.append(list(cells))
+        while values and not values[-1]:
+            values.pop()
+
+        end_label = index_to_column(end_col) if end_col is not None else index_to_column(sheet['columnCount'] - 1)
+        end_number = (end_row + 1) if end_row is not None else max(len(rows), start_row + 1)
+        value_range = {
+            'range': f"{title}!{index_to_column(start_col)}{start_row + 1}:{end_label}{end_number}",
+            'majorDimension': 'ROWS'
+        }
+        if values:
+            value_range['values'] = values
+        return value_range
+
+    def clear_range(self, a1_range):
+        title, start_row, start_col, end_row, end_col = parse_a1_range(a1_range)
+        sheet = self.sheet(title)
+        rows = sheet['rows']
+        last_row = len(rows) - 1 if end_row is None else min(end_row, len(rows) - 1)
+        for row in rows[start_row:last_row + 1]:
+            stop = len(row) if end_col is None else min(end_col + 1, len(row))
+            for col_index in range(start_col, stop):
+                row[col_index] = ''
+        return title
+
+    def snapshot(self):
+        return copy.deepcopy(self.sheets), self.next_sheet_id
+
+    def restore(self, state):
+        self.sheets, self.next_sheet_id = state
+
+
+class FakeHttp:
+    """Placeholder for request.http (callers set .timeout on it)"""
+
+    def __init__(self):
+        self.timeout = None
+
+
+class FakeRequest:
+    """Deferred call mirroring googleapiclient.http.HttpRequest"""
+
+    def __init__(self, service, name, method, handler):
+        self.service = service
+        self.name = name
+        self.method = method
+        self.uri = f'fake://sheets/{name}'
+        self.http = FakeHttp()
+        self._handler = handler
+
+    def execute(self, http=None, num_retries=0):
+        return self.service.dispatch(self.name, self._handler)
+
+
+class FakeValues:
+    def __init__(self, service):
+        self._service = service
+
+    def _spreadsheet(self, spreadsheetId):
+        return self._service.spreadsheet(spreadsheetId)
+
+    def get(self, spreadsheetId, range, **kwargs):
+        def handler():
+            spreadsheet = self._spreadsheet(spreadsheetId)
+            with spreadsheet.lock:
+                return spreadsheet.read_range(range)
+        return FakeRequest(self._service, 'values.get', 'GET', handler)
+
+    def batchGet(self, spreadsheetId, ranges=None, **kwargs):
+        def handler():
+            spreadsheet = self._spreadsheet(spreadsheetId)
+            with spreadsheet.lock:
+                return {
+                    'spreadsheetId': spreadsheetId,
+                    'valueRanges': [spreadsheet.read_range(r) for r in (ranges or [])]
+                }
+        return FakeRequest(self._service, 'values.batchGet', 'GET', handler)
+
+    def append(self, spreadsheetId, range, body, **kwargs):
+        def handler():
+            spreadsheet = self._spreadsheet(spreadsheetId)
+            title, _, start_col, _, _ = parse_a1_range(range)
+            with spreadsheet.lock:
+                sheet = spreadsheet.sheet(title)
+                start_row = spreadsheet.last_data_row(sheet['rows'])
+                values = body.get('values', [])
+                spreadsheet.write_cells(sheet, start_row, start_col, values)
+                return {
+                    'spreadsheetId': spreadsheetId,
+                    'updates': {
+                        'updatedRange': f"{title}!{index_to_column(start_col)}{start_row + 1}",
+                        'updatedRows': len(values)
+                    }
+                }
+        return FakeRequest(self._service, 'values.append', 'POST', handler)
+
+    def update(self, spreadsheetId, range, body, **kwargs):
+        def handler():
+            spreadsheet = self._spreadsheet(spreadsheetId)
+            title, start_row, start_col, _, _ = parse_a1_range(range)
+            with spreadsheet.lock:
+                values = body.get('values', [])
+                spreadsheet.write_cells(spreadsheet.sheet(title), start_row, start_col, values)
+                return {'spreadsheetId': spreadsheetId, 'updatedRange': range, 'updatedRows': len(values)}
+        return FakeRequest(self._service, 'values.update', 'PUT', handler)
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        def handler():
+            spreadsheet = self._spreadsheet(spreadsheetId)
+            with spreadsheet.lock:
+                state = spreadsheet.snapshot()
+                try:
+                    for value_range in body.get('data', []):
+                        title, start_row, start_col, _, _ = parse_a1_range(value_range['range'])
+                        spreadsheet.write_cells(spreadsheet.sheet(title), start_row, start_col,
+                                                value_range.get('values', []))
+                except Exception:
+                    spreadsheet.restore(state)
+                    raise
+                return {'spreadsheetId': spreadsheetId, 'totalUpdatedRows': sum(
+                    len(v.get('values', [])) for v in body.get('data', []))}
+        return FakeRequest(self._service, 'values.batchUpdate', 'POST', handler)
+
+    def clear(self, spreadsheetId, range, body=None, **kwargs):
+        def handler():
+            spreadsheet = self._spreadsheet(spreadsheetId)
+            with spreadsheet.lock:
+                spreadsheet.clear_range(range)
+                return {'spreadsheetId': spreadsheetId, 'clearedRange': range}
+        return FakeRequest(self._service, 'values.clear', 'POST', handler)
+
+
+class FakeSpreadsheets:
+    def __init__(self, service):
+        self._service = service
+
+    def values(self):
+        return FakeValues(self._service)
+
+    def get(self, spreadsheetId, **kwargs):
+        def handler():
+            spreadsheet = self._service.spreadsheet(spreadsheetId)
+            with spreadsheet.lock:
+                return {
+                    'spreadsheetId': spreadsheetId,
+                    'sheets': [{'properties': spreadsheet.sheet_properties(t)} for t in spreadsheet.sheets]
+                }
+        return FakeRequest(self._service, 'spreadsheets.get', 'GET', handler)
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        def handler():
+            spreadsheet = self._service.spreadsheet(spreadsheetId)
+            with spreadsheet.lock:
+                # Batches are all-or-nothing, like the real API
+                state = spreadsheet.snapshot()
+                try:
+                    replies = [self._apply(spreadsheet, request) for request in body.get('requests', [])]
+                except Exception:
+                    spreadsheet.restore(state)
+                    raise
+                result = {'spreadsheetId': spreadsheetId, 'replies': replies}
+                if body.get('includeSpreadsheetInResponse'):
+                    result['updatedSpreadsheet'] = self._updated_spreadsheet(
+                        spreadsheet, body.get('responseRanges', []), body.get('responseIncludeGridData'))
+                return result
+        return FakeRequest(self._service, 'spreadsheets.batchUpdate', 'POST', handler)
+
+    @staticmethod
+    def _updated_spreadsheet(spreadsheet, response_ranges, include_grid_data):
+        """The post-update spreadsheet, with GridData for responseRanges when asked"""
+        sheets = {title: {'properties': spreadsheet.sheet_properties(title)} for title in spreadsheet.sheets}
+        for a1_range in (response_ranges if include_grid_data else []):
+            title, start_row, start_col, _, _ = parse_a1_range(a1_range)
+            row_data = [{'values': [{'userEnteredValue': {
+                'numberValue' if isinstance(cell, (int, float)) else 'stringValue': cell} if cell != '' else {}}
+                for cell in row]} for row in spreadsheet.read_range(a1_range).get('values', [])]
+            sheets[title].setdefault('data', []).append(
+                {'startRow': start_row, 'startColumn': start_col, 'rowData': row_data})
+        return {'spreadsheetId': spreadsheet.spreadsheet_id, 'sheets': list(sheets.values())}
+
+    @staticmethod
+    def _cell_value(cell):
+        value = cell.get('userEnteredValue', {})
+        for key in ('stringValue', 'numberValue', 'boolValue', 'formulaValue'):
+            if key in value:
+                return value[key]
+        return ''
+
+    def _apply(self, spreadsheet, request):
+        if 'addSheet' in request:
+            title = request['addSheet'].get('properties', {}).get('title')
+            return {'addSheet': {'properties': spreadsheet.add_sheet(title)}}
+
+        if 'deleteSheet' in request:
+            title, _ = spreadsheet.sheet_by_id(request['deleteSheet']['sheetId'])
+            del spreadsheet.sheets[title]
+            return {}
+
+        if 'deleteDimension' in request:
+            dimension_range = request['deleteDimension']['range']
+            if dimension_range.get('dimension') != 'ROWS':
+                raise _http_error(400, 'Only ROWS deleteDimension is supported by the fake service')
+            _, sheet = spreadsheet.sheet_by_id(dimension_range['sheetId'])
+            start, end = dimension_range['startIndex'], dimension_range['endIndex']
+            del sheet['rows'][start:end]
+            sheet['rowCount'] = max(0, sheet['rowCount'] - (end - start))
+            return {}
+
+        if 'appendCells' in request:
+            append = request['appendCells']
+            _, sheet = spreadsheet.sheet_by_id(append['sheetId'])
+            values = [[self._cell_value(cell) for cell in row.get('values', [])] for row in append.get('rows', [])]
+            spreadsheet.write_cells(sheet, spreadsheet.last_data_row(sheet['rows']), 0, values)
+            return {}
+
+        if 'updateCells' in request:
+            update = request['updateCells']
+            start = update.get('start', {})
+            _, sheet = spreadsheet.sheet_by_id(start.get('sheetId'))
+            values = [[self._cell_value(cell) for cell in row.get('values', [])] for row in update.get('rows', [])]
+            spreadsheet.write_cells(sheet, start.get('rowIndex', 0), start.get('columnIndex', 0), values)
+            return {}
+
+        raise _http_error(400, f"Unsupported request for the fake service: {', '.join(request)}")
+
+
+class FakeSheetsService:
+    """Drop-in replacement for build('sheets', 'v4', ...)"""
+
+    def __init__(self, latency_ms=0, latency_jitter_ms=0, rate_429=0.0, rate_5xx=0.0,
+                 students_per_class=0, seed_file=None):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.students_per_class = students_per_class
+        self.seed_file = seed_file
+        self.call_counts = {}
+        self.call_seconds = {}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Create a fake service configured from FAKE_SHEETS_* environment variables"""
+        return cls(
+            latency_ms=float(os.environ.get('FAKE_SHEETS_LATENCY_MS', 0)),
+            latency_jitter_ms=float(os.environ.get('FAKE_SHEETS_LATENCY_JITTER_MS', 0)),
+            rate_429=float(os.environ.get('FAKE_SHEETS_429_RATE', 0)),
+            rate_5xx=float(os.environ.get('FAKE_SHEETS_5XX_RATE', 0)),
+            students_per_class=int(os.environ.get('FAKE_SHEETS_STUDENTS_PER_CLASS', 0)),
+            seed_file=os.environ.get('FAKE_SHEETS_SEED_FILE')
+        )
+
+    def spreadsheets(self):
+        return FakeSpreadsheets(self)
+
+    def spreadsheet(self, spreadsheet_id):
+        """Get the shared in-memory spreadsheet, seeding it on first use"""
+        with _spreadsheets_lock:
+            if spreadsheet_id not in _spreadsheets:
+                _spreadsheets[spreadsheet_id] = self._seed(FakeSpreadsheet(spreadsheet_id))
+            return _spreadsheets[spreadsheet_id]
+
+    def _seed(self, spreadsheet):
+        if self.seed_file:
+            with open(self.seed_file) as f:
+                for title, rows in json.load(f).items():
+                    spreadsheet.add_sheet(title, rows)
+            return spreadsheet
+
+        rng = random.Random(408070227)
+        main_rows = [list(HEADERS)]
+        class_rows = {}
+        gr_number = 1000
+        for class_name in CLASS_NAMES:
+            rows = [list(HEADERS)]
+            for n in range(1, self.students_per_class + 1):
+                gr_number += 1
+                gender = rng.choice(['Male', 'Female'])
+                row = {
+                    'Class_S.No': f'{class_name}_{str(n).zfill(2)}',
+                    'GR#': str(gr_number),
+                    'Student Name': f'Student {gr_number}',
+                    "Father's Name": f'Father {gr_number}',
+                    'Gender': gender,
+                    'Religion': 'Islam',
+                    'Contact Number': f'0300-{rng.randint(1000000, 9999999)}',
+                    'CNIC / B-Form': f'42101-{rng.randint(1000000, 9999999)}-{rng.randint(0, 9)}',
+                    'Date of Birth': f'{rng.randint(2008, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                    "Father/Mother's CNIC": f'42101-{rng.randint(1000000, 9999999)}-{rng.randint(0, 9)}',
+                    'Student Class': class_name,
+                    'Class Section': 'Boys' if gender == 'Male' else 'Girls',
+                    'SEMIS Code': '408070227',
+                    'Date of Admission': '2025-04-01'
+                }
+                rows.append([row.get(header, '') for header in HEADERS])
+            class_rows[f'Class_{class_name}'] = rows
+            main_rows.extend(rows[1:])
+
+        spreadsheet.add_sheet('408070227', main_rows)
+        for title, rows in class_rows.items():
+            spreadsheet.add_sheet(title, rows)
+        return spreadsheet
+
+    def dispatch(self, name, handler):
+        """Run a request handler with injected latency and errors, recording stats"""
+        started = time.time()
+        try:
+            delay = (self.latency_ms + random.uniform(0, self.latency_jitter_ms)) / 1000.0
+            if delay > 0:
+                time.sleep(delay)
+            roll = random.random()
+            if roll < self.rate_429:
+                raise _http_error(429, 'Quota exceeded (injected by fake service)')
+            if roll < self.rate_429 + self.rate_5xx:
+                raise _http_error(503, 'Service unavailable (injected by fake service)')
+            return copy.deepcopy(handler())
+        finally:
+            with self._stats_lock:
+                self.call_counts[name] = self.call_counts.get(name, 0) + 1
+                self.call_seconds[name] = self.call_seconds.get(name, 0.0) + (time.time() - started)
+
+    def stats(self):
+        """Per-method call counts and total seconds since the last reset"""
+        with self._stats_lock:
+            return {
+                name: {'calls': count, 'seconds': round(self.call_seconds.get(name, 0.0), 4)}
+                for name, count in self.call_counts.items()
+            }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.call_counts.clear()
+            self.call_seconds.clear()
+
+
+def main():
+    """Run a small offline benchmark of common GoogleSheetsDataEntry operations"""
+    os.environ['SHEETS_BACKEND'] = 'fake'
+    os.environ.setdefault('FAKE_SHEETS_STUDENTS_PER_CLASS', '40')
+    from google_sheets_data_entry import GoogleSheetsDataEntry
+
+    data_entry = GoogleSheetsDataEntry(spreadsheet_id='fake-benchmark')
+    operations = [
+        ('get_class_wise_data', lambda: data_entry.get_class_wise_data()),
+        ('get_all_students', lambda: data_entry.get_all_students()),
+        ('get_class_students(V)', lambda: data_entry.get_class_students('V')),
+        ('check_duplicate_gr', lambda: data_entry.check_duplicate_gr('1001')),
+        ('add_student_record', lambda: data_entry.add_student_record({
+            'GR#': '999999', 'Student Name': 'Benchmark', 'Gender': 'Male', 'Student Class': 'V'
+        })),
+    ]
+
+    print(f"{'operation':<26}{'ms':>10}  calls")
+    for label, operation in operations:
+        data_entry.service.reset_stats()
+        started = time.time()
+        operation()
+        elapsed_ms = (time.time() - started) * 1000
+        calls = data_entry.service.stats()
+        summary = ', '.join(f"{name}={info['calls']}" for name, info in sorted(calls.items()))
+        print(f"{label:<26}{elapsed_ms:>10.1f}  {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Small JSON state files shared by every worker process on a host.
+
+Gunicorn workers are separate processes, so per-process locks can't
+coordinate them. locked_json_state() holds an exclusive fcntl lock on the
+file while the caller reads and changes the state, then writes it back.
+"""
+
+import os
+import json
+import tempfile
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: state is only shared between threads
+    fcntl = None
+
+_local_locks = {}
+_local_states = {}
+_registry_lock = threading.Lock()
+
+
+def state_path(prefix, key, directory=None):
+    """Path for a state file named after a hashed key (e.g. the spreadsheet ID)"""
+    digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(directory or tempfile.gettempdir(), f'{prefix}_{digest}.json')
+
+
+@contextmanager
+def locked_json_state(path):
+    """Yield the dict stored at path under an exclusive lock; changes are saved on exit"""
+    with _registry_lock:
+        local_lock = _local_locks.setdefault(path, threading.Lock())
+
+    if fcntl is None:
+        with local_lock:
+            yield _local_states.setdefault(path, {})
+        return
+
+    with local_lock, open(path, 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or '{}')
+            except ValueError:
+                state = {}
+            yield state
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+            f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
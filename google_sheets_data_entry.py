@@ -6,13 +6,131 @@ Replaces Excel with Google Sheets for cloud storage and persistence
 
 import os
 import json
+import hashlib
 from datetime import datetime
 import re
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import time
 import random
+import threading
+from contextlib import contextmanager
+from rate_limiter import SheetsRateLimiter, request_kind
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from sheets_http import PoolTimeoutError
+from gr_index import GRIndex, normalize_gr
+from change_events import StudentChange, ADDED, UPDATED, deletion_events, is_class_sheet
+from serial_allocator import ClassSerialAllocator, parse_class_serial, format_class_serial, max_class_serial
+
+# Class sheets in display order (sheet names are 'Class_<name>')
+CLASS_NAMES = ['ECE', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
+
+# Column headers shared by the main sheet (408070227) and every class sheet
+HEADERS = [
+    "Class_S.No", 
+    "GR#",
+    "Student Name",
+    "Father's Name",
+    "Gender",
+    "Religion",
+    "Contact Number",
+    "CNIC / B-Form",
+    "Date of Birth",
+    "Father/Mother's CNIC",
+    "Guardian Name",
+    "Guardian CNIC",
+    "Guardian Relation",
+    "Student Class",
+    "Class Section",
+    "SEMIS Code",
+    "Date of Admission",
+    "Remarks"
+]
+
+_discovery_doc = None
+_discovery_lock = threading.Lock()
+
+
+def sheets_discovery_document():
+    """Sheets v4 discovery document, parsed once per process.
+
+    Read from SHEETS_DISCOVERY_DOC when set (a vendored copy), otherwise from
+    the static copy shipped with google-api-python-client, so building the
+    client never fetches discovery metadata over the network.
+    """
+    global _discovery_doc
+    with _discovery_lock:
+        if _discovery_doc is None:
+            path = os.environ.get('SHEETS_DISCOVERY_DOC')
+            if path:
+                with open(path, encoding='utf-8') as f:
+                    _discovery_doc = json.load(f)
+            else:
+                from googleapiclient.discovery_cache import get_static_doc
+                _discovery_doc = json.loads(get_static_doc('sheets', 'v4'))
+        return _discovery_doc
+
+def column_to_index(letters):
+    """Convert a column label (A, R, AA) to a 0-based index"""
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index - 1
+
+def index_to_column(index):
+    """Convert a 0-based column index to its label"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+_A1_CELL_RE = re.compile(r'^([A-Za-z]*)(\d*)$')
+
+def parse_a1_range(a1_range):
+    """Parse 'Sheet!A1:R10' style ranges.
+
+    Returns (sheet_title, start_row, start_col, end_row, end_col) with 0-based
+    inclusive bounds. Open-ended bounds are None.
+    """
+    if '!' in a1_range:
+        title, cells = a1_range.rsplit('!', 1)
+    else:
+        title, cells = a1_range, ''
+    if len(title) >= 2 and title[0] == "'" and title[-1] == "'":
+        title = title[1:-1].replace("''", "'")
+
+    if not cells:
+        return title, 0, 0, None, None
+
+    start, _, end = cells.partition(':')
+    end = end or start
+
+    start_match = _A1_CELL_RE.match(start)
+    end_match = _A1_CELL_RE.match(end)
+    if not start_match or not end_match:
+        raise ValueError(f"Unable to parse range: {a1_range}")
+
+    start_col = column_to_index(start_match.group(1)) if start_match.group(1) else 0
+    start_row = int(start_match.group(2)) - 1 if start_match.group(2) else 0
+    end_col = column_to_index(end_match.group(1)) if end_match.group(1) else None
+    end_row = int(end_match.group(2)) - 1 if end_match.group(2) else None
+    return title, start_row, start_col, end_row, end_col
+
+def project_rows(values, fields):
+    """Keep only the named columns of sheet values (header row first).
+
+    Returns [fields] followed by one list per data row, in fields order;
+    unknown field names come back as empty strings.
+    """
+    if not values:
+        return []
+    header_indices = {header: idx for idx, header in enumerate(values[0])}
+    indices = [header_indices.get(field) for field in fields]
+    rows = [list(fields)]
+    for row in values[1:]:
+        rows.append([row[idx] if idx is not None and idx < len(row) else '' for idx in indices])
+    return rows
 
 class GoogleSheetsDataEntry:
     def __init__(self, spreadsheet_id=None, credentials_file=None):
@@ -27,29 +145,60 @@ class GoogleSheetsDataEntry:
         if not self.spreadsheet_id:
             raise ValueError("Google Sheets ID is required. Set GOOGLE_SHEETS_ID environment variable or pass spreadsheet_id parameter.")
         
-        self.headers = [
-            "Class_S.No", 
-            "GR#",
-            "Student Name",
-            "Father's Name",
-            "Gender",
-            "Religion",
-            "Contact Number",
-            "CNIC / B-Form",
-            "Date of Birth",
-            "Father/Mother's CNIC",
-            "Guardian Name",
-            "Guardian CNIC",
-            "Guardian Relation",
-            "Student Class",
-            "Class Section",
-            "SEMIS Code",
-            "Date of Admission",
-            "Remarks"
-        ]
+        self.headers = list(HEADERS)
         
         self.service = None
+        # Keep-alive HTTP clients checked out per request (None for the fake backend)
+        self.http_pool = None
+        # Separate client for background jobs, used by threads inside isolated_http()
+        self._isolated_pool = None
+        self._thread_http = threading.local()
+
+        # Spreadsheet metadata cache (sheet title -> sheetId and grid size)
+        self.metadata_cache_duration = int(os.environ.get('SHEETS_METADATA_CACHE_DURATION', 300))
+        self._sheet_metadata = None
+        self._sheet_metadata_timestamp = 0
+        self._metadata_lock = threading.Lock()
+        # Header row per sheet: sheet title -> (header -> column index, fetched_at)
+        self._header_maps = {}
+
+        # Last full values per sheet for incremental tail sync:
+        # sheet title -> {'values', 'fingerprint', 'full_at'}
+        self.incremental_sync = os.environ.get('SHEETS_INCREMENTAL_SYNC', 'true').lower() in ('1', 'true', 'yes')
+        self.full_sync_interval = int(os.environ.get('SHEETS_FULL_SYNC_SECONDS', 900))
+        self._sheet_tails = {}
+        self._tail_lock = threading.Lock()
+
+        # Called with a list of StudentChange events after every successful write
+        self.change_listeners = []
+
+        # GR# -> (sheet, row) locations, so duplicate checks don't hit the network
+        self.gr_index = GRIndex(
+            ttl=int(os.environ.get('GR_INDEX_TTL', 600)),
+            use_bloom=os.environ.get('GR_INDEX_BLOOM', 'false').lower() in ('1', 'true', 'yes')
+        )
+
+        # Highest Class_S.No number per class, shared by all workers on this host
+        self.serials = ClassSerialAllocator.from_env(
+            self.spreadsheet_id, ttl=int(os.environ.get('CLASS_SERIAL_TTL', 900)))
+
+        # Optional local SQLite primary store (STUDENT_STORE=sqlite); when set,
+        # student reads and writes go to it and Sheets is mirrored asynchronously
+        self.store = None
+
+        # Read/write quota buckets shared by all workers on this host (SHEETS_RATE_LIMIT)
+        self.rate_limiter = SheetsRateLimiter.from_env(self.spreadsheet_id)
+
+        # Opens after consecutive Sheets failures so callers fail fast during outages
+        self.circuit_breaker = CircuitBreaker.from_env()
+
         self.setup_google_sheets()
+
+        if os.environ.get('STUDENT_STORE', 'sheets').lower() == 'sqlite':
+            from local_store import LocalStudentStore
+            self.store = LocalStudentStore(self)
+            self.store.refresh_from_sheets()
+            self.store.mirror.ensure_started()
     
     def setup_google_sheets(self):
         """Setup Google Sheets API connection with retry logic"""
@@ -58,6 +207,20 @@ class GoogleSheetsDataEntry:
         
         for attempt in range(max_retries):
             try:
+                if os.environ.get('SHEETS_BACKEND', 'google').lower() == 'fake':
+                    # Offline in-memory backend for benchmarking and load tests
+                    from fake_sheets_service import FakeSheetsService
+                    self.service = FakeSheetsService.from_env()
+                    self.get_sheet_metadata(force_refresh=True)
+                    print(f"✅ Using fake in-memory Sheets backend for spreadsheet: {self.spreadsheet_id}")
+                    return
+
+                # The google-auth and discovery stacks are only imported when connecting for real
+                started = time.perf_counter()
+                from google.oauth2.service_account import Credentials
+                from googleapiclient.discovery import build_from_document
+                from sheets_http import SheetsHttpPool
+
                 # Load credentials from environment variable or file
                 if os.environ.get('GOOGLE_CREDENTIALS_JSON'):
                     # For Railway deployment - credentials as environment variable
@@ -75,30 +238,16 @@ class GoogleSheetsDataEntry:
                 else:
                     raise FileNotFoundError("Google Sheets credentials not found")
                 
-                from google.auth.transport.requests import AuthorizedSession
+                # Build service with proper auth; requests run on pooled keep-alive clients
+                self.service = build_from_document(sheets_discovery_document(), credentials=credentials)
+                self.http_pool = SheetsHttpPool.from_env(credentials)
+                built = time.perf_counter()
                 
-                # Build service with proper auth and timeouts
-                self.service = build(
-                    'sheets', 'v4', 
-                    credentials=credentials,
-                    cache_discovery=False
-                )
-                
-                # Test the connection
-                self._execute_request(
-                    self.service.spreadsheets().get(
-                        spreadsheetId=self.spreadsheet_id
-                    )
-                )
-
-                # Test connection by accessing main worksheet
-                self._execute_request(
-                    self.service.spreadsheets().get(
-                        spreadsheetId=self.spreadsheet_id
-                    )
-                )
+                # Test the connection and prime the metadata cache
+                self.get_sheet_metadata(force_refresh=True)
                 
-                print(f"✅ Connected to Google Sheets spreadsheet: {self.spreadsheet_id}")
+                print(f"✅ Connected to Google Sheets spreadsheet: {self.spreadsheet_id} "
+                      f"(client built in {built - started:.2f}s, first call {time.perf_counter() - built:.2f}s)")
                 return
                 
             except Exception as e:
@@ -114,6 +263,25 @@ class GoogleSheetsDataEntry:
         print(f"Last error: {last_error}")
         raise last_error
 
+    @contextmanager
+    def isolated_http(self):
+        """Send this thread's requests over a dedicated connection instead of the request pool.
+
+        Background refreshes then never hold a pooled client that an
+        interactive request is waiting for, and a broken connection on
+        one side doesn't affect the other.
+        """
+        if self.http_pool is None:
+            yield
+            return
+        if self._isolated_pool is None:
+            self._isolated_pool = self.http_pool.spawn(size=1)
+        self._thread_http.pool = self._isolated_pool
+        try:
+            yield
+        finally:
+            self._thread_http.pool = None
+
     def _execute_request(self, request, max_retries=3, initial_backoff=1.0):
         """Execute a google-api-python-client request with retries on transient errors.
 
@@ -122,56 +290,185 @@ class GoogleSheetsDataEntry:
         """
         backoff = initial_backoff
         last_error = None
+        kind = request_kind(request)
         
         for attempt in range(max_retries):
+            # Fail fast (CircuitOpenError) while Sheets is known to be down
+            self.circuit_breaker.before_request()
             try:
-                # Configure request for better SSL handling
-                request.http.timeout = 30  # Increase timeout
-                return request.execute(num_retries=2)  # Allow internal retries
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(kind)
+                # Internal retries would bypass the quota buckets, so only retry here
+                num_retries = 0 if self.rate_limiter is not None else 2
+                http_pool = getattr(self._thread_http, 'pool', None) or self.http_pool
+                if http_pool is None:
+                    result = request.execute(num_retries=num_retries)
+                else:
+                    # The shared httplib2 transport isn't thread-safe; borrow a pooled client
+                    with http_pool.checkout() as http:
+                        result = request.execute(http=http, num_retries=num_retries)
+                self.circuit_breaker.record_success()
+                return result
                 
             except HttpError as e:
                 last_error = e
                 status = getattr(getattr(e, 'resp', None), 'status', None)
                 
+                # 4xx (including 429) means Sheets answered; only outages trip the breaker
+                if status and status < 500:
+                    self.circuit_breaker.record_success()
+                else:
+                    self.circuit_breaker.record_failure()
+                
                 # Retry on 5xx, 429 (rate limit), or SSL errors
                 if (status and (status >= 500 or status == 429)) or \
                    isinstance(e, (IOError, ConnectionError)) or \
                    'SSL' in str(e):
                     wait_time = backoff + random.random()
-                    if attempt < max_retries - 1:
+                    if attempt < max_retries - 1 and not self.circuit_breaker.is_open():
                         print(f"Request failed (attempt {attempt + 1}/{max_retries}): {e}")
+                        if status == 429 and self.rate_limiter is not None:
+                            # Hold back every worker; the next acquire() does the waiting
+                            self.rate_limiter.penalize(kind, wait_time)
+                            backoff *= 2
+                            continue
                         print(f"Retrying in {wait_time:.1f} seconds...")
                         time.sleep(wait_time)
                         backoff *= 2
                         continue
-                raise  # Non-retryable error or last attempt
+                raise  # Non-retryable error, last attempt, or circuit just opened
+                
+            except PoolTimeoutError:
+                raise  # Local saturation, not a Sheets failure
                 
             except Exception as e:
                 last_error = e
-                if attempt < max_retries - 1:
+                self.circuit_breaker.record_failure()
+                if attempt < max_retries - 1 and not self.circuit_breaker.is_open():
                     wait_time = backoff + random.random()
                     print(f"Unexpected error (attempt {attempt + 1}/{max_retries}): {e}")
                     print(f"Retrying in {wait_time:.1f} seconds...")
                     time.sleep(wait_time)
                     backoff *= 2
                     continue
-                raise  # Last attempt failed
+                raise  # Last attempt failed or circuit just opened
         
         print(f"Request failed after {max_retries} attempts. Last error: {last_error}")
         raise last_error
-    
+
+    def get_sheet_metadata(self, force_refresh=False):
+        """Get sheet properties keyed by title, cached for metadata_cache_duration seconds.
+
+        Each value is a dict with 'sheetId', 'rowCount' and 'columnCount'. Row and
+        column counts are the grid size as of the last fetch.
+        """
+        with self._metadata_lock:
+            if (not force_refresh and self._sheet_metadata is not None and
+                    time.time() - self._sheet_metadata_timestamp < self.metadata_cache_duration):
+                return self._sheet_metadata
+
+        sheet_metadata = self._execute_request(
+            self.service.spreadsheets().get(
+                spreadsheetId=self.spreadsheet_id,
+                fields='sheets.properties(sheetId,title,gridProperties(rowCount,columnCount))'
+            )
+        )
+
+        sheets = {}
+        for sheet in sheet_metadata.get('sheets', []):
+            properties = sheet.get('properties', {})
+            grid = properties.get('gridProperties', {})
+            sheets[properties.get('title')] = {
+                'sheetId': properties.get('sheetId'),
+                'rowCount': grid.get('rowCount', 0),
+                'columnCount': grid.get('columnCount', 0)
+            }
+
+        with self._metadata_lock:
+            self._sheet_metadata = sheets
+            self._sheet_metadata_timestamp = time.time()
+        return sheets
+
+    def invalidate_sheet_metadata(self):
+        """Drop cached sheet metadata so the next lookup refetches it"""
+        with self._metadata_lock:
+            self._sheet_metadata = None
+            self._sheet_metadata_timestamp = 0
+            self._header_maps.clear()
+
+    def remember_headers(self, sheet_name, headers):
+        """Cache a sheet's header row for column lookups"""
+        header_map = {header: idx for idx, header in enumerate(headers) if header}
+        with self._metadata_lock:
+            self._header_maps[sheet_name] = (header_map, time.time())
+        return header_map
+
+    def get_header_map(self, sheet_name):
+        """Header name -> 0-based column index for a sheet, cached like the metadata"""
+        with self._metadata_lock:
+            cached = self._header_maps.get(sheet_name)
+            if cached and time.time() - cached[1] < self.metadata_cache_duration:
+                return cached[0]
+
+        result = self._execute_request(
+            self.service.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id, range=f'{sheet_name}!1:1')
+        )
+        values = result.get('values', [])
+        return self.remember_headers(sheet_name, values[0] if values else [])
+
+    def get_sheet_columns(self, sheet_name, fields):
+        """Fetch only the named columns of a sheet with one values().batchGet.
+
+        Returns rows shaped like project_rows(): [fields] then one row per data row.
+        """
+        header_map = self.get_header_map(sheet_name)
+        known = [field for field in fields if field in header_map]
+        if not known:
+            return []
+
+        ranges = []
+        for field in known:
+            column = index_to_column(header_map[field])
+            ranges.append(f'{sheet_name}!{column}2:{column}')
+        result = self._execute_request(
+            self.service.spreadsheets().values().batchGet(spreadsheetId=self.spreadsheet_id, ranges=ranges)
+        )
+
+        columns = {}
+        for field, value_range in zip(known, result.get('valueRanges', [])):
+            columns[field] = [row[0] if row else '' for row in value_range.get('values', [])]
+
+        height = max(len(column) for column in columns.values())
+        rows = [list(fields)]
+        for i in range(height):
+            rows.append([columns[field][i] if field in columns and i < len(columns[field]) else ''
+                         for field in fields])
+        return rows
+
+    def add_change_listener(self, listener):
+        """Register listener(events) to hear about every student row written"""
+        self.change_listeners.append(listener)
+
+    def notify_changes(self, events):
+        """Pass change events to the listeners; a failing listener never fails the write"""
+        if not events:
+            return
+        for listener in list(self.change_listeners):
+            try:
+                listener(events)
+            except Exception as e:
+                print(f"⚠️ Change listener failed: {e}")
+
+    def get_sheet_id(self, sheet_name):
+        """Get the numeric sheetId for a sheet title, or None if it doesn't exist"""
+        properties = self.get_sheet_metadata().get(sheet_name)
+        return properties['sheetId'] if properties else None
+
     def setup_main_worksheet(self):
         """Setup main worksheet with headers if it doesn't exist"""
         try:
-            # Check if the spreadsheet exists and has the main sheet
-            sheet_metadata = self._execute_request(
-                self.service.spreadsheets().get(spreadsheetId=self.spreadsheet_id)
-            )
-            
             # Check if '408070227' sheet exists
-            sheet_names = [sheet['properties']['title'] for sheet in sheet_metadata['sheets']]
-            
-            if '408070227' not in sheet_names:
+            if not self.sheet_exists('408070227'):
                 # Create the main sheet
                 self.create_worksheet('408070227')
             
@@ -198,6 +495,7 @@ class GoogleSheetsDataEntry:
             self._execute_request(
                 self.service.spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id, body=request_body)
             )
+            self.invalidate_sheet_metadata()
 
         except HttpError as e:
             print(f"Error creating worksheet {sheet_name}: {e}")
@@ -223,6 +521,7 @@ class GoogleSheetsDataEntry:
                         body={'values': [self.headers]}
                     )
                 )
+            self.remember_headers(sheet_name, self.headers)
                 
         except HttpError as e:
             print(f"Error adding headers to {sheet_name}: {e}")
@@ -230,17 +529,14 @@ class GoogleSheetsDataEntry:
     
     def get_or_create_class_sheet(self, student_class):
         """Get or create a class-specific sheet"""
+        if self.store is not None:
+            return self.store.get_or_create_class_sheet(student_class)
+
         try:
             # Convert class name to proper sheet name format
             sheet_name = f'Class_{student_class}' if not student_class.startswith('Class_') else student_class
             
-            sheet_metadata = self._execute_request(
-                self.service.spreadsheets().get(spreadsheetId=self.spreadsheet_id)
-            )
-            
-            sheet_names = [sheet['properties']['title'] for sheet in sheet_metadata['sheets']]
-            
-            if sheet_name not in sheet_names:
+            if sheet_name not in self.get_sheet_metadata():
                 self.create_worksheet(sheet_name)
                 self.add_headers_to_sheet(sheet_name)
             
@@ -250,109 +546,386 @@ class GoogleSheetsDataEntry:
             print(f"Error getting/creating class sheet {sheet_name}: {e}")
             raise
     
-    def check_duplicate_gr(self, gr_number):
-        """Check if GR number already exists"""
+    def check_duplicate_gr(self, gr_number, confirm=False):
+        """Check if GR number already exists.
+
+        The per-worker index answers on its own for lookups. With confirm=True
+        (before a write) a miss is re-checked against the main sheet rows
+        appended since the index last saw it, since other workers may have
+        added the GR meanwhile, and read errors propagate instead of letting
+        the write through unchecked.
+        """
+        if self.store is not None:
+            return self.store.check_duplicate_gr(gr_number)
+
         try:
-            # Search in main sheet
-            result = self._execute_request(
-                self.service.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id, range='408070227!B:B')
-            )
-            
-            values = result.get('values', [])
-            gr_numbers = [row[0] if row else '' for row in values[1:]]  # Skip header
-            
-            return gr_number in gr_numbers
-            
+            if self.gr_index.is_stale():
+                self.rebuild_gr_index()
+            if self.gr_index.contains(gr_number) or not confirm:
+                return self.gr_index.contains(gr_number)
         except HttpError as e:
+            if confirm:
+                raise
             print(f"Error checking duplicate GR: {e}")
             return False
+
+        self.sync_gr_index_tail()
+        return self.gr_index.contains(gr_number)
+
+    def sync_gr_index_tail(self):
+        """Add the main sheet GRs appended since the index last saw the sheet (one narrow values().get).
+
+        Every student has a main sheet row, so new GRs show up at its tail.
+        The read starts at the last row the index knows; if that row no
+        longer holds the same GR (rows above it were deleted), the whole
+        index is rebuilt instead.
+        """
+        last_row = self.gr_index.last_row('408070227')
+        if not last_row:
+            return self.rebuild_gr_index()
+        column = index_to_column(HEADERS.index('GR#'))
+        result = self._execute_request(
+            self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f'408070227!{column}{last_row}:{column}'
+            )
+        )
+        cells = [row[0] if row else '' for row in result.get('values', [])]
+        if not cells or normalize_gr(cells[0]) != self.gr_index.gr_at('408070227', last_row):
+            return self.rebuild_gr_index()
+        for row_number, gr_number in enumerate(cells[1:], start=last_row + 1):
+            self.gr_index.update('408070227', row_number, gr_number)
+        return self.gr_index
+    
+    def read_gr_columns(self, sheet_names):
+        """sheet name -> GR# cells (row 2 first) for the named sheets that exist, in one batchGet"""
+        existing_sheets = self.get_sheet_metadata()
+        sheet_names = [name for name in sheet_names if name in existing_sheets]
+        if not sheet_names:
+            return {}
+        column = index_to_column(HEADERS.index('GR#'))
+        result = self._execute_request(
+            self.service.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet_id,
+                ranges=[f'{name}!{column}2:{column}' for name in sheet_names]
+            )
+        )
+        return {
+            name: [row[0] if row else '' for row in value_range.get('values', [])]
+            for name, value_range in zip(sheet_names, result.get('valueRanges', []))
+        }
+
+    def rebuild_gr_index(self):
+        """Rebuild the GR# index from the GR# columns of the main and class sheets (one batchGet)"""
+        self.gr_index.build(self.read_gr_columns(['408070227'] + [f'Class_{c}' for c in CLASS_NAMES]))
+        return self.gr_index
     
     def get_next_class_serial_number(self, student_class):
-        """Get the next serial number for a class"""
+        """Get the next serial number for a class (without reserving it)"""
+        if self.store is not None:
+            return self.store.get_next_class_serial_number(student_class)
+
         try:
-            # Get or create class sheet
-            sheet_name = self.get_or_create_class_sheet(student_class)
-            
-            # Get all data from class sheet - use Class_S.No column (column B)
-            result = self._execute_request(
-                self.service.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id, range=f'{sheet_name}!A:A')
-            )
-            
-            values = result.get('values', [])
-            
-            if len(values) <= 1:  # Only headers or empty
-                return 1
-            
-            # Find the highest serial number
-            serial_numbers = []
-            for row in values[1:]:  # Skip header
-                if row and row[0]:
-                    try:
-                        serial_numbers.append(int(row[0]))
-                    except ValueError:
-                        continue
-            
-            return max(serial_numbers) + 1 if serial_numbers else 1
-            
+            prefix = str(student_class).strip()
+            next_sno = self.serials.peek(prefix)
+            if next_sno is None:
+                self._seed_class_serial_from_sheet(prefix)
+                next_sno = self.serials.peek(prefix)
+            return next_sno or 1
+
         except HttpError as e:
             print(f"Error getting next serial number: {e}")
             return 1
     
+    def get_next_class_serial_numbers(self):
+        """Next serial number for every class; one snapshot read seeds any class not yet seeded"""
+        if self.store is not None:
+            return {c['name']: c['next_sno'] for c in self.summarize_snapshot(self.load_school_snapshot())}
+
+        numbers = {class_name: self.serials.peek(class_name) for class_name in CLASS_NAMES}
+        if None in numbers.values():
+            self.load_school_snapshot()
+            numbers = {class_name: self.serials.peek(class_name) or 1 for class_name in CLASS_NAMES}
+        return numbers
+
+    @staticmethod
+    def parse_class_serial(student_class, value):
+        """Numeric part of a Class_S.No value, or None if it isn't one of ours"""
+        return parse_class_serial(student_class, value)
+
+    def seed_class_serial(self, student_class, rows):
+        """Remember the highest Class_S.No in a class sheet's data rows"""
+        self.serials.seed(student_class, max_class_serial(student_class, [row[0] if row else '' for row in rows]))
+
+    def _seed_class_serial_from_sheet(self, student_class):
+        """Seed one class from its Class_S.No column (column A)"""
+        sheet_name = f'Class_{student_class}'
+        rows = self.get_sheet_data(sheet_name, range_spec='A:A')[1:] if self.sheet_exists(sheet_name) else []
+        self.seed_class_serial(student_class, rows)
+
+    def _reserve_class_serial(self, student_class):
+        """Atomically reserve the next Class_S.No number for a class.
+
+        The class sheet's column A is only read when the shared counter hasn't
+        been seeded within CLASS_SERIAL_TTL (a snapshot load also seeds it).
+        """
+        number = self.serials.reserve(student_class)
+        if number is None:
+            self._seed_class_serial_from_sheet(student_class)
+            number = self.serials.reserve(student_class)
+        return number
+
+    def _reserve_class_serials(self, student_class, count):
+        """Atomically reserve `count` consecutive Class_S.No numbers; returns the first"""
+        first = self.serials.reserve_block(student_class, count)
+        if first is None:
+            self._seed_class_serial_from_sheet(student_class)
+            first = self.serials.reserve_block(student_class, count)
+        return first
+
+    def _release_class_serial(self, student_class, number):
+        """Give back a reserved number if nothing was reserved after it"""
+        self.serials.release(student_class, number)
+
+    def _note_class_serial(self, student_class, value):
+        """Raise the counter when a record arrives with its own Class_S.No"""
+        self.serials.note(student_class, parse_class_serial(student_class, value))
+
     def add_student_record(self, student_data):
-        """Add a student record to both main sheet and class sheet"""
+        """Add a student record to both main sheet and class sheet in one write"""
+        if self.store is not None:
+            return self.store.add_student_record(student_data)
+
         try:
-            student_class = student_data.get('Student Class', '')
+            student_class = student_data.get('Student Class', '') or ''
+            prefix = str(student_class).strip()
+            reserved_sno = None
 
-            # If Class_S.No is missing/empty, auto-generate using existing class sheet entries (class-wise)
+            # If Class_S.No is missing/empty, auto-generate it class-wise from cached serials
             class_sno = student_data.get('Class_S.No')
             if (not class_sno or str(class_sno).strip() == '') and student_class:
-                try:
-                    # Ensure class sheet exists and get its name
-                    class_sheet_name = self.get_or_create_class_sheet(student_class)
-
-                    # Read the first column (Class_S.No) for the class sheet to compute highest existing suffix
-                    sheet_values = self.get_sheet_data(class_sheet_name, range_spec='A:A')
-                    max_num = 0
-                    prefix = str(student_class).strip()
-
-                    for row in sheet_values[1:]:  # skip header
-                        val = row[0] if row and len(row) > 0 else ''
-                        if not val:
-                            continue
-                        # Match formats like PREFIX_01, PREFIX-01, PREFIX01 or just trailing digits
-                        m = re.match(rf'^(?:{re.escape(prefix)}[_-]?)?(\d+)$', str(val).strip())
-                        if m:
-                            try:
-                                num = int(m.group(1))
-                                if num > max_num:
-                                    max_num = num
-                            except Exception:
-                                continue
-
-                    next_num = max_num + 1
-                    # Format as PREFIX_XX with zero padding to 2 digits
-                    student_data['Class_S.No'] = f"{prefix}_{str(next_num).zfill(2)}"
-                except Exception:
-                    # Non-fatal: leave Class_S.No blank if computation fails
-                    pass
+                # A failed seed read fails the add rather than writing a blank serial
+                reserved_sno = self._reserve_class_serial(prefix)
+                # Format as PREFIX_XX with zero padding to 2 digits
+                student_data['Class_S.No'] = format_class_serial(prefix, reserved_sno)
+            elif student_class:
+                self._note_class_serial(prefix, class_sno)
 
             # Prepare row data from headers (ensure Class_S.No used)
             row_data = [student_data.get(header, '') for header in self.headers]
 
-            # Add to main sheet (408070227)
-            self.append_row_to_sheet('408070227', row_data)
-
-            # Add to class-specific sheet
+            # Main sheet (408070227) and class-specific sheet go in the same batch
+            if not self.sheet_exists('408070227'):
+                self.setup_main_worksheet()
+            rows_by_sheet = {'408070227': [row_data]}
             if student_class:
-                class_sheet = self.get_or_create_class_sheet(student_class)
-                self.append_row_to_sheet(class_sheet, row_data)
+                rows_by_sheet[self.get_or_create_class_sheet(student_class)] = [row_data]
+
+            try:
+                located = self.append_rows_to_sheets(rows_by_sheet)
+            except Exception:
+                if reserved_sno is not None:
+                    self._release_class_serial(prefix, reserved_sno)
+                raise
+
+            row_numbers = {sheet_name: (located.get(sheet_name) or [None])[0] for sheet_name in rows_by_sheet}
+            for sheet_name in rows_by_sheet:
+                self.gr_index.add(student_data.get('GR#'), sheet_name, row_numbers[sheet_name])
+            self.notify_changes([StudentChange(ADDED, sheet_name, row_numbers[sheet_name],
+                                               values=dict(zip(self.headers, row_data)))
+                                 for sheet_name in rows_by_sheet if is_class_sheet(sheet_name)])
 
             return True
             
         except Exception as e:
             print(f"Error adding student record: {e}")
             return False
-    
+
+    def add_student_records(self, records, chunk_size=500):
+        """Add many student records with a few batched writes.
+
+        Blank Class_S.No values get consecutive serials reserved per class in
+        one step. Each chunk of records goes to the main sheet and the class
+        sheets in a single batchUpdate. Returns {record index: error message}
+        for records whose serials couldn't be reserved or whose chunk failed
+        to write.
+        """
+        if self.store is not None:
+            return self.store.add_student_records(records)
+
+        # Reserve serial numbers one block per class
+        needs_serial = {}
+        for index, record in enumerate(records):
+            prefix = str(record.get('Student Class', '') or '').strip()
+            if not prefix:
+                continue
+            class_sno = record.get('Class_S.No')
+            if not class_sno or str(class_sno).strip() == '':
+                needs_serial.setdefault(prefix, []).append(index)
+            else:
+                self._note_class_serial(prefix, class_sno)
+
+        # One snapshot read seeds every class instead of one column read per class
+        unseeded = [prefix for prefix in needs_serial if not self.serials.is_seeded(prefix)]
+        if len(unseeded) > 1:
+            try:
+                self.load_school_snapshot()
+            except Exception as e:
+                print(f"Error seeding serial numbers from snapshot: {e}")
+
+        failed = {}
+        for prefix, indices in needs_serial.items():
+            try:
+                first = self._reserve_class_serials(prefix, len(indices))
+            except Exception as e:
+                # Not written with blank serials; reported as failed instead
+                print(f"Error reserving serial numbers for class {prefix}: {e}")
+                for index in indices:
+                    failed[index] = str(e)
+                continue
+            for offset, index in enumerate(indices):
+                records[index]['Class_S.No'] = format_class_serial(prefix, first + offset)
+        pending = [index for index in range(len(records)) if index not in failed]
+
+        try:
+            if not self.sheet_exists('408070227'):
+                self.setup_main_worksheet()
+            class_sheets = {}
+            for record in records:
+                student_class = record.get('Student Class', '') or ''
+                if student_class and student_class not in class_sheets:
+                    class_sheets[student_class] = self.get_or_create_class_sheet(student_class)
+        except Exception as e:
+            print(f"Error preparing sheets for bulk add: {e}")
+            return {index: str(e) for index in range(len(records))}
+
+        for start in range(0, len(pending), chunk_size):
+            chunk_indices = pending[start:start + chunk_size]
+            chunk = [records[index] for index in chunk_indices]
+            rows_by_sheet = {'408070227': []}
+            for record in chunk:
+                row_data = [record.get(header, '') for header in self.headers]
+                rows_by_sheet['408070227'].append(row_data)
+                student_class = record.get('Student Class', '') or ''
+                if student_class:
+                    rows_by_sheet.setdefault(class_sheets[student_class], []).append(row_data)
+
+            try:
+                located = self.append_rows_to_sheets(rows_by_sheet)
+            except Exception as e:
+                print(f"Error adding records {chunk_indices[0] + 1}-{chunk_indices[-1] + 1}: {e}")
+                for index in chunk_indices:
+                    failed[index] = str(e)
+                continue
+
+            located = {sheet_name: iter(numbers or ()) for sheet_name, numbers in located.items()}
+            events = []
+            for record in chunk:
+                self.gr_index.add(record.get('GR#'), '408070227')
+                student_class = record.get('Student Class', '') or ''
+                if student_class:
+                    sheet_name = class_sheets[student_class]
+                    row_number = next(located.get(sheet_name, iter(())), None)
+                    self.gr_index.add(record.get('GR#'), sheet_name, row_number)
+                    events.append(StudentChange(ADDED, sheet_name, row_number,
+                                                values={header: record.get(header, '') for header in self.headers}))
+            self.notify_changes(events)
+
+        return failed
+
+    @staticmethod
+    def _row_to_cells(row_data):
+        """Convert a row of values to RowData cells (stored as strings, like RAW input)"""
+        return {
+            'values': [
+                {'userEnteredValue': {'stringValue': str(value)}} if value not in (None, '') else {}
+                for value in row_data
+            ]
+        }
+
+    def append_rows_to_sheets(self, rows_by_sheet):
+        """Append rows to several sheets with a single spreadsheets().batchUpdate call.
+
+        rows_by_sheet maps sheet name -> list of rows. The API applies the batch
+        all-or-nothing, so a failure can't leave one sheet updated and not the other.
+
+        appendCells replies don't say where the rows went, so the same call
+        asks for each class sheet's key column back (responseRanges) and the
+        new rows are taken from its end. Returns class sheet name -> row
+        numbers in rows order, or None where they couldn't be placed.
+        """
+        requests = []
+        response_ranges = []
+        expected = {}
+        for sheet_name, rows in rows_by_sheet.items():
+            sheet_id = self.get_sheet_id(sheet_name)
+            if sheet_id is None:
+                raise ValueError(f"Sheet {sheet_name} not found")
+            requests.append({
+                'appendCells': {
+                    'sheetId': sheet_id,
+                    'rows': [self._row_to_cells(row) for row in rows],
+                    'fields': 'userEnteredValue'
+                }
+            })
+            key = self._key_column(rows) if is_class_sheet(sheet_name) else None
+            if key is not None:
+                expected[sheet_name] = [str(row[key]).strip() for row in rows]
+                response_ranges.append(f'{sheet_name}!{index_to_column(key)}:{index_to_column(key)}')
+
+        if not requests:
+            return {}
+
+        body = {'requests': requests}
+        if response_ranges:
+            body.update(includeSpreadsheetInResponse=True, responseRanges=response_ranges,
+                        responseIncludeGridData=True)
+        try:
+            result = self._execute_request(
+                self.service.spreadsheets().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body=body,
+                    fields='replies,updatedSpreadsheet(sheets(properties(title),'
+                           'data(startRow,rowData(values(userEnteredValue)))))'
+                )
+            )
+        except HttpError as e:
+            print(f"Error appending rows to {', '.join(rows_by_sheet)}: {e}")
+            raise
+
+        located = {sheet_name: None for sheet_name in rows_by_sheet if is_class_sheet(sheet_name)}
+        for sheet in (result or {}).get('updatedSpreadsheet', {}).get('sheets', []):
+            sheet_name = sheet.get('properties', {}).get('title')
+            if sheet_name in expected:
+                located[sheet_name] = self._appended_row_numbers(sheet.get('data', []), expected[sheet_name])
+        return located
+
+    def _key_column(self, rows):
+        """Index of a column set in every row (Class_S.No, else GR#) to find them by, or None"""
+        for header in ('Class_S.No', 'GR#'):
+            index = self.headers.index(header)
+            if all(index < len(row) and str(row[index] or '').strip() for row in rows):
+                return index
+        return None
+
+    @staticmethod
+    def _appended_row_numbers(grid_data, expected):
+        """Row numbers of the last len(expected) filled cells of a one-column GridData, if they match"""
+        filled = []
+        for grid in grid_data:
+            start_row = grid.get('startRow', 0)
+            for offset, row_data in enumerate(grid.get('rowData', [])):
+                cells = row_data.get('values') or [{}]
+                value = next(iter(cells[0].get('userEnteredValue', {}).values()), '')
+                if str(value).strip():
+                    filled.append((start_row + offset + 1, str(value).strip()))
+        tail = filled[-len(expected):]
+        row_numbers = [row_number for row_number, _ in tail]
+        if ([value for _, value in tail] != expected
+                or row_numbers != list(range(row_numbers[0], row_numbers[0] + len(expected)))):
+            return None
+        return row_numbers
+
     def append_row_to_sheet(self, sheet_name, row_data):
         """Append a row to a specific sheet"""
         try:
@@ -382,15 +955,12 @@ class GoogleSheetsDataEntry:
                     range='408070227!A2:R'
                 )
             )
+            self.forget_sheet_tail('408070227')
+            self.gr_index.invalidate()
             
             # Get all class sheets
-            sheet_metadata = self._execute_request(
-                self.service.spreadsheets().get(spreadsheetId=self.spreadsheet_id)
-            )
-            
             all_students = []
-            class_sheets = [sheet['properties']['title'] for sheet in sheet_metadata['sheets'] 
-                          if sheet['properties']['title'].startswith('Class_')]
+            class_sheets = [title for title in self.get_sheet_metadata() if title.startswith('Class_')]
             
             print(f"Found {len(class_sheets)} class sheets to consolidate")
             
@@ -442,6 +1012,9 @@ class GoogleSheetsDataEntry:
     
     def get_all_students(self):
         """Get all students from main sheet"""
+        if self.store is not None:
+            return self.store.get_all_students()
+
         try:
             result = self._execute_request(
                 self.service.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id, range='408070227!A:R')
@@ -470,16 +1043,21 @@ class GoogleSheetsDataEntry:
             print(f"Error getting all students: {e}")
             return []
     
-    def get_class_students(self, class_name):
-        """Get all students from a specific class sheet"""
+    def get_class_students(self, class_name, fields=None):
+        """Get all students from a specific class sheet (only `fields` columns if given)"""
+        if self.store is not None:
+            return self.store.get_class_students(class_name, fields=fields)
+
         try:
             # Convert class name to proper sheet name format
             sheet_name = f'Class_{class_name}' if not class_name.startswith('Class_') else class_name
-            result = self._execute_request(
-                self.service.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id, range=f'{sheet_name}!A:R')
-            )
-            
-            values = result.get('values', [])
+            if fields:
+                values = self.get_sheet_columns(sheet_name, fields)
+            else:
+                result = self._execute_request(
+                    self.service.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id, range=f'{sheet_name}!A:R')
+                )
+                values = result.get('values', [])
             
             if not values:
                 return []
@@ -502,69 +1080,124 @@ class GoogleSheetsDataEntry:
             print(f"Error getting class students: {e}")
             return []
     
-    def update_student_record(self, sheet_name, row_number, student_data):
-        """Update a student record in a specific sheet"""
-        try:
-            # Prepare row data
-            row_data = [student_data.get(header, '') for header in self.headers]
-            
-            # Update the specific row
-            self._execute_request(
-                self.service.spreadsheets().values().update(
-                    spreadsheetId=self.spreadsheet_id,
-                    range=f'{sheet_name}!A{row_number}:R{row_number}',
-                    valueInputOption='RAW',
-                    body={'values': [row_data]}
-                )
-            )
-            
-            return True
-            
-        except HttpError as e:
-            print(f"Error updating student record: {e}")
-            return False
-    
     def delete_student_record(self, sheet_name, row_number):
-        """Delete a student record from a specific sheet"""
-        try:
-            # Get sheet ID
-            sheet_metadata = self._execute_request(
-                self.service.spreadsheets().get(spreadsheetId=self.spreadsheet_id)
-            )
-            
-            sheet_id = None
-            for sheet in sheet_metadata['sheets']:
-                if sheet['properties']['title'] == sheet_name:
-                    sheet_id = sheet['properties']['sheetId']
+        """Delete a student record from a specific sheet (and its row in the main sheet)"""
+        return self.delete_student_records([(sheet_name, row_number)]) is not None
+
+    @staticmethod
+    def _main_sheet_rows_for(targets, gr_columns):
+        """Main sheet rows holding the same students as class sheet rows being deleted.
+
+        gr_columns must be freshly read: another worker's deletes shift every
+        row below them, so row numbers remembered by this worker can point at
+        a different student.
+        """
+        main_column = [normalize_gr(gr) for gr in gr_columns.get('408070227', [])]
+        mirrored = set()
+        for sheet_name, row_number in sorted(targets):
+            column = gr_columns.get(sheet_name, [])
+            if sheet_name == '408070227' or row_number - 2 >= len(column):
+                continue
+            gr_number = normalize_gr(column[row_number - 2])
+            if not gr_number:
+                continue
+            for main_row, main_gr in enumerate(main_column, start=2):
+                location = ('408070227', main_row)
+                if main_gr == gr_number and location not in targets and location not in mirrored:
+                    mirrored.add(location)
                     break
-            
-            if sheet_id is None:
-                return False
-            
-            # Delete the row
-            request_body = {
-                'requests': [{
-                    'deleteDimension': {
-                        'range': {
-                            'sheetId': sheet_id,
-                            'dimension': 'ROWS',
-                            'startIndex': row_number - 1,  # 0-indexed
-                            'endIndex': row_number
-                        }
+        return mirrored
+
+    @staticmethod
+    def _main_sheet_row_with_gr(main_values, gr_number, taken):
+        """Row number of the first main sheet row holding gr_number that isn't in taken, or None"""
+        if not main_values or not gr_number or 'GR#' not in main_values[0]:
+            return None
+        column = main_values[0].index('GR#')
+        for row_number, row in enumerate(main_values[1:], start=2):
+            if len(row) > column and row[column] == gr_number and ('408070227', row_number) not in taken:
+                return row_number
+        return None
+
+    @staticmethod
+    def _delete_row_requests(sheet_id, row_numbers):
+        """deleteDimension requests for rows of one sheet, bottom-up, with adjacent rows merged.
+
+        Deleting from the bottom means earlier deletes never shift the rows
+        that later requests in the same batch refer to.
+        """
+        requests = []
+        for row_number in sorted(row_numbers, reverse=True):
+            if requests and requests[-1]['deleteDimension']['range']['startIndex'] == row_number:
+                requests[-1]['deleteDimension']['range']['startIndex'] = row_number - 1
+                continue
+            requests.append({
+                'deleteDimension': {
+                    'range': {
+                        'sheetId': sheet_id,
+                        'dimension': 'ROWS',
+                        'startIndex': row_number - 1,  # 0-indexed
+                        'endIndex': row_number
                     }
-                }]
-            }
-            
-            self._execute_request(
-                self.service.spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id, body=request_body)
-            )
-            
-            return True
-            
+                }
+            })
+        return requests
+
+    def delete_student_records(self, locations):
+        """Delete several (sheet_name, row_number) rows with one batchUpdate.
+
+        Class sheet rows are also deleted from the main sheet (408070227),
+        matched by GR# against the sheets as they are now. Row numbers refer
+        to the sheets before any of the deletes. Returns the sorted list of
+        rows deleted (main sheet rows included), or None on failure.
+        """
+        if self.store is not None:
+            return self.store.delete_student_records(locations)
+
+        try:
+            targets = {(sheet_name, int(row_number)) for sheet_name, row_number in locations}
+            if any(row_number < 2 for _, row_number in targets):
+                print("Refusing to delete a header row")
+                return None
+            # Current GR# columns (one batchGet) find the main sheet rows; the index may be behind
+            gr_columns = self.read_gr_columns(sorted({sheet_name for sheet_name, _ in targets} | {'408070227'}))
+            for sheet_name, column in gr_columns.items():
+                self.gr_index.replace_sheet(sheet_name, column)
+            targets |= self._main_sheet_rows_for(targets, gr_columns)
+
+            rows_by_sheet = {}
+            for sheet_name, row_number in targets:
+                rows_by_sheet.setdefault(sheet_name, []).append(row_number)
+
+            requests = []
+            for sheet_name, row_numbers in rows_by_sheet.items():
+                sheet_id = self.get_sheet_id(sheet_name)
+                if sheet_id is None:
+                    print(f"Sheet {sheet_name} not found")
+                    return None
+                requests.extend(self._delete_row_requests(sheet_id, row_numbers))
+
+            if requests:
+                self._execute_request(
+                    self.service.spreadsheets().batchUpdate(
+                        spreadsheetId=self.spreadsheet_id,
+                        body={'requests': requests}
+                    )
+                )
+            # Grid row counts changed
+            self.invalidate_sheet_metadata()
+            for sheet_name, row_numbers in rows_by_sheet.items():
+                self.forget_sheet_tail(sheet_name)
+                for row_number in sorted(row_numbers, reverse=True):
+                    self.gr_index.delete_row(sheet_name, row_number)
+            self.notify_changes(deletion_events(targets))
+
+            return sorted(targets)
+
         except HttpError as e:
-            print(f"Error deleting student record: {e}")
-            return False
-    
+            print(f"Error deleting student records: {e}")
+            return None
+
     def get_total_students(self):
         """Get total number of students with fallback to class sheets if main sheet fails"""
         try:
@@ -599,65 +1232,58 @@ class GoogleSheetsDataEntry:
     
     def get_class_student_count(self, class_name, max_retries=3):
         """Get count of students in a specific class with retry logic"""
-        for attempt in range(max_retries):
-            try:
-                sheet_name = f'Class_{class_name}' if not class_name.startswith('Class_') else class_name
-                
-                # First check if sheet exists
-                sheet_metadata = self._execute_request(
-                    self.service.spreadsheets().get(spreadsheetId=self.spreadsheet_id)
-                )
-                
-                sheet_exists = any(
-                    sheet['properties']['title'] == sheet_name 
-                    for sheet in sheet_metadata.get('sheets', [])
-                )
-                
-                if not sheet_exists:
-                    print(f"Sheet not found for class {class_name}")
-                    return 0
-                
-                # Get the data with retry-wrapped execute
-                result = self._execute_request(
-                    self.service.spreadsheets().values().get(
-                        spreadsheetId=self.spreadsheet_id,
-                        range=f'{sheet_name}!A:A'
-                    )
-                )
-                
-                values = result.get('values', [])
-                
-                if not values:
-                    return 0
-                
-                # Count non-empty rows (excluding header)
-                count = sum(1 for row in values[1:] if row and row[0])
-                return count
-                
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"Attempt {attempt + 1} failed for {class_name}: {e}, retrying...")
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                    continue
-                print(f"Error getting student count for {class_name} after {max_retries} attempts: {e}")
+        if self.store is not None:
+            return self.store.get_class_student_count(class_name)
+
+        try:
+            sheet_name = f'Class_{class_name}' if not class_name.startswith('Class_') else class_name
+            
+            # First check if sheet exists (cached metadata)
+            if sheet_name not in self.get_sheet_metadata():
+                print(f"Sheet not found for class {class_name}")
                 return 0
-        return 0  # All retries failed
+            
+            # _execute_request already retries transient errors (and stops when the circuit opens)
+            result = self._execute_request(
+                self.service.spreadsheets().values().get(
+                    spreadsheetId=self.spreadsheet_id,
+                    range=f'{sheet_name}!A:A'
+                ),
+                max_retries=max_retries
+            )
+            
+            values = result.get('values', [])
+            
+            if not values:
+                return 0
+            
+            # Count non-empty rows (excluding header)
+            count = sum(1 for row in values[1:] if row and row[0])
+            return count
+            
+        except (HttpError, CircuitOpenError):
+            raise  # An outage isn't an empty class
+        except Exception as e:
+            print(f"Error getting student count for {class_name}: {e}")
+            return 0
     
     def get_class_gender_count(self, class_name, gender):
         """Get count of students by gender in a specific class"""
+        if self.store is not None:
+            return self.store.get_class_gender_count(class_name, gender)
+
         try:
             sheet_name = f'Class_{class_name}' if not class_name.startswith('Class_') else class_name
             
             if not self.sheet_exists(sheet_name):
                 return 0
             
-            sheet_data = self.get_sheet_data(sheet_name)
+            # Only the Gender column is needed
+            sheet_data = self.get_sheet_data(sheet_name, fields=['Gender'])
             if not sheet_data or len(sheet_data) <= 1:
                 return 0
             
-            headers = sheet_data[0]
-            header_indices = {header: idx for idx, header in enumerate(headers)}
-            gender_index = header_indices.get('Gender', 4)
+            gender_index = 0
             
             gender_count = 0
             for row_data in sheet_data[1:]:
@@ -666,47 +1292,56 @@ class GoogleSheetsDataEntry:
                         gender_count += 1
                         
             return gender_count
+        except (HttpError, CircuitOpenError):
+            raise  # An outage isn't an empty class
         except Exception as e:
             print(f"Error getting gender count for {class_name}: {e}")
             return 0
     
     def get_class_section_count(self, class_name, section):
         """Get count of students by section in a specific class"""
-        students = self.get_class_students(class_name)
+        students = self.get_class_students(class_name, fields=['Class Section'])
         section_count = 0
         
         for student in students:
-            if len(student) > 14 and student[14].strip().lower() == section.lower():
+            if student.get('Class Section', '').strip().lower() == section.lower():
                 section_count += 1
                 
         return section_count
     
     def sheet_exists(self, sheet_name):
-        """Check if a sheet exists in the spreadsheet"""
-        try:
-            sheet_metadata = self._execute_request(
-                self.service.spreadsheets().get(spreadsheetId=self.spreadsheet_id)
-            )
-            
-            sheet_names = [sheet['properties']['title'] for sheet in sheet_metadata['sheets']]
-            return sheet_name in sheet_names
-            
-        except HttpError as e:
-            print(f"Error checking if sheet exists: {e}")
-            return False
+        """Check if a sheet exists in the spreadsheet.
+
+        Sheets errors propagate: an outage must not look like a missing sheet,
+        or cache loaders would store it as an empty roster.
+        """
+        if self.store is not None:
+            return self.store.sheet_exists(sheet_name)
+
+        return sheet_name in self.get_sheet_metadata()
     
-    def get_sheet_data(self, sheet_name, range_spec='A:R'):
-        """Get data from a specific sheet"""
-        try:
-            result = self._execute_request(
-                self.service.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id, range=f'{sheet_name}!{range_spec}')
-            )
+    def get_sheet_data(self, sheet_name, range_spec='A:R', fields=None):
+        """Get data from a specific sheet.
 
-            return result.get('values', [])
+        fields: optional header names (e.g. ['Gender', 'Class Section']); only
+        those columns are fetched and the header row becomes `fields`.
+        Sheets errors (HttpError, CircuitOpenError) propagate to the caller.
+        """
+        if self.store is not None:
+            return self.store.get_sheet_data(sheet_name, range_spec, fields=fields)
 
-        except HttpError as e:
-            print(f"Error getting sheet data: {e}")
-            return []
+        if fields:
+            return self.get_sheet_columns(sheet_name, fields)
+
+        if range_spec == 'A:R':
+            # Whole-sheet reads go through the incremental tail sync
+            return self.load_sheet_values([sheet_name]).get(sheet_name, [])
+
+        result = self._execute_request(
+            self.service.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id, range=f'{sheet_name}!{range_spec}')
+        )
+
+        return result.get('values', [])
     
     def validate_input(self, field_name, value):
         """Validate input fields"""
@@ -744,94 +1379,281 @@ class GoogleSheetsDataEntry:
         
         return cnic_number
     
-    def get_class_wise_data(self, use_cache=True):
-        """Get data overview for all classes with caching and retry logic"""
-        try:
-            # First try to get all data in one batch request
-            batch_request = self.service.spreadsheets().get(
+    # Rows re-read from the end of a known sheet to detect edits and deletes
+    TAIL_OVERLAP_ROWS = 3
+
+    @staticmethod
+    def rows_fingerprint(rows):
+        """Stable hash of a list of rows"""
+        return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _remember_tail(self, sheet_name, values, full_at):
+        overlap = values[-self.TAIL_OVERLAP_ROWS:]
+        with self._tail_lock:
+            self._sheet_tails[sheet_name] = {
+                'values': values,
+                'fingerprint': self.rows_fingerprint(overlap),
+                'full_at': full_at,
+            }
+
+    def forget_sheet_tail(self, sheet_name=None):
+        """Force the next load of a sheet (or of all sheets) to be a full read"""
+        with self._tail_lock:
+            if sheet_name is None:
+                self._sheet_tails.clear()
+            else:
+                self._sheet_tails.pop(sheet_name, None)
+
+    def load_sheet_values(self, sheet_names, incremental=None):
+        """Whole-sheet values (header row first) for the named sheets that exist"""
+        if self.store is not None:
+            return self.store.load_sheet_values(sheet_names)
+
+        return self.fetch_sheet_values(sheet_names, incremental=incremental)
+
+    def fetch_sheet_values(self, sheet_names, incremental=None):
+        """Read whole sheets (A:R) from Google Sheets with a single values().batchGet request.
+
+        Returns sheet name -> list of rows including the header row. Sheets that
+        don't exist are left out.
+
+        With incremental sync, a sheet read before is fetched from its last
+        TAIL_OVERLAP_ROWS rows onward. If those rows still match the remembered
+        fingerprint, only the new rows are appended; otherwise (an edit or
+        delete near the end) the sheet is read in full again. Every sheet is
+        also fully re-read after SHEETS_FULL_SYNC_SECONDS.
+
+        incremental=False forces a full read (which also resets the remembered
+        tails), for callers that must see edits anywhere in the sheets.
+        """
+        if incremental is None:
+            incremental = self.incremental_sync
+
+        existing_sheets = self.get_sheet_metadata()
+        present = [name for name in sheet_names if name in existing_sheets]
+        if not present:
+            return {}
+
+        now = time.time()
+        tails = {}
+        if incremental:
+            with self._tail_lock:
+                for name in present:
+                    tail = self._sheet_tails.get(name)
+                    if tail and tail['values'] and now - tail['full_at'] < self.full_sync_interval:
+                        tails[name] = tail
+
+        def tail_start(tail):
+            # 1-based sheet row of the first overlap row
+            return max(1, len(tail['values']) - self.TAIL_OVERLAP_ROWS + 1)
+
+        result = self._execute_request(
+            self.service.spreadsheets().values().batchGet(
                 spreadsheetId=self.spreadsheet_id,
-                ranges=['Class_ECE!A:R', 'Class_I!A:R', 'Class_II!A:R', 'Class_III!A:R',
-                       'Class_IV!A:R', 'Class_V!A:R', 'Class_VI!A:R', 'Class_VII!A:R',
-                       'Class_VIII!A:R', 'Class_IX!A:R', 'Class_X!A:R'],
-                includeGridData=False
+                ranges=[f'{name}!A{tail_start(tails[name])}:R' if name in tails else f'{name}!A:R'
+                        for name in present]
             )
-            
-            # Execute with retry wrapper
-            sheet_metadata = self._execute_request(batch_request)
-            
-            class_data = []
-            classes = ['ECE', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
-            
-            for class_name in classes:
-                try:
-                    # Get counts with retries
-                    student_count = self.get_class_student_count(class_name)
-                    male_count = self.get_class_gender_count(class_name, 'Male')
-                    female_count = self.get_class_gender_count(class_name, 'Female')
-                    
-                    class_data.append({
-                        'name': class_name,
-                        'total_students': student_count,
-                        'male_students': male_count,
-                        'female_students': female_count
-                    })
-                except Exception as e:
-                    print(f"Warning: Error getting data for class {class_name}: {e}")
-                    # Add empty data for this class
-                    class_data.append({
-                        'name': class_name,
-                        'total_students': 0,
-                        'male_students': 0,
-                        'female_students': 0
-                    })
-            
-            return class_data
-            
+        )
+
+        # valueRanges come back in request order
+        values_by_sheet = {}
+        reload = []
+        for name, value_range in zip(present, result.get('valueRanges', [])):
+            fetched = value_range.get('values', [])
+            tail = tails.get(name)
+            if tail is None:
+                values_by_sheet[name] = fetched
+                continue
+
+            known = tail['values']
+            overlap = len(known) - tail_start(tail) + 1
+            if self.rows_fingerprint(fetched[:overlap]) != tail['fingerprint']:
+                reload.append(name)
+                continue
+            values_by_sheet[name] = known + fetched[overlap:]
+
+        if reload:
+            print(f"🔄 Full reload after edits in: {', '.join(reload)}")
+            result = self._execute_request(
+                self.service.spreadsheets().values().batchGet(
+                    spreadsheetId=self.spreadsheet_id,
+                    ranges=[f'{name}!A:R' for name in reload]
+                )
+            )
+            for name, value_range in zip(reload, result.get('valueRanges', [])):
+                values_by_sheet[name] = value_range.get('values', [])
+
+        for name, values in values_by_sheet.items():
+            if values:
+                self.remember_headers(name, values[0])
+            if self.incremental_sync:
+                incremental_read = name in tails and name not in reload
+                self._remember_tail(name, values, tails[name]['full_at'] if incremental_read else now)
+
+        # Callers pad rows in place; keep the remembered values untouched
+        return {name: [list(row) for row in values] for name, values in values_by_sheet.items()}
+
+    def load_school_snapshot(self, incremental=None):
+        """Read every class sheet with a single values().batchGet request.
+
+        Returns a dict keyed by class name, each with 'headers' and 'rows'. Rows
+        keep their sheet order (row_number = index + 2) and are padded to the
+        header length. Classes without a sheet get an empty row list.
+        incremental=False skips the tail sync (see fetch_sheet_values).
+        """
+        if self.store is not None:
+            return self.store.load_school_snapshot()
+
+        snapshot = {class_name: {'headers': list(self.headers), 'rows': []} for class_name in CLASS_NAMES}
+        values_by_sheet = self.load_sheet_values([f'Class_{c}' for c in CLASS_NAMES], incremental=incremental)
+
+        for class_name in CLASS_NAMES:
+            values = values_by_sheet.get(f'Class_{class_name}', [])
+            self.seed_class_serial(class_name, values[1:])
+            if not values:
+                continue
+
+            headers = values[0]
+            rows = []
+            for row in values[1:]:
+                if len(row) < len(headers):
+                    row = row + [''] * (len(headers) - len(row))
+                rows.append(row)
+
+            snapshot[class_name] = {'headers': headers, 'rows': rows}
+            if 'GR#' in headers:
+                gr_idx = headers.index('GR#')
+                self.gr_index.replace_sheet(f'Class_{class_name}', [row[gr_idx] for row in rows])
+
+        return snapshot
+
+    def summarize_snapshot(self, snapshot):
+        """Per-class totals, gender counts and next serial number from a snapshot"""
+        class_data = []
+        for class_name in CLASS_NAMES:
+            sheet = snapshot.get(class_name) or {'headers': self.headers, 'rows': []}
+            header_indices = {header: idx for idx, header in enumerate(sheet['headers'])}
+            gender_index = header_indices.get('Gender', 4)
+
+            total = male = female = 0
+            for row in sheet['rows']:
+                if row and row[0]:
+                    total += 1
+                gender = row[gender_index].strip().lower() if len(row) > gender_index and row[gender_index] else ''
+                if gender == 'male':
+                    male += 1
+                elif gender == 'female':
+                    female += 1
+
+            class_data.append({
+                'name': class_name,
+                'total_students': total,
+                'male_students': male,
+                'female_students': female,
+                'next_sno': max_class_serial(class_name, [row[0] for row in sheet['rows'] if row]) + 1
+            })
+
+        return class_data
+
+    def get_class_wise_data(self, use_cache=True):
+        """Get data overview for all classes from a single batchGet snapshot"""
+        try:
+            return self.summarize_snapshot(self.load_school_snapshot())
+
         except Exception as e:
             print(f"Error getting class-wise data: {e}")
-            return [{'name': c, 'total_students': 0, 'male_students': 0, 'female_students': 0} 
-                   for c in ['ECE', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']]
+            return [{'name': c, 'total_students': 0, 'male_students': 0, 'female_students': 0, 'next_sno': 1}
+                   for c in CLASS_NAMES]
 
     def update_student_record(self, sheet_name, row_number, student_data):
         """Update a student record in the specified sheet"""
+        return self.update_student_records([(sheet_name, row_number, student_data)])
+
+    def _build_updated_row(self, headers, student_data):
+        """Full row for an edit; fields left out of student_data are cleared"""
+        header_indices = {header: idx for idx, header in enumerate(headers)}
+        updated_row = [''] * len(headers)
+
+        # Map student data to the correct columns
+        for field, value in student_data.items():
+            if field in header_indices:
+                col_index = header_indices[field]
+                # Format CNIC fields
+                if 'CNIC' in field and value:
+                    value = self.format_cnic(value)
+                updated_row[col_index] = str(value) if value else ''
+        return updated_row
+
+    def update_student_records(self, updates):
+        """Rewrite several student rows with one batchUpdate.
+
+        updates: list of (sheet_name, row_number, student_data). Class sheet
+        edits are mirrored to the main sheet row holding the pre-edit GR# in
+        the same batch, so later deletes (which match by GR#) still find it.
+        Returns True only if every row exists and the batch was written.
+        """
+        if self.store is not None:
+            return self.store.update_student_records(updates)
+
         try:
-            # Get current sheet data
-            sheet_data = self.get_sheet_data(sheet_name)
-            if not sheet_data or len(sheet_data) < row_number:
-                print(f"Row {row_number} not found in sheet {sheet_name}")
-                return False
-            
-            # Get headers
-            headers = sheet_data[0]
-            header_indices = {header: idx for idx, header in enumerate(headers)}
-            
-            # Prepare the updated row
-            updated_row = [''] * len(headers)
-            
-            # Map student data to the correct columns
-            for field, value in student_data.items():
-                if field in header_indices:
-                    col_index = header_indices[field]
-                    # Format CNIC fields
-                    if 'CNIC' in field and value:
-                        value = self.format_cnic(value)
-                    updated_row[col_index] = str(value) if value else ''
-            
-            # Update the row in Google Sheets
-            range_name = f'{sheet_name}!A{row_number}:R{row_number}'
-            
-            self.service.spreadsheets().values().update(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_name,
-                valueInputOption='RAW',
-                body={'values': [updated_row]}
-            ).execute()
-            
-            print(f"Successfully updated student record in {sheet_name} at row {row_number}")
+            # Current values (tail-synced) give the headers, confirm the rows exist
+            # and locate the main sheet copies
+            sheet_names = {sheet_name for sheet_name, _, _ in updates}
+            if self.sheet_exists('408070227'):
+                sheet_names.add('408070227')
+            sheet_values = self.fetch_sheet_values(sorted(sheet_names))
+
+            writes = []
+            events = []
+            for sheet_name, row_number, student_data in updates:
+                values = sheet_values.get(sheet_name)
+                if not values or row_number < 2 or len(values) < row_number:
+                    print(f"Row {row_number} not found in sheet {sheet_name}")
+                    return False
+                updated_row = self._build_updated_row(values[0], student_data)
+                writes.append((sheet_name, row_number, updated_row))
+                if is_class_sheet(sheet_name):
+                    old_values = dict(zip(values[0], values[row_number - 1]))
+                    events.append(StudentChange(UPDATED, sheet_name, row_number,
+                                                values=dict(zip(values[0], updated_row)),
+                                                old_values=old_values))
+                    main_values = sheet_values.get('408070227')
+                    main_row = self._main_sheet_row_with_gr(main_values, old_values.get('GR#'),
+                                                            {(name, row) for name, row, _ in writes})
+                    if main_row:
+                        writes.append(('408070227', main_row, self._build_updated_row(
+                            main_values[0], dict(zip(values[0], updated_row)))))
+
+            requests = [{
+                'updateCells': {
+                    'start': {'sheetId': self.get_sheet_id(sheet_name), 'rowIndex': row_number - 1,
+                              'columnIndex': 0},
+                    'rows': [self._row_to_cells(updated_row)],
+                    'fields': 'userEnteredValue'
+                }
+            } for sheet_name, row_number, updated_row in writes]
+
+            if requests:
+                self._execute_request(
+                    self.service.spreadsheets().batchUpdate(
+                        spreadsheetId=self.spreadsheet_id,
+                        body={'requests': requests}
+                    )
+                )
+
+            for sheet_name, row_number, updated_row in writes:
+                # In-place edits aren't visible to the tail fingerprint
+                self.forget_sheet_tail(sheet_name)
+                # The row is rewritten in full, so a missing GR# leaves the cell blank
+                headers = sheet_values[sheet_name][0]
+                self.gr_index.update(sheet_name, row_number, dict(zip(headers, updated_row)).get('GR#'))
+            self.notify_changes(events)
+
+            print(f"Successfully updated {len(updates)} student record(s)")
             return True
-            
+
         except Exception as e:
-            print(f"Error updating student record: {e}")
+            print(f"Error updating student records: {e}")
             return False
 
 def main():
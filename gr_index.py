@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+In-memory GR# identity index.
+
+Maps every GR number to the (sheet name, row number) locations holding it, so
+duplicate checks and record lookups are a dict hit instead of a download of
+the whole GR# column. The index is built from one batchGet of the GR#
+columns, refreshed from school snapshots, kept current on add/edit/delete and
+rebuilt once it is older than its TTL.
+"""
+
+import math
+import hashlib
+import threading
+import time
+
+
+def normalize_gr(gr_number):
+    """GR numbers compare as trimmed strings"""
+    return str(gr_number).strip() if gr_number is not None else ''
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter for fast negative membership checks"""
+
+    def __init__(self, capacity=10000, error_rate=0.01):
+        # Standard sizing: m = -n ln p / (ln 2)^2, k = m/n ln 2
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos // 8] |= 1 << (pos % 8)
+
+    def might_contain(self, key):
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(key))
+
+
+class GRIndex:
+    """GR# -> set of (sheet_name, row_number); row_number is None when not yet known"""
+
+    def __init__(self, ttl=600, use_bloom=False):
+        self.ttl = ttl
+        self.use_bloom = use_bloom
+        self.built_at = 0
+        self._locations = {}
+        self._by_location = {}
+        self._bloom = None
+        self._lock = threading.RLock()
+
+    def is_stale(self):
+        return time.time() - self.built_at >= self.ttl
+
+    def invalidate(self):
+        """Force a rebuild on next use"""
+        with self._lock:
+            self.built_at = 0
+
+    def build(self, gr_columns):
+        """Replace the whole index.
+
+        gr_columns: sheet name -> list of GR# cells, one per data row (row 2 first).
+        """
+        with self._lock:
+            self._locations = {}
+            self._by_location = {}
+            self._bloom = BloomFilter(max(1000, 2 * sum(len(c) for c in gr_columns.values()))) \
+                if self.use_bloom else None
+            for sheet_name, column in gr_columns.items():
+                self._load_sheet(sheet_name, column)
+            self.built_at = time.time()
+
+    def replace_sheet(self, sheet_name, column):
+        """Refresh one sheet's entries (e.g. from a freshly loaded snapshot)"""
+        with self._lock:
+            self._drop_sheet(sheet_name)
+            self._load_sheet(sheet_name, column)
+
+    def _load_sheet(self, sheet_name, column):
+        for offset, gr in enumerate(column):
+            self._put(normalize_gr(gr), sheet_name, offset + 2)
+
+    def _drop_sheet(self, sheet_name):
+        for location in [loc for loc in self._by_location if loc[0] == sheet_name]:
+            self._discard(location)
+        # Appends recorded without a row number
+        for gr in list(self._locations):
+            self._locations[gr].discard((sheet_name, None))
+            if not self._locations[gr]:
+                del self._locations[gr]
+
+    def _put(self, gr, sheet_name, row_number):
+        if not gr:
+            return
+        location = (sheet_name, row_number)
+        if row_number is not None:
+            self._discard(location)
+            self._by_location[location] = gr
+        self._locations.setdefault(gr, set()).add(location)
+        if self._bloom is not None:
+            self._bloom.add(gr)
+
+    def _discard(self, location):
+        gr = self._by_location.pop(location, None)
+        if gr is None:
+            return
+        locations = self._locations.get(gr)
+        if locations is not None:
+            locations.discard(location)
+            if not locations:
+                del self._locations[gr]
+
+    def contains(self, gr_number):
+        gr = normalize_gr(gr_number)
+        if not gr:
+            return False
+        with self._lock:
+            if self._bloom is not None and not self._bloom.might_contain(gr):
+                return False
+            return gr in self._locations
+
+    def lookup(self, gr_number):
+        """Locations holding gr_number, sorted (unknown row numbers last)"""
+        with self._lock:
+            locations = self._locations.get(normalize_gr(gr_number), ())
+            return sorted(locations, key=lambda loc: (loc[0], loc[1] is None, loc[1] or 0))
+
+    def has_unplaced_rows(self, sheet_names):
+        """True if any of the sheets has appended rows whose row number isn't known yet"""
+        with self._lock:
+            return any(loc[1] is None and loc[0] in sheet_names
+                       for locations in self._locations.values() for loc in locations)
+
+    def last_row(self, sheet_name):
+        """Highest row number known to hold a GR in sheet_name, or 0"""
+        with self._lock:
+            return max((loc[1] for loc in self._by_location if loc[0] == sheet_name), default=0)
+
+    def gr_at(self, sheet_name, row_number):
+        with self._lock:
+            return self._by_location.get((sheet_name, row_number))
+
+    def add(self, gr_number, sheet_name, row_number=None):
+        """Record a new row; pass row_number=None for appends whose row isn't known"""
+        with self._lock:
+            self._put(normalize_gr(gr_number), sheet_name, row_number)
+
+    def update(self, sheet_name, row_number, gr_number):
+        """The row at (sheet_name, row_number) now holds gr_number"""
+        with self._lock:
+            self._discard((sheet_name, row_number))
+            self._put(normalize_gr(gr_number), sheet_name, row_number)
+
+    def delete_row(self, sheet_name, row_number):
+        """A row was deleted; rows below it move up by one"""
+        with self._lock:
+            self._discard((sheet_name, row_number))
+            moved = sorted(loc for loc in self._by_location
+                           if loc[0] == sheet_name and loc[1] > row_number)
+            for location in moved:
+                gr = self._by_location[location]
+                self._discard(location)
+                self._put(gr, sheet_name, location[1] - 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'gr_numbers': len(self._locations),
+                'rows': len(self._by_location),
+                'age_seconds': round(time.time() - self.built_at, 1) if self.built_at else None,
+                'bloom': self._bloom is not None,
+            }
@@ -0,0 +1,651 @@
+#!/usr/bin/env python3
+"""
+Local SQLite Student Store
+Keeps a local copy of the main sheet and class sheets in SQLite so reads and
+writes don't wait on Google Sheets. Every local write is queued in the same
+transaction and pushed to the spreadsheet in batches by SheetsMirror.
+
+Enable with STUDENT_STORE=sqlite. The database path is LOCAL_STORE_PATH
+(default students.db) and MIRROR_INTERVAL controls how often queued changes
+are pushed (default 2 seconds).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import atexit
+import threading
+from contextlib import contextmanager
+from googleapiclient.errors import HttpError
+from rate_limiter import priority, BACKGROUND
+from google_sheets_data_entry import CLASS_NAMES, parse_a1_range, project_rows
+from serial_allocator import format_class_serial, max_class_serial
+from change_events import StudentChange, ADDED, UPDATED, deletion_events
+
+MAIN_SHEET = '408070227'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheet_headers (
+    sheet_name TEXT PRIMARY KEY,
+    headers TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    sheet_name TEXT NOT NULL,
+    row_number INTEGER NOT NULL,
+    class_sno TEXT NOT NULL DEFAULT '',
+    gr_number TEXT NOT NULL DEFAULT '',
+    gender_key TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    PRIMARY KEY (sheet_name, row_number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sheet_rows_gr ON sheet_rows (gr_number, sheet_name);
+CREATE INDEX IF NOT EXISTS idx_sheet_rows_gender ON sheet_rows (sheet_name, gender_key);
+CREATE TABLE IF NOT EXISTS mirror_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    row_number INTEGER,
+    data TEXT,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _normalize_row(row):
+    """Cells as strings with trailing empty cells trimmed (how Sheets returns them)"""
+    cells = ['' if value is None else str(value) for value in row]
+    while cells and cells[-1] == '':
+        cells.pop()
+    return cells
+
+
+class LocalStudentStore:
+    """SQLite-backed implementation of GoogleSheetsDataEntry's student methods.
+
+    Rows are stored per sheet with their spreadsheet row numbers, so
+    (sheet_name, row_number) references used by the web UI stay valid.
+    """
+
+    def __init__(self, data_entry, db_path=None):
+        self.data_entry = data_entry
+        self.db_path = db_path or os.environ.get('LOCAL_STORE_PATH', 'students.db')
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+        self.mirror = SheetsMirror(self, data_entry)
+
+    def _connect(self):
+        """Per-thread connection, reopened after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that holds the database write lock from the start"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    # ----- Loading from Google Sheets -----
+
+    def hydrate(self, values_by_sheet):
+        """Replace local rows with values read from the spreadsheet.
+
+        Skipped (returns False) while local changes are still waiting to be
+        mirrored, so unpushed writes are never overwritten.
+        """
+        with self._transaction() as conn:
+            if conn.execute('SELECT COUNT(*) FROM mirror_queue').fetchone()[0]:
+                return False
+
+            conn.execute('DELETE FROM sheet_rows')
+            conn.execute('DELETE FROM sheet_headers')
+            for sheet_name, values in values_by_sheet.items():
+                headers = values[0] if values else list(self.data_entry.headers)
+                conn.execute('INSERT INTO sheet_headers (sheet_name, headers) VALUES (?, ?)',
+                             (sheet_name, json.dumps(headers)))
+                for row_number, row in enumerate(values[1:], start=2):
+                    self._put_row(conn, sheet_name, headers, row_number, row)
+
+            conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('hydrated_at', ?)",
+                         (str(time.time()),))
+        return True
+
+    def refresh_from_sheets(self):
+        """Flush pending changes, then reload every student sheet with one batchGet"""
+        self.mirror.flush()
+        sheet_names = [MAIN_SHEET] + [f'Class_{c}' for c in CLASS_NAMES]
+        if self.hydrate(self.data_entry.fetch_sheet_values(sheet_names, incremental=False)):
+            print(f"✅ Local store loaded from Google Sheets ({self.db_path})")
+            return True
+        print("⚠️ Local store has unmirrored changes; keeping local data")
+        return False
+
+    # ----- Row helpers -----
+
+    def _headers(self, conn, sheet_name):
+        row = conn.execute('SELECT headers FROM sheet_headers WHERE sheet_name = ?', (sheet_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put_row(self, conn, sheet_name, headers, row_number, row):
+        cells = _normalize_row(row)
+        gender_index = headers.index('Gender') if 'Gender' in headers else 4
+        conn.execute(
+            'INSERT OR REPLACE INTO sheet_rows '
+            '(sheet_name, row_number, class_sno, gr_number, gender_key, data) VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                sheet_name,
+                row_number,
+                cells[0] if len(cells) > 0 else '',
+                cells[1] if len(cells) > 1 else '',
+                cells[gender_index].strip().lower() if len(cells) > gender_index else '',
+                json.dumps(cells)
+            )
+        )
+        return cells
+
+    def _enqueue(self, conn, op, sheet_name, row_number=None, data=None):
+        conn.execute(
+            'INSERT INTO mirror_queue (op, sheet_name, row_number, data, created_at) VALUES (?, ?, ?, ?, ?)',
+            (op, sheet_name, row_number, json.dumps(data) if data is not None else None, time.time())
+        )
+
+    def _ensure_sheet(self, conn, sheet_name):
+        headers = self._headers(conn, sheet_name)
+        if headers is None:
+            headers = list(self.data_entry.headers)
+            conn.execute('INSERT INTO sheet_headers (sheet_name, headers) VALUES (?, ?)',
+                         (sheet_name, json.dumps(headers)))
+            self._enqueue(conn, 'add_sheet', sheet_name, data=headers)
+        return headers
+
+    def _append_row(self, conn, sheet_name, row):
+        """Append after the last non-empty row, like appendCells does"""
+        headers = self._ensure_sheet(conn, sheet_name)
+        last = conn.execute(
+            "SELECT MAX(row_number) FROM sheet_rows WHERE sheet_name = ? AND data != '[]'", (sheet_name,)
+        ).fetchone()[0]
+        row_number = (last or 1) + 1
+        cells = self._put_row(conn, sheet_name, headers, row_number, row)
+        self._enqueue(conn, 'append', sheet_name, row_number, cells)
+        return row_number
+
+    def _sheet_values(self, conn, sheet_name):
+        """Header row plus data rows, with blank rows kept so indexes match row numbers"""
+        headers = self._headers(conn, sheet_name)
+        if headers is None:
+            return []
+        values = [headers]
+        for row_number, data in conn.execute(
+                'SELECT row_number, data FROM sheet_rows WHERE sheet_name = ? ORDER BY row_number', (sheet_name,)):
+            while len(values) < row_number - 1:
+                values.append([])
+            values.append(json.loads(data))
+        while len(values) > 1 and not values[-1]:
+            values.pop()
+        return values
+
+    @staticmethod
+    def _sheet_name(class_name):
+        return f'Class_{class_name}' if not class_name.startswith('Class_') else class_name
+
+    # ----- GoogleSheetsDataEntry methods -----
+
+    def sheet_exists(self, sheet_name):
+        return self._headers(self._connect(), sheet_name) is not None
+
+    def get_or_create_class_sheet(self, student_class):
+        sheet_name = self._sheet_name(student_class)
+        if self.sheet_exists(sheet_name):
+            return sheet_name
+        with self._transaction() as conn:
+            self._ensure_sheet(conn, sheet_name)
+        self.mirror.notify()
+        return sheet_name
+
+    def get_sheet_data(self, sheet_name, range_spec='A:R', fields=None):
+        values = self._sheet_values(self._connect(), sheet_name)
+        if fields:
+            return project_rows(values, fields)
+        _, start_row, start_col, end_row, end_col = parse_a1_range(f'{sheet_name}!{range_spec}')
+        rows = values[start_row:] if end_row is None else values[start_row:end_row + 1]
+        result = [_normalize_row(row[start_col:] if end_col is None else row[start_col:end_col + 1])
+                  for row in rows]
+        while result and not result[-1]:
+            result.pop()
+        return result
+
+    def load_sheet_values(self, sheet_names):
+        conn = self._connect()
+        existing = {name for (name,) in conn.execute('SELECT sheet_name FROM sheet_headers')}
+        return {name: self._sheet_values(conn, name) for name in sheet_names if name in existing}
+
+    def get_all_students(self):
+        return self._as_dicts(self._sheet_values(self._connect(), MAIN_SHEET))
+
+    def get_class_students(self, class_name, fields=None):
+        values = self._sheet_values(self._connect(), self._sheet_name(class_name))
+        return self._as_dicts(project_rows(values, fields) if fields else values)
+
+    @staticmethod
+    def _as_dicts(values):
+        if not values:
+            return []
+        headers = values[0]
+        return [dict(zip(headers, row + [''] * (len(headers) - len(row)))) for row in values[1:]]
+
+    def check_duplicate_gr(self, gr_number):
+        row = self._connect().execute(
+            'SELECT 1 FROM sheet_rows WHERE gr_number = ? AND sheet_name = ? LIMIT 1', (gr_number, MAIN_SHEET)
+        ).fetchone()
+        return row is not None
+
+    def get_class_student_count(self, class_name, max_retries=3):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM sheet_rows WHERE sheet_name = ? AND class_sno != ''",
+            (self._sheet_name(class_name),)
+        ).fetchone()[0]
+
+    def get_class_gender_count(self, class_name, gender):
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM sheet_rows WHERE sheet_name = ? AND gender_key = ?',
+            (self._sheet_name(class_name), gender.strip().lower())
+        ).fetchone()[0]
+
+    def get_next_class_serial_number(self, student_class):
+        sheet_name = self.get_or_create_class_sheet(student_class)
+        rows = self._connect().execute(
+            'SELECT class_sno FROM sheet_rows WHERE sheet_name = ?', (sheet_name,)
+        ).fetchall()
+        return max_class_serial(student_class, [r[0] for r in rows]) + 1
+
+    def load_school_snapshot(self):
+        conn = self._connect()
+        snapshot = {}
+        for class_name in CLASS_NAMES:
+            values = self._sheet_values(conn, f'Class_{class_name}')
+            headers = values[0] if values else list(self.data_entry.headers)
+            rows = [row + [''] * (len(headers) - len(row)) for row in values[1:]]
+            snapshot[class_name] = {'headers': headers, 'rows': rows}
+        return snapshot
+
+    def add_student_record(self, student_data):
+        """Add a student to the main and class sheets in one local transaction"""
+        try:
+            student_class = student_data.get('Student Class', '') or ''
+            prefix = str(student_class).strip()
+
+            with self._transaction() as conn:
+                class_sno = student_data.get('Class_S.No')
+                if (not class_sno or str(class_sno).strip() == '') and student_class:
+                    # Serial numbers are allocated inside the write lock, so
+                    # concurrent workers on this host can't pick the same one
+                    max_num = max_class_serial(prefix, [value for (value,) in conn.execute(
+                        'SELECT class_sno FROM sheet_rows WHERE sheet_name = ?', (self._sheet_name(student_class),))])
+                    student_data['Class_S.No'] = format_class_serial(prefix, max_num + 1)
+
+                row_data = [student_data.get(header, '') for header in self.data_entry.headers]
+                self._append_row(conn, MAIN_SHEET, row_data)
+                events = []
+                if student_class:
+                    sheet_name = self._sheet_name(student_class)
+                    row_number = self._append_row(conn, sheet_name, row_data)
+                    events.append(StudentChange(ADDED, sheet_name, row_number,
+                                                values=dict(zip(self.data_entry.headers, row_data))))
+
+            self.mirror.notify()
+            self.data_entry.notify_changes(events)
+            return True
+
+        except Exception as e:
+            print(f"Error adding student record: {e}")
+            return False
+
+    def add_student_records(self, records):
+        """Add many students in one local transaction; returns {record index: error} on failure"""
+        try:
+            events = []
+            with self._transaction() as conn:
+                next_serials = {}
+                for record in records:
+                    student_class = record.get('Student Class', '') or ''
+                    prefix = str(student_class).strip()
+                    class_sno = record.get('Class_S.No')
+                    if (not class_sno or str(class_sno).strip() == '') and student_class:
+                        if prefix not in next_serials:
+                            next_serials[prefix] = max_class_serial(prefix, [value for (value,) in conn.execute(
+                                'SELECT class_sno FROM sheet_rows WHERE sheet_name = ?',
+                                (self._sheet_name(student_class),))]) + 1
+                        record['Class_S.No'] = format_class_serial(prefix, next_serials[prefix])
+                        next_serials[prefix] += 1
+
+                    row_data = [record.get(header, '') for header in self.data_entry.headers]
+                    self._append_row(conn, MAIN_SHEET, row_data)
+                    if student_class:
+                        sheet_name = self._sheet_name(student_class)
+                        row_number = self._append_row(conn, sheet_name, row_data)
+                        events.append(StudentChange(ADDED, sheet_name, row_number,
+                                                    values=dict(zip(self.data_entry.headers, row_data))))
+
+            self.mirror.notify()
+            self.data_entry.notify_changes(events)
+            return {}
+
+        except Exception as e:
+            print(f"Error adding student records: {e}")
+            return {index: str(e) for index in range(len(records))}
+
+    def update_student_record(self, sheet_name, row_number, student_data):
+        """Update a student row in place, keeping untouched columns blank like the Sheets path"""
+        return self.update_student_records([(sheet_name, row_number, student_data)])
+
+    def update_student_records(self, updates):
+        """Update several student rows in one local transaction.
+
+        Class sheet edits are mirrored to the main sheet row holding the
+        pre-edit GR#, so later deletes (which match by GR#) still find it.
+        """
+        try:
+            events = []
+            with self._transaction() as conn:
+                written = set()
+                for sheet_name, row_number, student_data in updates:
+                    headers = self._headers(conn, sheet_name)
+                    existing = conn.execute('SELECT gr_number FROM sheet_rows WHERE sheet_name = ? AND row_number = ?',
+                                            (sheet_name, row_number)).fetchone()
+                    if headers is None or not existing:
+                        raise LookupError(f"Row {row_number} not found in sheet {sheet_name}")
+
+                    updated_row = self.data_entry._build_updated_row(headers, student_data)
+                    cells = self._put_row(conn, sheet_name, headers, row_number, updated_row)
+                    self._enqueue(conn, 'update', sheet_name, row_number, cells)
+                    written.add((sheet_name, row_number))
+                    if sheet_name == MAIN_SHEET:
+                        continue
+                    events.append(StudentChange(UPDATED, sheet_name, row_number,
+                                                values=dict(zip(headers, updated_row))))
+
+                    main_headers = self._headers(conn, MAIN_SHEET)
+                    if main_headers is None or not existing[0].strip():
+                        continue
+                    for (main_row,) in conn.execute(
+                            'SELECT row_number FROM sheet_rows WHERE gr_number = ? AND sheet_name = ? '
+                            'ORDER BY row_number', (existing[0], MAIN_SHEET)).fetchall():
+                        if (MAIN_SHEET, main_row) not in written:
+                            main_updated = self.data_entry._build_updated_row(
+                                main_headers, dict(zip(headers, updated_row)))
+                            cells = self._put_row(conn, MAIN_SHEET, main_headers, main_row, main_updated)
+                            self._enqueue(conn, 'update', MAIN_SHEET, main_row, cells)
+                            written.add((MAIN_SHEET, main_row))
+                            break
+
+            self.mirror.notify()
+            self.data_entry.notify_changes(events)
+            return True
+
+        except Exception as e:
+            print(f"Error updating student records: {e}")
+            return False
+
+    def _delete_row(self, conn, sheet_name, row_number):
+        """Delete a row and shift the rows below it up, like deleteDimension"""
+        conn.execute('DELETE FROM sheet_rows WHERE sheet_name = ? AND row_number = ?', (sheet_name, row_number))
+        # Two steps so the primary key never collides mid-update
+        conn.execute('UPDATE sheet_rows SET row_number = -(row_number - 1) '
+                     'WHERE sheet_name = ? AND row_number > ?', (sheet_name, row_number))
+        conn.execute('UPDATE sheet_rows SET row_number = -row_number '
+                     'WHERE sheet_name = ? AND row_number < 0', (sheet_name,))
+        self._enqueue(conn, 'delete', sheet_name, row_number)
+
+    def delete_student_records(self, locations):
+        """Delete several rows in one transaction, mirroring class sheet rows in the main sheet.
+
+        Rows are deleted bottom-up so the queued deletes replay correctly in
+        order. Returns the sorted list of rows deleted, or None on failure.
+        """
+        try:
+            with self._transaction() as conn:
+                targets = {}
+                for sheet_name, row_number in locations:
+                    row = conn.execute('SELECT gr_number FROM sheet_rows WHERE sheet_name = ? AND row_number = ?',
+                                       (sheet_name, int(row_number))).fetchone()
+                    if row is None or int(row_number) < 2:
+                        raise LookupError(f"Row {row_number} not found in sheet {sheet_name}")
+                    targets[(sheet_name, int(row_number))] = row[0]
+
+                for (sheet_name, row_number), gr_number in sorted(targets.items()):
+                    if sheet_name == MAIN_SHEET or not gr_number.strip():
+                        continue
+                    for (main_row,) in conn.execute(
+                            'SELECT row_number FROM sheet_rows WHERE gr_number = ? AND sheet_name = ? '
+                            'ORDER BY row_number', (gr_number, MAIN_SHEET)).fetchall():
+                        if (MAIN_SHEET, main_row) not in targets:
+                            targets[(MAIN_SHEET, main_row)] = gr_number
+                            break
+
+                for sheet_name, row_number in sorted(targets, key=lambda loc: (loc[0], -loc[1])):
+                    self._delete_row(conn, sheet_name, row_number)
+
+            self.mirror.notify()
+            self.data_entry.notify_changes(deletion_events(targets))
+            return sorted(targets)
+
+        except Exception as e:
+            print(f"Error deleting student records: {e}")
+            return None
+
+    # ----- Mirror queue -----
+
+    def pending_count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM mirror_queue').fetchone()[0]
+
+    def pending_ops(self, limit):
+        rows = self._connect().execute(
+            'SELECT id, op, sheet_name, row_number, data, attempts FROM mirror_queue ORDER BY id LIMIT ?', (limit,)
+        ).fetchall()
+        return [
+            {'id': r[0], 'op': r[1], 'sheet_name': r[2], 'row_number': r[3],
+             'data': json.loads(r[4]) if r[4] else None, 'attempts': r[5]}
+            for r in rows
+        ]
+
+    def complete_ops(self, last_id):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM mirror_queue WHERE id <= ?', (last_id,))
+
+    def fail_op(self, op_id):
+        with self._transaction() as conn:
+            conn.execute('UPDATE mirror_queue SET attempts = attempts + 1 WHERE id = ?', (op_id,))
+
+    def acquire_mirror_lease(self, owner, lease_seconds):
+        """Only one process per host pushes the queue, so changes reach Sheets in order"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM store_meta WHERE key = 'mirror_lease'").fetchone()
+            if row:
+                holder, _, expires = row[0].rpartition(':')
+                if holder != owner and float(expires) > now:
+                    return False
+            conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('mirror_lease', ?)",
+                         (f'{owner}:{now + lease_seconds}',))
+        return True
+
+
+class SheetsMirror:
+    """Background worker that pushes queued local changes to Google Sheets in batches"""
+
+    def __init__(self, store, data_entry, interval=None, batch_size=200, max_attempts=10):
+        self.store = store
+        self.data_entry = data_entry
+        self.interval = float(interval if interval is not None else os.environ.get('MIRROR_INTERVAL', 2))
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._isolate = False
+        self._thread = None
+        self._pid = None
+        atexit.register(self._flush_on_exit)
+
+    @property
+    def owner(self):
+        return f'pid{os.getpid()}'
+
+    def ensure_started(self):
+        """Start the worker thread (again after a fork, since threads don't survive it)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='sheets-mirror', daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        self.ensure_started()
+        self._wakeup.set()
+
+    def _run(self):
+        # Mirror pushes yield API quota to interactive requests
+        with priority(BACKGROUND):
+            while True:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"❌ Sheets mirror error: {e}")
+
+    def _flush_on_exit(self):
+        try:
+            if self._pid == os.getpid() and self.store.pending_count():
+                self.flush()
+        except Exception as e:
+            print(f"⚠️ Could not mirror pending changes on exit: {e}")
+
+    def flush(self):
+        """Push queued changes in order. Returns the number of changes mirrored."""
+        with self._flush_lock:
+            if not self.store.acquire_mirror_lease(self.owner, lease_seconds=max(30, self.interval * 10)):
+                return 0
+
+            mirrored = 0
+            while True:
+                # After a rejected batch, push one change at a time to isolate the bad one
+                ops = self.store.pending_ops(1 if self._isolate else self.batch_size)
+                if not ops:
+                    return mirrored
+                done = self._push(ops)
+                mirrored += done
+                if done < len(ops):
+                    return mirrored
+
+    def _push(self, ops):
+        """Send ops in as few batchUpdate calls as possible (new sheets split the batch).
+
+        Returns how many ops were confirmed and removed from the queue.
+        """
+        completed = 0
+        batch = []  # (op, request) pairs for the next batchUpdate
+        culprits = []  # ops that could have caused an error raised right now
+
+        def send():
+            nonlocal completed, batch, culprits
+            culprits = batch
+            requests = [request for _, request in batch if request is not None]
+            if requests:
+                self.data_entry._execute_request(
+                    self.data_entry.service.spreadsheets().batchUpdate(
+                        spreadsheetId=self.data_entry.spreadsheet_id,
+                        body={'requests': requests}
+                    )
+                )
+            if batch:
+                self.store.complete_ops(batch[-1][0]['id'])
+                completed += len(batch)
+            batch = []
+
+        try:
+            for op in ops:
+                culprits = [(op, None)]
+                if op['op'] == 'add_sheet':
+                    send()
+                    culprits = [(op, None)]
+                    if op['sheet_name'] not in self.data_entry.get_sheet_metadata():
+                        self.data_entry.create_worksheet(op['sheet_name'])
+                        self.data_entry.add_headers_to_sheet(op['sheet_name'])
+                    batch = [(op, None)]
+                    send()
+                    continue
+
+                sheet_id = self.data_entry.get_sheet_id(op['sheet_name'])
+                if sheet_id is None:
+                    raise ValueError(f"Sheet {op['sheet_name']} not found")
+                batch.append((op, self._request_for(op, sheet_id)))
+
+            send()
+            self._isolate = False
+            return completed
+
+        except Exception as e:
+            # A failed batchUpdate implicates its whole batch; anything else, the op being prepared
+            failed = culprits[0][0] if culprits else ops[completed]
+            print(f"❌ Mirroring to Google Sheets failed (change {failed['id']}): {e}")
+            status = getattr(getattr(e, 'resp', None), 'status', None)
+            rejected = isinstance(e, HttpError) and status and 400 <= status < 500 and status != 429
+            if rejected and (len(culprits) > 1 or failed is not ops[completed]):
+                # Retry one op at a time, so the culprit reaches the head of the queue on its own
+                self._isolate = True
+            elif rejected:
+                self.store.fail_op(failed['id'])
+                if failed['attempts'] + 1 >= self.max_attempts:
+                    # A change Sheets keeps rejecting would block the queue forever
+                    print(f"❌ Dropping change {failed['id']} after {self.max_attempts} rejected attempts: {failed}")
+                    self.store.complete_ops(failed['id'])
+            return completed
+
+    def _request_for(self, op, sheet_id):
+        if op['op'] == 'append':
+            return {
+                'appendCells': {
+                    'sheetId': sheet_id,
+                    'rows': [self.data_entry._row_to_cells(op['data'])],
+                    'fields': 'userEnteredValue'
+                }
+            }
+        if op['op'] == 'update':
+            # Pad to the full width so cleared cells are cleared remotely too
+            cells = op['data'] + [''] * (len(self.data_entry.headers) - len(op['data']))
+            return {
+                'updateCells': {
+                    'start': {'sheetId': sheet_id, 'rowIndex': op['row_number'] - 1, 'columnIndex': 0},
+                    'rows': [self.data_entry._row_to_cells(cells)],
+                    'fields': 'userEnteredValue'
+                }
+            }
+        if op['op'] == 'delete':
+            return {
+                'deleteDimension': {
+                    'range': {
+                        'sheetId': sheet_id,
+                        'dimension': 'ROWS',
+                        'startIndex': op['row_number'] - 1,
+                        'endIndex': op['row_number']
+                    }
+                }
+            }
+        raise ValueError(f"Unknown mirror operation: {op['op']}")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Quota-aware token buckets for Google Sheets API calls.
+
+Google enforces per-minute read and write quotas for the whole service
+account, but every Gunicorn worker calls the API on its own. The bucket
+state lives in a small file guarded by an exclusive lock, so all workers on
+the host draw from the same read and write budgets.
+
+Background work (mirror pushes, periodic refreshes) runs at low priority and
+may not dip into the reserve kept for interactive requests.
+"""
+
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+from file_state import locked_json_state, state_path
+
+READ = 'read'
+WRITE = 'write'
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+_priority = threading.local()
+
+
+def current_priority():
+    """Priority of API calls made by the current thread"""
+    return getattr(_priority, 'value', INTERACTIVE)
+
+
+@contextmanager
+def priority(value):
+    """Run the enclosed API calls at the given priority (INTERACTIVE or BACKGROUND)"""
+    previous = current_priority()
+    _priority.value = value
+    try:
+        yield
+    finally:
+        _priority.value = previous
+
+
+def request_kind(request):
+    """Classify a prepared API request as a quota READ or WRITE"""
+    return READ if getattr(request, 'method', 'GET').upper() == 'GET' else WRITE
+
+
+class SheetsRateLimiter:
+    """Read and write token buckets shared by every process on this host"""
+
+    def __init__(self, path, read_per_minute=60, write_per_minute=60, burst=None,
+                 interactive_reserve=0.25, max_wait=30.0):
+        self.path = path
+        self.rates = {
+            READ: read_per_minute / 60.0,
+            WRITE: write_per_minute / 60.0,
+        }
+        self.capacity = {
+            READ: float(burst or max(1, read_per_minute // 2)),
+            WRITE: float(burst or max(1, write_per_minute // 2)),
+        }
+        self.interactive_reserve = interactive_reserve
+        self.max_wait = max_wait
+
+    @classmethod
+    def from_env(cls, spreadsheet_id):
+        """Build a limiter from SHEETS_* environment variables, or None if disabled"""
+        default = 'off' if os.environ.get('SHEETS_BACKEND', 'google').lower() == 'fake' else 'on'
+        if os.environ.get('SHEETS_RATE_LIMIT', default).lower() in ('0', 'off', 'false', 'no'):
+            return None
+
+        burst = os.environ.get('SHEETS_QUOTA_BURST')
+        return cls(
+            state_path('sheets_quota', spreadsheet_id, os.environ.get('SHEETS_QUOTA_DIR')),
+            read_per_minute=int(os.environ.get('SHEETS_READ_QUOTA_PER_MIN', 60)),
+            write_per_minute=int(os.environ.get('SHEETS_WRITE_QUOTA_PER_MIN', 60)),
+            burst=int(burst) if burst else None,
+            interactive_reserve=float(os.environ.get('SHEETS_QUOTA_INTERACTIVE_RESERVE', 0.25)),
+            max_wait=float(os.environ.get('SHEETS_QUOTA_MAX_WAIT', 30)),
+        )
+
+    def _refill(self, state, kind, now):
+        bucket = state.setdefault(kind, {'tokens': self.capacity[kind], 'updated': now, 'blocked_until': 0})
+        elapsed = max(0.0, now - bucket['updated'])
+        bucket['tokens'] = min(self.capacity[kind], bucket['tokens'] + elapsed * self.rates[kind])
+        bucket['updated'] = max(bucket['updated'], now)
+        return bucket
+
+    def _try_take(self, kind, floor):
+        """Take one token if more than `floor` remain. Returns seconds to wait otherwise."""
+        with locked_json_state(self.path) as state:
+            now = time.time()
+            bucket = self._refill(state, kind, now)
+            if bucket['blocked_until'] > now:
+                return bucket['blocked_until'] - now
+            if bucket['tokens'] >= floor + 1:
+                bucket['tokens'] -= 1
+                return 0.0
+            return (floor + 1 - bucket['tokens']) / self.rates[kind]
+
+    def acquire(self, kind):
+        """Block until a token is available. Returns False if max_wait ran out first."""
+        floor = 0.0
+        if current_priority() == BACKGROUND:
+            floor = self.capacity[kind] * self.interactive_reserve
+
+        deadline = time.time() + self.max_wait
+        while True:
+            wait = self._try_take(kind, floor)
+            if wait <= 0:
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                print(f"⚠️ Sheets {kind} quota wait exceeded {self.max_wait:.0f}s; sending anyway")
+                return False
+            # Jitter keeps waiting workers from waking in lockstep
+            time.sleep(min(wait, remaining) + random.uniform(0, 0.05))
+
+    def penalize(self, kind, seconds):
+        """Google returned 429: empty the bucket and hold every worker back for a while"""
+        with locked_json_state(self.path) as state:
+            now = time.time()
+            bucket = self._refill(state, kind, now)
+            bucket['tokens'] = 0.0
+            bucket['blocked_until'] = max(bucket['blocked_until'], now + seconds)
+            # Start refilling only once the block lifts
+            bucket['updated'] = bucket['blocked_until']
+
+    def stats(self):
+        """Current token levels, for diagnostics"""
+        with locked_json_state(self.path) as state:
+            now = time.time()
+            return {
+                kind: {
+                    'tokens': round(self._refill(state, kind, now)['tokens'], 2),
+                    'capacity': self.capacity[kind],
+                    'per_minute': round(self.rates[kind] * 60),
+                    'blocked_for': round(max(0.0, state[kind]['blocked_until'] - now), 2),
+                }
+                for kind in (READ, WRITE)
+            }
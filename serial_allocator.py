@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Per-class Class_S.No allocator shared by every worker on the host.
+
+Each class keeps the highest serial number in use in a file-locked JSON
+state file. Numbers are seeded from one snapshot read and then handed out
+atomically, so two workers submitting to the same class can't pick the same
+number, and next-number lookups need no Sheets reads.
+"""
+
+import os
+import re
+import time
+from file_state import locked_json_state, state_path
+
+
+def parse_class_serial(student_class, value):
+    """Numeric part of a Class_S.No value (PREFIX_01, PREFIX-01, PREFIX01 or 01), or None"""
+    if not value:
+        return None
+    prefix = str(student_class).strip()
+    m = re.match(rf'^(?:{re.escape(prefix)}[_-]?)?(\d+)$', str(value).strip())
+    return int(m.group(1)) if m else None
+
+
+def format_class_serial(student_class, number):
+    """Class_S.No as stored in the sheets, e.g. I_05"""
+    return f"{str(student_class).strip()}_{str(number).zfill(2)}"
+
+
+def max_class_serial(student_class, values):
+    """Highest serial number among Class_S.No values"""
+    numbers = [parse_class_serial(student_class, value) for value in values]
+    return max([n for n in numbers if n] or [0])
+
+
+class ClassSerialAllocator:
+    """class name -> highest serial in use, the highest ever reserved, and when it was last seeded from Sheets"""
+
+    def __init__(self, path, ttl=300):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+
+    @classmethod
+    def from_env(cls, spreadsheet_id, ttl=300):
+        return cls(state_path('class_serials', spreadsheet_id, os.environ.get('SERIAL_STATE_DIR')), ttl=ttl)
+
+    def _fresh(self, entry):
+        return entry is not None and time.time() - entry['seeded_at'] < self.ttl
+
+    def is_seeded(self, student_class):
+        with locked_json_state(self.path) as state:
+            return self._fresh(state.get(student_class))
+
+    def seed(self, student_class, max_num):
+        """Record the highest serial seen in Sheets.
+
+        Numbers reserved by any worker may not be visible in Sheets yet (a
+        slow write can outlive the TTL), so the counter is never lowered below
+        the last reservation, nor at all while it is fresh.
+        """
+        with locked_json_state(self.path) as state:
+            entry = state.get(student_class) or {}
+            reserved = entry.get('reserved', 0)
+            max_num = max(max_num, reserved)
+            if self._fresh(entry or None):
+                max_num = max(max_num, entry['max'])
+            state[student_class] = {'max': max_num, 'reserved': reserved, 'seeded_at': time.time()}
+
+    def peek(self, student_class):
+        """Next serial for a class without reserving it, or None if it needs seeding"""
+        with locked_json_state(self.path) as state:
+            entry = state.get(student_class)
+            return entry['max'] + 1 if self._fresh(entry) else None
+
+    def reserve(self, student_class):
+        """Atomically take the next serial, or None if the class needs seeding first"""
+        with locked_json_state(self.path) as state:
+            entry = state.get(student_class)
+            if not self._fresh(entry):
+                return None
+            entry['max'] += 1
+            entry['reserved'] = entry['max']
+            return entry['max']
+
+    def reserve_block(self, student_class, count):
+        """Atomically take `count` consecutive serials; returns the first, or None if unseeded"""
+        with locked_json_state(self.path) as state:
+            entry = state.get(student_class)
+            if not self._fresh(entry):
+                return None
+            first = entry['max'] + 1
+            entry['max'] += count
+            entry['reserved'] = entry['max']
+            return first
+
+    def release(self, student_class, number):
+        """Give back a reserved number if nothing was reserved after it"""
+        with locked_json_state(self.path) as state:
+            entry = state.get(student_class)
+            if entry and entry['max'] == number:
+                entry['max'] = number - 1
+            if entry and entry.get('reserved') == number:
+                entry['reserved'] = number - 1
+
+    def note(self, student_class, number):
+        """Raise the counter when a record arrives with its own serial"""
+        if not number:
+            return
+        with locked_json_state(self.path) as state:
+            entry = state.get(student_class)
+            if entry and number > entry['max']:
+                entry['max'] = number
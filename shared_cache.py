@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Host-wide cache tier shared by every Gunicorn worker.
+
+DataCache keeps a per-process dict, so each worker used to fetch the same
+Sheets data separately, and a clear() after a write in one worker left the
+others serving stale counts. SharedCache stores JSON values in one SQLite
+file per spreadsheet and keeps a generation counter next to them:
+invalidate() bumps the generation, which is the invalidation broadcast -
+every worker compares it before trusting its in-process copy.
+
+load_lock() serializes loads of one key across processes, so when several
+workers miss together one fetches and the rest read its result.
+
+Set SHARED_CACHE=off to disable; SHARED_CACHE_DIR picks the directory.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: loads are only coalesced within a process
+    fcntl = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    generation INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_meta (key, value) VALUES ('generation', 0);
+"""
+
+
+class SharedCache:
+    """JSON key/value store in SQLite with a host-wide generation counter"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls, key):
+        """Shared cache for a spreadsheet, or None when SHARED_CACHE is off"""
+        if os.environ.get('SHARED_CACHE', 'on').lower() in ('0', 'off', 'false', 'no'):
+            return None
+        digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:12]
+        directory = os.environ.get('SHARED_CACHE_DIR') or tempfile.gettempdir()
+        try:
+            return cls(os.path.join(directory, f'shared_cache_{digest}.db'))
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Shared cache unavailable, using per-worker cache only: {e}")
+            return None
+
+    def _connect(self):
+        """Per-thread connection, reopened after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    # The shared tier is an optimization: database errors are logged and
+    # treated as misses so requests fall back to the per-worker cache.
+
+    def generation(self):
+        """Current host-wide generation (changes whenever any worker invalidates), or None on error"""
+        try:
+            return self._connect().execute("SELECT value FROM cache_meta WHERE key = 'generation'").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache read failed: {e}")
+            return None
+
+    def get(self, key):
+        """(value, stored_at) for key from the current generation, or None"""
+        try:
+            row = self._connect().execute(
+                "SELECT e.value, e.stored_at FROM cache_entries e, cache_meta m "
+                "WHERE e.key = ? AND m.key = 'generation' AND e.generation = m.value", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache read failed: {e}")
+            return None
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key, value, generation=None):
+        """Store value unless the cache was invalidated since `generation` was read.
+
+        Returns False when the value was dropped (stale load, not JSON-serializable or a database error).
+        """
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError):
+            return False
+        try:
+            with self._transaction() as conn:
+                current = conn.execute("SELECT value FROM cache_meta WHERE key = 'generation'").fetchone()[0]
+                if generation is not None and generation != current:
+                    return False
+                conn.execute(
+                    'INSERT OR REPLACE INTO cache_entries (key, value, stored_at, generation) VALUES (?, ?, ?, ?)',
+                    (key, payload, time.time(), current)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache write failed: {e}")
+            return False
+        return True
+
+    def invalidate(self):
+        """Drop every entry and bump the generation so all workers discard their copies"""
+        try:
+            with self._transaction() as conn:
+                conn.execute("UPDATE cache_meta SET value = value + 1 WHERE key = 'generation'")
+                conn.execute('DELETE FROM cache_entries')
+                return conn.execute("SELECT value FROM cache_meta WHERE key = 'generation'").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache invalidation failed: {e}")
+            return None
+
+    def patch(self, updates):
+        """Apply (key, fn) updates to the stored values in one transaction and broadcast them.
+
+        fn(value) returns the new value, or None to drop the entry; entries
+        keep their stored_at. The generation is bumped so other workers drop
+        their in-process copies and re-read the patched values. Returns the
+        new generation, or None if the patch failed and nothing changed.
+        """
+        try:
+            with self._transaction() as conn:
+                conn.execute("UPDATE cache_meta SET value = value + 1 WHERE key = 'generation'")
+                generation = conn.execute("SELECT value FROM cache_meta WHERE key = 'generation'").fetchone()[0]
+                conn.execute('UPDATE cache_entries SET generation = ?', (generation,))
+                for key, fn in updates:
+                    row = conn.execute('SELECT value FROM cache_entries WHERE key = ?', (key,)).fetchone()
+                    if row is None:
+                        continue
+                    value = fn(json.loads(row[0]))
+                    if value is None:
+                        conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+                    else:
+                        conn.execute('UPDATE cache_entries SET value = ? WHERE key = ?', (json.dumps(value), key))
+            return generation
+        except Exception as e:
+            print(f"⚠️ Shared cache patch failed: {e}")
+            return None
+
+    def replace(self, entries, generation=None):
+        """Store fresh values for several keys at once and broadcast them like patch().
+
+        Like set(), nothing is written if the cache changed since `generation`
+        was read. Returns the new generation, or None if nothing was written.
+        """
+        try:
+            payloads = {key: json.dumps(value) for key, value in entries.items()}
+            now = time.time()
+            with self._transaction() as conn:
+                current = conn.execute("SELECT value FROM cache_meta WHERE key = 'generation'").fetchone()[0]
+                if generation is not None and generation != current:
+                    return None
+                conn.execute("UPDATE cache_meta SET value = value + 1 WHERE key = 'generation'")
+                generation = conn.execute("SELECT value FROM cache_meta WHERE key = 'generation'").fetchone()[0]
+                conn.execute('UPDATE cache_entries SET generation = ?', (generation,))
+                conn.executemany(
+                    'INSERT OR REPLACE INTO cache_entries (key, value, stored_at, generation) VALUES (?, ?, ?, ?)',
+                    [(key, payload, now, generation) for key, payload in payloads.items()]
+                )
+            return generation
+        except Exception as e:
+            print(f"⚠️ Shared cache replace failed: {e}")
+            return None
+
+    @contextmanager
+    def load_lock(self, key):
+        """Hold a host-wide lock while loading key"""
+        if fcntl is None:
+            yield
+            return
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        with open(f'{self.path}.{digest}.lock', 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Pooled, keep-alive HTTP transport for the Google Sheets client.
+
+googleapiclient's default transport (httplib2) is not thread-safe, so a
+single service object shared by request threads either corrupts responses
+or has to be serialized. Each pooled client wraps its own AuthorizedSession
+(requests + urllib3), which keeps TLS connections to Google open between
+calls. Requests check a client out, pass it to HttpRequest.execute(http=...)
+and return it, so threads in one worker can call Sheets in parallel.
+"""
+
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+# requests, httplib2 and google-auth's transport are imported on first use, so
+# importing this module (for PoolTimeoutError) doesn't load them at startup
+
+
+class PoolTimeoutError(Exception):
+    """No pooled Sheets client became free in time"""
+
+
+class SessionHttp:
+    """httplib2.Http look-alike that sends requests over an AuthorizedSession"""
+
+    def __init__(self, credentials, connect_timeout=10.0, read_timeout=30.0):
+        import requests
+        from google.auth.transport.requests import AuthorizedSession
+
+        self.session = AuthorizedSession(credentials)
+        # One client serves one request at a time, so a single kept-alive connection is enough
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self.session.mount('https://', adapter)
+        self.timeout = (connect_timeout, read_timeout)
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=5, connection_type=None):
+        import httplib2
+
+        response = self.session.request(method, uri, data=body, headers=headers,
+                                        timeout=self.timeout)
+        info = {key.lower(): value for key, value in response.headers.items()}
+        # requests already decoded the body
+        info.pop('content-encoding', None)
+        info['status'] = str(response.status_code)
+        return httplib2.Response(info), response.content
+
+    def close(self):
+        self.session.close()
+
+
+class SheetsHttpPool:
+    """Fixed-size pool of SessionHttp clients, rebuilt after a fork"""
+
+    def __init__(self, credentials, size=4, checkout_timeout=30.0,
+                 connect_timeout=10.0, read_timeout=30.0):
+        self.credentials = credentials
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._idle = None
+        self._created = 0
+
+    @classmethod
+    def from_env(cls, credentials):
+        """Build a pool sized by SHEETS_HTTP_* environment variables"""
+        return cls(
+            credentials,
+            size=int(os.environ.get('SHEETS_HTTP_POOL_SIZE', 4)),
+            checkout_timeout=float(os.environ.get('SHEETS_HTTP_POOL_TIMEOUT', 30)),
+            connect_timeout=float(os.environ.get('SHEETS_HTTP_CONNECT_TIMEOUT', 10)),
+            read_timeout=float(os.environ.get('SHEETS_HTTP_READ_TIMEOUT', 30)),
+        )
+
+    def spawn(self, size=1):
+        """Separate pool with the same credentials and timeouts"""
+        return SheetsHttpPool(self.credentials, size=size, checkout_timeout=self.checkout_timeout,
+                              connect_timeout=self.connect_timeout, read_timeout=self.read_timeout)
+
+    def _ensure_pool(self):
+        # Sockets opened before Gunicorn forks must not be shared with the children
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._idle = queue.LifoQueue()
+                self._created = 0
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                return SessionHttp(self.credentials, self.connect_timeout, self.read_timeout)
+            return None
+
+    @contextmanager
+    def checkout(self):
+        """Borrow a client for one request"""
+        import requests
+
+        http = self._ensure_pool()
+        idle = self._idle
+        if http is None:
+            try:
+                http = idle.get(timeout=self.checkout_timeout)
+            except queue.Empty:
+                raise PoolTimeoutError(
+                    f"No Sheets HTTP client free after {self.checkout_timeout:.0f}s (pool size {self.size})")
+        try:
+            yield http
+        except (requests.ConnectionError, requests.Timeout):
+            # Drop a client whose connection broke; a fresh one is made on demand
+            http.close()
+            with self._lock:
+                if idle is self._idle:
+                    self._created -= 1
+            http = None
+            raise
+        finally:
+            if http is not None:
+                idle.put(http)
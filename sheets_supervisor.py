@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Background connection supervisor for Google Sheets.
+
+Building GoogleSheetsDataEntry makes several API calls, and retrying a failed
+connection used to sleep through exponential backoff at import time, before
+Gunicorn could bind. The supervisor connects in a daemon thread instead,
+keeps retrying with capped, jittered backoff until it succeeds, warms the
+caches, and reconnects when the client stays unhealthy. Routes ask
+is_ready() / wait_ready() rather than assuming a client exists.
+
+The thread is started lazily with ensure_started(), so with --preload the
+master process never starts it and each forked worker gets its own.
+"""
+
+import os
+import time
+import random
+import threading
+
+CONNECTING = 'connecting'
+READY = 'ready'
+RECONNECTING = 'reconnecting'
+
+
+class SheetsSupervisor:
+    """Owns the connect / warm-up / reconnect loop for one worker process"""
+
+    def __init__(self, connect, on_connect=None, warm_up=None, is_healthy=None,
+                 initial_backoff=1.0, max_backoff=60.0, check_interval=30.0, reconnect_after=4):
+        self.connect = connect
+        self.on_connect = on_connect or (lambda instance: None)
+        self.warm_up = warm_up
+        self.is_healthy = is_healthy
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.check_interval = check_interval
+        self.reconnect_after = reconnect_after
+
+        self.instance = None
+        self.state = CONNECTING
+        self.attempts = 0
+        self.last_error = None
+        self.connected_at = None
+        self.warmed_at = None
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._reconnect_requested = False
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, connect, **kwargs):
+        """Build a supervisor from SHEETS_INIT_* / SHEETS_HEALTH_* environment variables"""
+        return cls(
+            connect,
+            initial_backoff=float(os.environ.get('SHEETS_INIT_BACKOFF_SECONDS', 1)),
+            max_backoff=float(os.environ.get('SHEETS_INIT_MAX_BACKOFF_SECONDS', 60)),
+            check_interval=float(os.environ.get('SHEETS_HEALTH_INTERVAL_SECONDS', 30)),
+            reconnect_after=int(os.environ.get('SHEETS_RECONNECT_AFTER_CHECKS', 4)),
+            **kwargs
+        )
+
+    def ensure_started(self):
+        """Start the supervisor thread in this process if it isn't running"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked after the parent connected: the client's sockets and threads don't carry over
+                self.instance = None
+                self.state = CONNECTING
+                self._ready.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='sheets-supervisor', daemon=True)
+            self._thread.start()
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        """Block until a client is connected or timeout seconds pass; returns readiness"""
+        self.ensure_started()
+        return self._ready.wait(timeout)
+
+    def reconnect(self):
+        """Ask the supervisor to build a fresh client; the current one keeps serving meanwhile"""
+        self._reconnect_requested = True
+        self._wake.set()
+
+    def status(self):
+        return {
+            'ready': self.is_ready(),
+            'state': self.state,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'connected_seconds_ago': round(time.time() - self.connected_at, 1) if self.connected_at else None,
+            'warmed': self.warmed_at is not None,
+        }
+
+    def _sleep(self, seconds):
+        """Sleep, waking early on reconnect()"""
+        self._wake.wait(seconds)
+        self._wake.clear()
+
+    def _connect_once(self):
+        self.attempts += 1
+        try:
+            instance = self.connect()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ Google Sheets connection attempt {self.attempts} failed: {e}")
+            return False
+
+        self.instance = instance
+        self.on_connect(instance)
+        self.state = READY
+        self.last_error = None
+        self.connected_at = time.time()
+        self._reconnect_requested = False
+        self._ready.set()
+
+        if self.warm_up is not None:
+            try:
+                start = time.time()
+                self.warm_up(instance)
+                self.warmed_at = time.time()
+                print(f"✅ Caches warmed in {self.warmed_at - start:.1f}s")
+            except Exception as e:
+                print(f"⚠️ Cache warm-up failed: {e}")
+        return True
+
+    def _run(self):
+        backoff = self.initial_backoff
+        unhealthy_checks = 0
+        while True:
+            if self.instance is None or self._reconnect_requested:
+                if self.instance is not None:
+                    self.state = RECONNECTING
+                if not self._connect_once():
+                    # Full jitter keeps workers from reconnecting in lockstep
+                    self._sleep(random.uniform(0, backoff))
+                    backoff = min(backoff * 2, self.max_backoff)
+                    continue
+                backoff = self.initial_backoff
+                unhealthy_checks = 0
+
+            self._sleep(self.check_interval)
+            if self.is_healthy is None or self._reconnect_requested:
+                continue
+            try:
+                healthy = self.is_healthy(self.instance)
+            except Exception:
+                healthy = False
+            unhealthy_checks = 0 if healthy else unhealthy_checks + 1
+            if unhealthy_checks >= self.reconnect_after:
+                print(f"⚠️ Google Sheets unhealthy for {unhealthy_checks} checks; reconnecting")
+                self._reconnect_requested = True
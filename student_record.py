@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Compact student record and the one mapper from sheet rows to API payloads.
+
+Routes used to rebuild a header -> index dict for every request, pad each
+row with append('') (mutating rows shared with the incremental-sync and
+snapshot caches) and assemble their own dicts. Now a HeaderIndex is built
+once per distinct header row and compiles an itemgetter for each payload
+shape. A Student keeps a reference to its row as read plus its sheet's
+HeaderIndex, and missing trailing cells read as ''. Student and the
+whole-sheet builders below are the only place where payload keys such as
+'class_sno' are mapped to sheet headers.
+"""
+
+from functools import lru_cache
+from operator import itemgetter
+
+# (payload key, sheet header) pairs; headers a sheet lacks read as ''
+CLASS_ENTRY_FIELDS = (
+    ('sno', 'S.No'),
+    ('class_sno', 'Class_S.No'),
+    ('student_name', 'Student Name'),
+    ('father_name', "Father's Name"),
+    ('class_section', 'Class Section'),
+    ('gr_number', 'GR#'),
+    ('gender', 'Gender'),
+    ('religion', 'Religion'),
+    ('contact_number', 'Contact Number'),
+    ('cnic_bform', 'CNIC / B-Form'),
+    ('date_of_birth', 'Date of Birth'),
+    ('guardian_name', 'Guardian Name'),
+    ('guardian_relation', 'Guardian Relation'),
+    ('remarks', 'Remarks'),
+)
+
+GENDER_ENTRY_FIELDS = (
+    ('sno', 'S.No'),
+    ('class_sno', 'Class_S.No'),
+    ('student_name', 'Student Name'),
+    ('father_name', "Father's Name"),
+    ('class_section', 'Class Section'),
+    ('gr_number', 'GR#'),
+    ('gender', 'Gender'),
+    ('remarks', 'Remarks'),
+)
+
+ALL_STUDENTS_ENTRY_FIELDS = tuple(field for field in CLASS_ENTRY_FIELDS if field[0] != 'sno')
+ALL_STUDENTS_EXTRA_KEYS = ('sno', 'sheet_name', 'row_number', 'student_class')
+
+
+class HeaderIndex:
+    """header -> column index for one header row, with compiled getters per payload"""
+
+    __slots__ = ('positions', 'width', '_getters')
+
+    def __init__(self, headers):
+        self.positions = {}
+        for idx, header in enumerate(headers):
+            self.positions.setdefault(header, idx)
+        self.width = len(headers)
+        self._getters = {}
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def get(self, header):
+        return self.positions.get(header)
+
+    def getter(self, fields, extra_keys=()):
+        """(keys, getter, blanks) for (payload key, header) pairs followed by extra_keys.
+
+        getter(row) returns the values of the headers this sheet has, from a
+        row padded to the header width; blanks are the '' values for the
+        ones it lacks. The caller appends the extra values.
+        """
+        compiled = self._getters.get((fields, extra_keys))
+        if compiled is None:
+            present = [(key, self.positions[header]) for key, header in fields if header in self.positions]
+            missing = tuple(key for key, header in fields if header not in self.positions)
+            columns = [idx for _, idx in present]
+            if len(columns) == 1:
+                getter = lambda row, idx=columns[0]: (row[idx],)
+            else:
+                getter = itemgetter(*columns) if columns else (lambda row: ())
+            keys = tuple(key for key, _ in present) + missing + tuple(extra_keys)
+            compiled = self._getters[(fields, extra_keys)] = (keys, getter, ('',) * len(missing))
+        return compiled
+
+
+@lru_cache(maxsize=64)
+def _header_index(headers):
+    return HeaderIndex(headers)
+
+
+def header_index(headers):
+    """HeaderIndex shared by every caller with the same header row"""
+    return _header_index(tuple(headers))
+
+
+class Student:
+    """One data row of a class sheet, read through its sheet's header index"""
+
+    __slots__ = ('sheet_name', 'row_number', 'row', 'index')
+
+    def __init__(self, sheet_name, row_number, row, index):
+        self.sheet_name = sheet_name
+        self.row_number = row_number
+        self.row = row
+        self.index = index
+
+    def get(self, header):
+        idx = self.index.get(header)
+        return self.row[idx] if idx is not None and idx < len(self.row) else ''
+
+    def _full_row(self):
+        """The row, or a padded copy if it is shorter than the headers; the cached row isn't touched"""
+        row = self.row
+        missing = self.index.width - len(row)
+        return row + [''] * missing if missing > 0 else row
+
+    @property
+    def class_name(self):
+        return self.sheet_name.replace('Class_', '')
+
+    def as_dict(self):
+        """header -> value for every column of the sheet"""
+        return {header: self.get(header) for header in self.index}
+
+    def entry(self, fields, extra_keys=(), extra_values=()):
+        """Payload dict for (key, header) fields plus extra keys and values"""
+        keys, getter, blanks = self.index.getter(fields, extra_keys)
+        return dict(zip(keys, getter(self._full_row()) + blanks + extra_values))
+
+    def class_entry(self):
+        """/api/class_data payload"""
+        return self.entry(CLASS_ENTRY_FIELDS, ('row_number',), (self.row_number,))
+
+    def gender_entry(self):
+        """/api/gender_data payload"""
+        return self.entry(GENDER_ENTRY_FIELDS, ('row_number',), (self.row_number,))
+
+    def all_students_entry(self, sno):
+        """/api/all_students payload; sno numbers students across all classes"""
+        return self.entry(ALL_STUDENTS_ENTRY_FIELDS, ALL_STUDENTS_EXTRA_KEYS,
+                          (sno, self.sheet_name, self.row_number, self.class_name))
+
+
+def sheet_rows(values, headers=None):
+    """(HeaderIndex, data rows) for a sheet's values (header row first, or `headers` given separately)"""
+    if headers is None:
+        if not values:
+            return header_index(()), []
+        headers, values = values[0], values[1:]
+    return header_index(headers), values
+
+
+def iter_students(sheet_name, values, headers=None):
+    """Students in a sheet's values.
+
+    Rows without a first-column value (Class_S.No) are skipped; row_number
+    is the 1-based sheet row.
+    """
+    index, rows = sheet_rows(values, headers)
+    for row_number, row in enumerate(rows, start=2):
+        if row and row[0]:
+            yield Student(sheet_name, row_number, row, index)
+
+
+# Whole-sheet payload lists skip the per-row Student objects: these run on every
+# cache load and refresh, so the rows go straight through the compiled getters.
+
+def class_entries(sheet_name, values, headers=None):
+    """/api/class_data payloads for every student in a sheet"""
+    index, rows = sheet_rows(values, headers)
+    keys, getter, blanks = index.getter(CLASS_ENTRY_FIELDS, ('row_number',))
+    width = index.width
+    return [dict(zip(keys, getter(row if len(row) >= width else row + [''] * (width - len(row)))
+                     + blanks + (row_number,)))
+            for row_number, row in enumerate(rows, start=2) if row and row[0]]
+
+
+def all_students_entries(sheet_name, values, headers=None, first_sno=1):
+    """/api/all_students payloads for every student in a sheet, numbered from first_sno"""
+    index, rows = sheet_rows(values, headers)
+    keys, getter, blanks = index.getter(ALL_STUDENTS_ENTRY_FIELDS, ALL_STUDENTS_EXTRA_KEYS)
+    width = index.width
+    student_class = sheet_name.replace('Class_', '')
+    entries = []
+    for row_number, row in enumerate(rows, start=2):
+        if row and row[0]:
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+            entries.append(dict(zip(keys, getter(row) + blanks
+                                    + (first_sno + len(entries), sheet_name, row_number, student_class))))
+    return entries
+
+
+def student_at(sheet_name, values, row_number):
+    """The student in sheet row row_number of a sheet's values, or None"""
+    if not values or row_number < 2 or row_number > len(values):
+        return None
+    return Student(sheet_name, row_number, values[row_number - 1], header_index(values[0]))
+
@@ -0,0 +1,48 @@
+"""
+Shared fixtures. Tests run against the in-memory fake Sheets backend
+(fake_sheets_service), so no credentials or network are needed.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATE_DIR = tempfile.mkdtemp(prefix='sheets_tests_')
+os.environ.update({
+    'SHEETS_BACKEND': 'fake',
+    'GOOGLE_SHEETS_ID': 'fake-tests',
+    'FAKE_SHEETS_STUDENTS_PER_CLASS': '6',
+    'ADMIN_PASSWORD': 'test',
+    'SECRET_KEY': 'test',
+    'SHARED_CACHE': 'off',
+    'CACHE_SNAPSHOT': 'off',
+    'ENABLE_BACKGROUND_SYNC': 'false',
+    'SERIAL_STATE_DIR': STATE_DIR,
+})
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    """web_app, connected to the fake backend"""
+    import web_app
+    assert web_app.sheets_supervisor.wait_ready(10)
+    # Let the warm-up finish so it doesn't race the tests' own loads
+    deadline = time.time() + 10
+    while web_app.sheets_supervisor.warmed_at is None and time.time() < deadline:
+        time.sleep(0.05)
+    return web_app
+
+
+@pytest.fixture
+def admin_client(app_module):
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'admin'
+        session['role'] = 'admin'
+        session['access'] = 'all'
+    return client
@@ -0,0 +1,97 @@
+"""Write events patch the cached snapshot, rosters and counts into what a fresh read returns"""
+
+import pytest
+
+PATCHED_KEYS = ('school_snapshot', 'class_aggregates', 'all_students', 'class_III', 'class_IV')
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(app_module):
+    # Other tests write to the sheets behind the app's back
+    app_module.data_cache.clear()
+
+
+def warm(client):
+    for url in ('/api/class_report_data/III', '/api/class_wise_data', '/api/all_students',
+                '/api/class_data/III', '/api/class_data/IV'):
+        assert client.get(url).status_code == 200
+
+
+def reloaded(web_app):
+    snapshot = web_app.data_entry.load_school_snapshot(incremental=False)
+    return {
+        'school_snapshot': snapshot,
+        'class_aggregates': web_app.build_aggregates(snapshot, web_app.CLASS_NAMES),
+        'all_students': web_app.load_all_students(),
+        'class_III': web_app.load_class_students('III'),
+        'class_IV': web_app.load_class_students('IV'),
+    }
+
+
+def assert_patched(web_app, keys=PATCHED_KEYS):
+    fresh = reloaded(web_app)
+    for key in keys:
+        cached = web_app.data_cache.get(key)
+        assert cached is not None, f'{key} was dropped instead of patched'
+        assert cached == fresh[key], f'{key} differs from a fresh read'
+
+
+def submit(client, gr_number, student_class='III'):
+    response = client.post('/submit', data={
+        'gr_number': gr_number, 'student_name': 'New Student', 'father_name': 'Father',
+        'student_class': student_class, 'religion': 'Islam', 'gender': 'Female'})
+    assert response.get_json()['success'], response.get_json()
+
+
+def test_submit_patches_match_reload(app_module, admin_client):
+    warm(admin_client)
+    submit(admin_client, '9101')
+    assert_patched(app_module)
+
+
+def test_edit_patches_match_reload(app_module, admin_client):
+    warm(admin_client)
+    response = admin_client.post('/api/edit_student/Class_III/3', json={
+        'GR#': '9201', 'Student Name': 'Edited', 'Gender': 'Male', 'Class_S.No': 'III_02', 'Student Class': 'III'})
+    assert response.get_json()['success']
+    assert_patched(app_module)
+
+
+def test_delete_patches_match_reload(app_module, admin_client):
+    warm(admin_client)
+    assert admin_client.delete('/api/delete_student/Class_IV/2').get_json()['success']
+    response = admin_client.delete('/api/students', json={'rows': [['Class_III', 2], ['Class_IV', 3]]})
+    assert response.get_json()['success']
+    assert_patched(app_module)
+
+
+def test_unlocated_append_drops_instead_of_guessing(app_module, admin_client, monkeypatch):
+    warm(admin_client)
+    monkeypatch.setattr(app_module.data_entry, '_appended_row_numbers', lambda grid_data, expected: None)
+    submit(admin_client, '9301')
+
+    # Row-numbered copies can't be patched without the row, so they reload
+    for key in ('school_snapshot', 'all_students', 'class_III'):
+        assert app_module.data_cache.get(key) is None
+    # Counts don't depend on row numbers
+    assert_patched(app_module, keys=('class_aggregates', 'class_IV'))
+
+
+@pytest.mark.parametrize('key', ['Class_S.No', 'GR#'])
+def test_append_takes_row_numbers_from_its_reply(app_module, key):
+    data_entry = app_module.data_entry
+    headers = data_entry.headers
+    row = [''] * len(headers)
+    row[headers.index('GR#')] = '9401'
+    row[headers.index('Student Name')] = 'Twin'
+    if key == 'Class_S.No':
+        row[headers.index('Class_S.No')] = 'V_99'
+    before = len(data_entry.fetch_sheet_values(['Class_V'], incremental=False)['Class_V'])
+
+    data_entry.service.reset_stats()
+    located = data_entry.append_rows_to_sheets({'408070227': [row], 'Class_V': [row, row]})
+
+    assert located == {'Class_V': [before + 1, before + 2]}
+    # The write's reply places the rows; no read follows it
+    assert set(data_entry.service.stats()) == {'spreadsheets.batchUpdate'}
+    assert data_entry.service.stats()['spreadsheets.batchUpdate']['calls'] == 1
@@ -0,0 +1,56 @@
+"""Sheets outages serve the last known good data, never an empty roster"""
+
+import pytest
+
+from circuit_breaker import CircuitOpenError
+
+
+@pytest.fixture
+def open_breaker(app_module):
+    """Open the Sheets circuit, so every call fails fast with CircuitOpenError"""
+    breaker = app_module.data_entry.circuit_breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.is_open()
+    yield breaker
+    breaker.record_success()
+
+
+def expire(data_cache, key):
+    with data_cache.lock:
+        data_cache.cache_timestamps[key] = 0
+
+
+def test_stale_cache_is_served_while_the_circuit_is_open(app_module, admin_client, request):
+    students = admin_client.get('/api/class_data/I').get_json()['students']
+    assert students
+    expire(app_module.data_cache, 'class_I')
+
+    request.getfixturevalue('open_breaker')
+    response = admin_client.get('/api/class_data/I').get_json()
+    assert response['success']
+    assert response['stale'] is True
+    assert response['students'] == students
+
+
+def test_failed_reload_serves_stale_value(app_module):
+    data_cache = app_module.DataCache()
+    data_cache.set('class_II', ['cached'])
+    expire(data_cache, 'class_II')
+
+    def failing_load():
+        raise CircuitOpenError('down')
+
+    assert data_cache.get_or_load_with_status('class_II', failing_load) == (['cached'], True)
+
+
+def test_outage_is_an_error_not_an_empty_class(app_module, open_breaker):
+    with pytest.raises(CircuitOpenError):
+        app_module.load_class_students('VI')
+
+
+def test_outage_without_a_cached_copy_is_reported(app_module, admin_client, open_breaker):
+    app_module.data_cache.clear()
+    response = admin_client.get('/api/class_data/VII').get_json()
+    assert response['success'] is False
+    assert app_module.data_cache.get_stale('class_VII') is None
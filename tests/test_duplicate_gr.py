@@ -0,0 +1,75 @@
+"""Submissions are checked against GRs added by other workers, not just this worker's index"""
+
+import pytest
+
+from circuit_breaker import CircuitOpenError
+from google_sheets_data_entry import GoogleSheetsDataEntry
+
+
+@pytest.fixture
+def workers():
+    return GoogleSheetsDataEntry(spreadsheet_id='fake-gr'), GoogleSheetsDataEntry(spreadsheet_id='fake-gr')
+
+
+def add(data_entry, gr_number):
+    record = {header: '' for header in data_entry.headers}
+    record.update({'GR#': gr_number, 'Student Name': 'Student', 'Student Class': 'III'})
+    assert data_entry.add_student_record(record)
+
+
+def test_confirm_sees_gr_added_by_another_worker(workers):
+    first, second = workers
+    first.rebuild_gr_index()
+    second.rebuild_gr_index()
+    add(first, '8101')
+
+    # The fast path answers from second's own index until it is rebuilt
+    assert second.check_duplicate_gr('8101') is False
+    assert second.check_duplicate_gr('8101', confirm=True) is True
+    assert second.check_duplicate_gr('8102', confirm=True) is False
+
+
+def test_confirm_reads_only_the_main_sheet_tail(workers):
+    first, second = workers
+    second.rebuild_gr_index()
+    add(first, '8401')
+
+    second.service.reset_stats()
+    assert second.check_duplicate_gr('8401', confirm=True) is True
+    assert second.check_duplicate_gr('8402', confirm=True) is False
+    assert set(second.service.stats()) == {'values.get'}
+    assert second.service.stats()['values.get']['calls'] == 2
+
+
+def test_confirm_rebuilds_after_rows_above_moved(workers):
+    first, second = workers
+    second.rebuild_gr_index()
+    gr_column = first.read_gr_columns(['Class_IV'])['Class_IV']
+    assert first.delete_student_record('Class_IV', 2)
+    add(first, '8501')
+
+    # The tail no longer lines up with second's index, so it reads everything again
+    assert second.check_duplicate_gr('8501', confirm=True) is True
+    assert second.check_duplicate_gr(gr_column[0], confirm=True) is False
+
+
+def test_confirm_fails_instead_of_allowing_on_errors(workers):
+    first, _ = workers
+    first.rebuild_gr_index()
+    breaker = first.circuit_breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        first.check_duplicate_gr('8201', confirm=True)
+
+
+def test_submit_rejects_gr_added_by_another_worker(app_module, admin_client):
+    other = GoogleSheetsDataEntry(spreadsheet_id=app_module.data_entry.spreadsheet_id)
+    app_module.data_entry.rebuild_gr_index()
+    add(other, '8301')
+
+    response = admin_client.post('/submit', data={
+        'gr_number': '8301', 'student_name': 'Twin', 'father_name': 'Father',
+        'student_class': 'III', 'religion': 'Islam', 'gender': 'Male'}).get_json()
+    assert response['success'] is False
+    assert 'already exists' in response['message']
@@ -0,0 +1,61 @@
+"""Class sheet edits reach the main sheet (408070227), so later deletes still find the row"""
+
+import pytest
+
+from google_sheets_data_entry import GoogleSheetsDataEntry
+
+MAIN_SHEET = '408070227'
+
+
+@pytest.fixture(params=['sheets', 'sqlite'])
+def data_entry(request, tmp_path, monkeypatch):
+    monkeypatch.setenv('STUDENT_STORE', request.param)
+    monkeypatch.setenv('LOCAL_STORE_PATH', str(tmp_path / 'students.db'))
+    return GoogleSheetsDataEntry(spreadsheet_id=f'fake-mirror-{request.param}')
+
+
+def main_rows_with(data_entry, column, value):
+    values = data_entry.load_sheet_values([MAIN_SHEET])[MAIN_SHEET]
+    index = values[0].index(column)
+    return [row for row in values[1:] if len(row) > index and row[index] == value]
+
+
+def test_edit_is_mirrored_and_delete_finds_the_main_row(data_entry):
+    values = data_entry.load_sheet_values(['Class_III'])['Class_III']
+    student = dict(zip(values[0], values[2]))
+    old_gr = student['GR#']
+    main_count = len(data_entry.load_sheet_values([MAIN_SHEET])[MAIN_SHEET])
+
+    student.update({'GR#': '8801', 'Student Name': 'Renamed'})
+    assert data_entry.update_student_records([('Class_III', 3, student)])
+    assert main_rows_with(data_entry, 'GR#', old_gr) == []
+    assert [row[values[0].index('Student Name')] for row in main_rows_with(data_entry, 'GR#', '8801')] == ['Renamed']
+
+    assert data_entry.delete_student_record('Class_III', 3)
+    assert main_rows_with(data_entry, 'GR#', '8801') == []
+    assert len(data_entry.load_sheet_values([MAIN_SHEET])[MAIN_SHEET]) == main_count - 1
+
+
+def test_delete_after_another_worker_shifted_the_main_sheet():
+    first = GoogleSheetsDataEntry(spreadsheet_id='fake-mirror-shift')
+    second = GoogleSheetsDataEntry(spreadsheet_id='fake-mirror-shift')
+    second.rebuild_gr_index()
+
+    main_before = first.read_gr_columns([MAIN_SHEET])[MAIN_SHEET]
+    class_column = first.read_gr_columns(['Class_II'])['Class_II']
+    gone_first, target = class_column[0], class_column[3]
+
+    # Every main sheet row below the first worker's delete moves up...
+    assert first.delete_student_record('Class_II', 2)
+    # ...but the second worker's index still has the old row numbers
+    assert second.delete_student_record('Class_II', 4)
+
+    main_after = first.read_gr_columns([MAIN_SHEET])[MAIN_SHEET]
+    assert sorted(main_after) == sorted(gr for gr in main_before if gr not in (gone_first, target))
+
+
+def test_bulk_delete_message_counts_the_rows_deleted(admin_client):
+    response = admin_client.delete('/api/students', json={'rows': [['Class_VIII', 2], ['Class_VIII', 3]]}).get_json()
+    assert response['success']
+    assert response['message'] == '2 student(s) deleted successfully (2 main sheet row(s) removed with them)'
+    assert len(response['deleted']) == 4
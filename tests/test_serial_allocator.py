@@ -0,0 +1,74 @@
+"""Class_S.No counters only move forward, even across TTL expiry and reseeding"""
+
+import time
+
+import pytest
+
+from serial_allocator import ClassSerialAllocator, format_class_serial, parse_class_serial
+
+
+@pytest.fixture
+def allocator(tmp_path):
+    return ClassSerialAllocator(str(tmp_path / 'state' / 'serials.json'), ttl=0.05)
+
+
+def expire():
+    time.sleep(0.06)
+
+
+def test_reserve_needs_a_seed(allocator):
+    assert allocator.reserve('I') is None
+    allocator.seed('I', 4)
+    assert allocator.reserve('I') == 5
+    assert allocator.reserve_block('I', 3) == 6
+    assert allocator.peek('I') == 9
+
+
+def test_reseed_after_ttl_never_lowers_below_reservation(allocator):
+    allocator.seed('I', 4)
+    assert allocator.reserve_block('I', 3) == 5
+    expire()
+    # Sheets doesn't show the reserved rows yet (slow write)
+    allocator.seed('I', 4)
+    assert allocator.reserve('I') == 8
+
+
+def test_fresh_counter_is_not_lowered_by_a_seed(allocator):
+    allocator.seed('I', 10)
+    allocator.seed('I', 2)
+    assert allocator.peek('I') == 11
+
+
+def test_release_gives_back_only_the_last_reservation(allocator):
+    allocator.seed('I', 1)
+    first = allocator.reserve('I')
+    second = allocator.reserve('I')
+    allocator.release('I', first)
+    assert allocator.peek('I') == second + 1
+    allocator.release('I', second)
+    expire()
+    allocator.seed('I', 1)
+    assert allocator.reserve('I') == second
+
+
+def test_note_raises_the_counter(allocator):
+    allocator.seed('I', 1)
+    allocator.note('I', 20)
+    allocator.note('I', 5)
+    assert allocator.reserve('I') == 21
+
+
+def test_serials_are_unique_across_allocators(tmp_path):
+    # Two workers sharing the state file
+    path = str(tmp_path / 'serials.json')
+    workers = [ClassSerialAllocator(path, ttl=60), ClassSerialAllocator(path, ttl=60)]
+    workers[0].seed('I', 0)
+    taken = [workers[n % 2].reserve('I') for n in range(10)]
+    assert taken == list(range(1, 11))
+
+
+def test_format_and_parse_round_trip():
+    assert format_class_serial('III', 7) == 'III_07'
+    for value in ('III_07', 'III-07', 'III07', '07'):
+        assert parse_class_serial('III', value) == 7
+    assert parse_class_serial('III', 'IV_07') is None
@@ -0,0 +1,67 @@
+"""Workers sharing a SharedCache see each other's loads, patches and invalidations"""
+
+import pytest
+
+from shared_cache import SharedCache
+
+
+@pytest.fixture
+def workers(app_module, tmp_path):
+    """Two per-worker caches over one shared SQLite file, as two Gunicorn workers would have"""
+    path = str(tmp_path / 'shared' / 'cache.db')
+    return app_module.DataCache(shared=SharedCache(path)), app_module.DataCache(shared=SharedCache(path))
+
+
+def test_value_loaded_by_one_worker_is_reused_by_the_other(workers):
+    first, second = workers
+    assert first.get_or_load('class_I', lambda: ['a']) == ['a']
+    assert second.get_or_load('class_I', lambda: pytest.fail('loaded twice')) == ['a']
+
+
+def test_clear_in_one_worker_drops_the_others_copies(workers):
+    first, second = workers
+    first.set('class_I', ['a'])
+    assert second.get('class_I') == ['a']
+
+    first.clear()
+    assert second.get('class_I') is None
+    assert second.get_or_load('class_I', lambda: ['b']) == ['b']
+    assert first.get('class_I') == ['b']
+
+
+def test_patch_in_one_worker_is_seen_by_the_other(workers):
+    first, second = workers
+    first.set('class_I', ['a'])
+    first.set('class_II', ['x'])
+    assert second.get('class_I') == ['a']
+
+    first.patch([('class_I', lambda students: students + ['b']), ('class_II', lambda students: None)])
+    assert second.get('class_I') == ['a', 'b']
+    assert second.get('class_II') is None
+
+
+def test_load_in_flight_during_invalidation_is_not_cached(workers):
+    first, second = workers
+
+    def load():
+        # Another worker writes while this load is reading the old data
+        second.clear()
+        return ['old']
+
+    assert first.get_or_load('class_I', load) == ['old']
+    assert second.get('class_I') is None
+    assert first.get('class_I') is None
+
+
+def test_publish_replaces_every_workers_copy(workers):
+    first, second = workers
+    second.set('all_students', ['old'])
+    token = first.token()
+    assert first.publish({'all_students': ['new']}, token)
+    assert second.get('all_students') == ['new']
+
+
+def test_directory_is_created(tmp_path):
+    path = tmp_path / 'missing' / 'dir' / 'cache.db'
+    SharedCache(str(path)).set('key', 1)
+    assert path.exists()
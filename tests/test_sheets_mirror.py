@@ -0,0 +1,55 @@
+"""The local store's mirror blames the queued change that Sheets actually rejected"""
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from local_store import SheetsMirror
+
+
+class Response(dict):
+    status = 400
+    reason = 'Bad Request'
+
+
+class RecordingStore:
+    def __init__(self):
+        self.failed = []
+        self.completed = []
+
+    def complete_ops(self, last_id):
+        self.completed.append(last_id)
+
+    def fail_op(self, op_id):
+        self.failed.append(op_id)
+
+
+class DataEntry:
+    """Only the sheet named 'broken' is rejected"""
+
+    def get_sheet_id(self, sheet_name):
+        if sheet_name == 'broken':
+            raise HttpError(Response(), b'rejected')
+        return 1
+
+
+@pytest.fixture
+def mirror():
+    mirror = SheetsMirror(RecordingStore(), DataEntry(), interval=0)
+    mirror._request_for = lambda op, sheet_id: {}
+    return mirror
+
+
+def op(op_id, sheet_name):
+    return {'id': op_id, 'op': 'update', 'sheet_name': sheet_name, 'row_number': 2, 'data': [], 'attempts': 0}
+
+
+def test_rejection_behind_unsent_ops_isolates_instead_of_blaming_the_head(mirror):
+    assert mirror._push([op(1, 'Class_I'), op(2, 'broken')]) == 0
+    assert mirror.store.failed == []
+    assert mirror.store.completed == []
+    assert mirror._isolate
+
+
+def test_rejection_at_the_head_counts_against_that_op(mirror):
+    assert mirror._push([op(2, 'broken')]) == 0
+    assert mirror.store.failed == [2]
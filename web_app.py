@@ -6,12 +6,28 @@ Now using Google Sheets for cloud storage
 
 import os
 import time
-import random
+import contextlib
+
+# Import timing for cold starts and worker respawns (reported once the module has loaded)
+_import_started = time.perf_counter()
+
 import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, send_file
-from google_sheets_data_entry import GoogleSheetsDataEntry
+from google_sheets_data_entry import GoogleSheetsDataEntry, CLASS_NAMES, HEADERS
+from rate_limiter import priority, BACKGROUND
+from serial_allocator import format_class_serial
+from change_events import ADDED, DELETED, is_class_sheet
+from bulk_import import iter_upload_rows, import_students
+from sheets_supervisor import SheetsSupervisor
+from shared_cache import SharedCache
+from student_record import Student, header_index, iter_students, student_at, class_entries, all_students_entries
+from cache_snapshot import CacheSnapshot
+from cache_refresher import CacheRefresher
+from class_aggregates import build_aggregates, apply_events, is_current, count_sheet, class_wise_result, report_payload
+from cache_policy import CacheStats, key_family, estimate_size, ttls_from_env, max_bytes_from_env
 
 # Load environment variables first
 load_dotenv()
@@ -128,14 +144,15 @@ def check_required_env():
 def print_startup_summary():
     """Print a summary of the app's configuration"""
     source = globals().get('CONFIG_SOURCE', 'env')
-    enabled = os.environ.get('ENABLE_BACKGROUND_SYNC', 'False').lower() in ('1', 'true', 'yes')
     use_sheets = os.environ.get('USE_GOOGLE_SHEETS', 'False').lower() in ('1', 'true', 'yes')
     
     print('\n----- Startup Summary -----')
     print(f'CONFIG_SOURCE: {source}')
     print(f'DEBUG: {APP_CONFIG.get("debug", False)}')
-    print(f'ENABLE_BACKGROUND_SYNC: {enabled}')
+    print(f'ENABLE_BACKGROUND_SYNC: {BACKGROUND_SYNC_ENABLED}')
     print(f'USE_GOOGLE_SHEETS: {use_sheets}')
+    print(f'SHEETS_BACKEND: {os.environ.get("SHEETS_BACKEND", "google")}')
+    print(f'STUDENT_STORE: {os.environ.get("STUDENT_STORE", "sheets")}')
     print(f'SECRET_KEY: {_mask(SECRET_KEY)}')
     print(f'GOOGLE_SHEETS_ID: {_mask(os.environ.get("GOOGLE_SHEETS_ID", ""))}')
     print(f'ADMIN_PASSWORD set: {bool(os.environ.get("ADMIN_PASSWORD"))}')
@@ -149,8 +166,6 @@ def print_startup_summary():
 
 from functools import wraps
 from dotenv import load_dotenv
-import importlib
-import consolidate_data
 
 # Load environment variables
 load_dotenv()
@@ -178,91 +193,371 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Initialize Google Sheets data entry with proper configuration and retry logic
+# Google Sheets client; set by the connection supervisor once it connects
 data_entry = None
 sheets_config = GOOGLE_SHEETS_CONFIG if 'GOOGLE_SHEETS_CONFIG' in globals() else {
     'spreadsheet_id': os.environ.get('GOOGLE_SHEETS_ID'),
     'credentials_file': os.environ.get('GOOGLE_CREDENTIALS_FILE', 'credentials.json'),
     'credentials_json': os.environ.get('GOOGLE_CREDENTIALS_JSON')
 }
+if not sheets_config.get('spreadsheet_id'):
+    print("⚠️ No GOOGLE_SHEETS_ID found in environment or config")
+
+def connect_google_sheets():
+    """Build the Google Sheets client; runs on the supervisor thread and raises on failure"""
+    print(f"Initializing Google Sheets connection to spreadsheet: {sheets_config['spreadsheet_id']}")
+    entry = GoogleSheetsDataEntry(
+        spreadsheet_id=sheets_config['spreadsheet_id'],
+        credentials_file=sheets_config.get('credentials_file')
+    )
+    print("✅ Google Sheets connection initialized successfully")
+    return entry
 
-def init_google_sheets(max_retries=3):
-    """Initialize Google Sheets connection with retries"""
+def on_sheets_connected(entry):
+    """Publish a (re)connected client to the routes"""
     global data_entry
+    entry.add_change_listener(apply_student_changes)
+    data_entry = entry
+    if BACKGROUND_SYNC_ENABLED:
+        cache_refresher.ensure_started()
+
+class SingleFlight:
+    """Coalesce concurrent loads of the same key into one upstream fetch"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
     
-    if not sheets_config.get('spreadsheet_id'):
-        print("⚠️ No GOOGLE_SHEETS_ID found in environment or config")
-        return False
+    def do(self, key, loader):
+        """Run loader() for key, or wait for the call already in flight and share its result"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self.calls[key] = call
+        
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
         
-    print(f"Initializing Google Sheets connection to spreadsheet: {sheets_config['spreadsheet_id']}")
-    
-    for attempt in range(max_retries):
         try:
-            data_entry = GoogleSheetsDataEntry(
-                spreadsheet_id=sheets_config['spreadsheet_id'],
-                credentials_file=sheets_config.get('credentials_file')
-            )
-            print("✅ Google Sheets connection initialized successfully")
-            return True
-            
+            call['result'] = loader()
+            return call['result']
         except Exception as e:
-            error_msg = str(e)
-            print(f"❌ Connection attempt {attempt + 1}/{max_retries} failed:")
-            print(f"   Error: {error_msg}")
-            
-            # Don't retry on SSL errors - they tend to persist
-            if 'SSL' in error_msg or 'ssl' in error_msg.lower():
-                print("   SSL error detected - skipping retries")
-                break
-                
-            if attempt < max_retries - 1:
-                wait_time = (2 ** attempt) + random.random()
-                print(f"   Retrying in {wait_time:.1f} seconds...")
-                time.sleep(wait_time)
-                continue
-                
-    print("❌ Failed to initialize Google Sheets after all retries")
-    data_entry = None
-    return False
-
-# Try to initialize Google Sheets (non-blocking)
-try:
-    init_google_sheets()
-except Exception as e:
-    print(f"⚠️ Google Sheets initialization failed: {e}")
-    print("📱 Server will start without Google Sheets connection")
-    data_entry = None
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call['done'].set()
 
 # Cache system for better performance
 class DataCache:
-    def __init__(self):
-        self.cache = {}
+    """Per-worker LRU cache, optionally backed by a host-wide SharedCache tier.
+
+    Entries expire after their key family's TTL (see cache_policy) and the
+    least recently used ones are evicted once the estimated size passes
+    max_bytes. With a shared tier, values loaded by one worker are reused by
+    the others, and clear() in any worker bumps the shared generation, which
+    makes every worker drop its in-process copies on its next lookup.
+    """
+    def __init__(self, degraded=None, shared=None, default_ttl=300, ttls=None, max_bytes=64 * 1024 * 1024):
+        self.cache = OrderedDict()  # least recently used first
         self.cache_timestamps = {}
-        self.cache_duration = 300  # 5 minutes cache
+        self.cache_sizes = {}
+        self.total_bytes = 0
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
         self.lock = threading.Lock()
+        self.flight = SingleFlight()
+        self.generation = 0  # bumped by clear() so in-flight loads don't cache stale data
+        # Returns True while upstream is known to be down (serve stale instead of loading)
+        self.degraded = degraded or (lambda: False)
+        self.shared = shared
+        self.shared_generation = shared.generation() if shared is not None else None
+    
+    def ttl(self, key):
+        return self.ttls.get(key_family(key), self.default_ttl)
+    
+    def _put(self, key, value, timestamp):
+        """Store an entry and evict least recently used ones over the byte budget (lock held)"""
+        self._drop(key)
+        size = estimate_size(value)
+        self.cache[key] = value
+        self.cache_timestamps[key] = timestamp
+        self.cache_sizes[key] = size
+        self.total_bytes += size
+        # The newest entry is always kept, even if it alone is over budget
+        while self.total_bytes > self.max_bytes and len(self.cache) > 1:
+            evicted = next(iter(self.cache))
+            self._drop(evicted)
+            self.stats.record(evicted, 'evictions')
+    
+    def _drop(self, key):
+        """Remove an entry (lock held)"""
+        if key in self.cache:
+            del self.cache[key]
+            self.cache_timestamps.pop(key, None)
+            self.total_bytes -= self.cache_sizes.pop(key, 0)
+    
+    def _reset(self):
+        """Remove every entry (lock held)"""
+        self.cache.clear()
+        self.cache_timestamps.clear()
+        self.cache_sizes.clear()
+        self.total_bytes = 0
+    
+    def _sync_shared_generation(self):
+        """Drop local copies if another worker invalidated the shared tier"""
+        if self.shared is None:
+            return
+        generation = self.shared.generation()
+        with self.lock:
+            if generation is not None and generation != self.shared_generation:
+                self._reset()
+                self.generation += 1
+                self.shared_generation = generation
+    
+    def _token(self):
+        """Generation marker taken before a load; _store() drops the result if it changed"""
+        with self.lock:
+            return (self.generation, self.shared_generation)
     
     def get(self, key):
+        # Misses are counted by get_or_load, so a probe followed by a load counts once
+        value, source = self._lookup(key)
+        if source is not None:
+            self.stats.record(key, source)
+        return value
+    
+    def _lookup(self, key):
+        """(value, 'hits' or 'shared_hits') for a fresh entry, or (None, None)"""
+        self._sync_shared_generation()
+        ttl = self.ttl(key)
         with self.lock:
             if key in self.cache:
-                timestamp = self.cache_timestamps.get(key, 0)
-                if time.time() - timestamp < self.cache_duration:
-                    return self.cache[key]
-                else:
-                    # Cache expired, remove it
-                    del self.cache[key]
-                    if key in self.cache_timestamps:
-                        del self.cache_timestamps[key]
-            return None
+                if time.time() - self.cache_timestamps[key] < ttl:
+                    self.cache.move_to_end(key)
+                    return self.cache[key], 'hits'
+                # Expired entries stay around as last known good data until evicted or cleared
+        
+        if self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None and time.time() - entry[1] < ttl:
+                with self.lock:
+                    self._put(key, entry[0], entry[1])
+                return entry[0], 'shared_hits'
+        return None, None
+    
+    def get_stale(self, key):
+        """Last known good value for key, even if it has expired"""
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]
+        if self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                return entry[0]
+        return None
     
     def set(self, key, value):
         with self.lock:
-            self.cache[key] = value
-            self.cache_timestamps[key] = time.time()
+            self._put(key, value, time.time())
+        if self.shared is not None:
+            self.shared.set(key, value)
+    
+    def _store(self, key, value, token):
+        with self.lock:
+            if token[0] != self.generation:
+                return
+            self._put(key, value, time.time())
+        if self.shared is not None:
+            self.shared.set(key, value, generation=token[1])
     
     def clear(self):
         with self.lock:
-            self.cache.clear()
-            self.cache_timestamps.clear()
+            self._reset()
+            self.generation += 1
+        if self.shared is not None:
+            generation = self.shared.invalidate()
+            with self.lock:
+                if generation is not None:
+                    self.shared_generation = generation
+    
+    def patch(self, updates):
+        """Apply (key, fn) updates to cached values in place instead of clearing them.
+
+        fn(value) returns the new value, or None to drop the entry; patched
+        entries keep their timestamps. Loads already in flight are discarded.
+        With a shared tier the host-wide copies are patched and every worker
+        re-reads them; if that fails, the cache is cleared instead.
+        """
+        if self.shared is not None:
+            generation = self.shared.patch(updates)
+            if generation is None:
+                self.clear()
+                return
+            with self.lock:
+                self._reset()
+                self.generation += 1
+                self.shared_generation = generation
+            return
+        
+        with self.lock:
+            self.generation += 1
+            try:
+                patched = {key: fn(self.cache[key]) for key, fn in updates if key in self.cache}
+            except Exception as e:
+                print(f"⚠️ Cache patch failed, clearing cache: {e}")
+                self._reset()
+                return
+            for key, value in patched.items():
+                if value is None:
+                    self._drop(key)
+                else:
+                    self._put(key, value, self.cache_timestamps[key])
+    
+    def token(self):
+        """Marker to take before loading values for publish()"""
+        self._sync_shared_generation()
+        return self._token()
+    
+    def publish(self, entries, token):
+        """Store freshly loaded values for several keys and make every worker use them.
+
+        Skipped (returns False) if anything was written or cleared since
+        token was taken, since the values may predate it. With a shared tier
+        the generation is bumped, so other workers drop their in-process
+        copies and read these.
+        """
+        if self.shared is not None:
+            generation = self.shared.replace(entries, generation=token[1])
+            if generation is None:
+                return False
+        with self.lock:
+            if token[0] != self.generation:
+                return False
+            self.generation += 1
+            if self.shared is not None:
+                self._reset()
+                self.shared_generation = generation
+            now = time.time()
+            for key, value in entries.items():
+                self._put(key, value, now)
+        return True
+    
+    def stats_snapshot(self):
+        """Per-family counters plus what this worker currently holds"""
+        families = self.stats.snapshot()
+        with self.lock:
+            for key in self.cache:
+                family = families.setdefault(key_family(key), {})
+                family['entries'] = family.get('entries', 0) + 1
+                family['bytes'] = family.get('bytes', 0) + self.cache_sizes[key]
+            total_bytes, entries = self.total_bytes, len(self.cache)
+        for family, counters in families.items():
+            counters['ttl'] = self.ttl(family)
+        return {
+            'pid': os.getpid(),
+            'entries': entries,
+            'bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'shared': self.shared is not None,
+            'families': families
+        }
+    
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, or load it once no matter how many callers miss together"""
+        return self.get_or_load_with_status(key, loader)[0]
+    
+    def get_or_load_with_status(self, key, loader):
+        """Like get_or_load, but returns (value, stale).
+
+        While upstream is degraded, or if the load fails, the last known good
+        value is returned with stale=True and refreshed in the background.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, False
+        self.stats.record(key, 'misses')
+        
+        stale = self.get_stale(key)
+        if stale is not None and self.degraded():
+            self.stats.record(key, 'stale')
+            self.refresh_in_background(key, loader)
+            return stale, True
+        
+        def load():
+            # Another caller may have filled the cache while we waited for the flight
+            value = self._lookup(key)[0]
+            if value is not None:
+                return value, False
+            with self._shared_load_lock(key):
+                # ...or another worker, while we waited for the host-wide lock
+                value = self._lookup(key)[0]
+                if value is not None:
+                    return value, False
+                token = self._token()
+                start = time.time()
+                try:
+                    value = loader()
+                except Exception as e:
+                    self.stats.record(key, 'load_errors')
+                    stale = self.get_stale(key)
+                    if stale is None:
+                        raise
+                    print(f"⚠️ Serving stale '{key}' after refresh failed: {e}")
+                    self.stats.record(key, 'stale')
+                    return stale, True
+                self.stats.record_load(key, time.time() - start)
+                self._store(key, value, token)
+                return value, False
+        
+        return self.flight.do(key, load)
+    
+    def _shared_load_lock(self, key):
+        if self.shared is None:
+            return contextlib.nullcontext()
+        return self.shared.load_lock(key)
+    
+    def reload(self, key, loader):
+        """Load key again even if it is cached, and store the result"""
+        token = self._token()
+        start = time.time()
+        try:
+            value = self.flight.do(('refresh', key), loader)
+        except Exception:
+            self.stats.record(key, 'load_errors')
+            raise
+        self.stats.record_load(key, time.time() - start)
+        self._store(key, value, token)
+        return value
+    
+    def refresh_in_background(self, key, loader):
+        """Reload key on a daemon thread unless a refresh is already running"""
+        with self.flight.lock:
+            if ('refresh', key) in self.flight.calls:
+                return
+        
+        def refresh():
+            try:
+                with priority(BACKGROUND):
+                    self.reload(key, loader)
+            except Exception as e:
+                print(f"⚠️ Background refresh of '{key}' failed: {e}")
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def restore(self, entries):
+        """Put entries saved by an earlier process into this worker's tier as fresh values"""
+        now = time.time()
+        with self.lock:
+            for key, value in entries.items():
+                self._put(key, value, now)
     
     def get_all_data(self):
         return self.get('all_students')
@@ -281,82 +576,176 @@ class DataCache:
     
     def set_class_wise_data(self, data):
         self.set('class_wise_data', data)
+    
+    def get_school_snapshot(self):
+        return self.get('school_snapshot')
+    
+    def set_school_snapshot(self, data):
+        self.set('school_snapshot', data)
+
+# Initialize cache; serve last known good data while the Sheets circuit is open
+cache_duration = APP_CONFIG.get('cache_duration', 300)
+data_cache = DataCache(
+    degraded=lambda: data_entry is not None and data_entry.circuit_breaker.is_open(),
+    shared=SharedCache.from_env(sheets_config.get('spreadsheet_id') or 'default'),
+    default_ttl=cache_duration,
+    ttls=ttls_from_env(cache_duration),
+    max_bytes=max_bytes_from_env()
+)
+
+# Entries written to disk so a recycled or redeployed worker starts warm
+SNAPSHOT_KEYS = ('school_snapshot', 'class_aggregates', 'class_wise_data', 'all_students')
+
+cache_snapshot = CacheSnapshot.from_env(
+    sheets_config.get('spreadsheet_id') or 'default',
+    schema='|'.join(HEADERS)
+)
+
+def restore_cache_snapshot():
+    """Load the on-disk snapshot into the cache; returns the restored keys (revalidated on connect)"""
+    saved = cache_snapshot.load() if cache_snapshot is not None else None
+    if not saved:
+        return set()
+    entries, saved_at = saved
+    entries = {key: value for key, value in entries.items() if key in SNAPSHOT_KEYS}
+    data_cache.restore(entries)
+    print(f"✅ Restored {len(entries)} cache entries saved {time.time() - saved_at:.0f}s ago")
+    return set(entries)
+
+def snapshot_entries():
+    return {key: data_cache.get_stale(key) for key in SNAPSHOT_KEYS}
+
+def save_cache_snapshot():
+    if cache_snapshot is not None:
+        cache_snapshot.save(snapshot_entries())
+
+restored_cache_keys = restore_cache_snapshot()
+
+# Periodic refresh of every cached key from one batchGet; replaces the old per-worker background_sync
+BACKGROUND_SYNC_ENABLED = os.environ.get('ENABLE_BACKGROUND_SYNC', 'true').lower() in ('1', 'true', 'yes')
+
+def refresh_cached_data():
+    """Read every class sheet with one batchGet and publish the snapshot, counts and student lists.
+
+    Always a full read: the tail sync can't see edits to existing rows made by
+    other workers or in the Sheets UI, and publish() overwrites every worker's
+    patched copies with whatever is read here.
+    """
+    entry = data_entry
+    if entry is None or entry.circuit_breaker.is_open():
+        raise RuntimeError('Google Sheets is not available')
+    token = data_cache.token()
+    with entry.isolated_http(), priority(BACKGROUND):
+        snapshot = entry.load_school_snapshot(incremental=False)
+    aggregates = build_aggregates(snapshot, CLASS_NAMES)
+    entries = {
+        'school_snapshot': snapshot,
+        'class_aggregates': aggregates,
+        'class_wise_data': class_wise_result(aggregates, CLASS_NAMES),
+        'all_students': snapshot_all_students(snapshot)
+    }
+    for class_name in CLASS_NAMES:
+        entries[f'class_{class_name}'] = snapshot_class_students(snapshot, class_name)
+    if data_cache.publish(entries, token):
+        save_cache_snapshot()
+    else:
+        print("🔄 Cache refresh skipped: data changed while it was loading")
 
-# Initialize cache
-data_cache = DataCache()
+cache_refresher = CacheRefresher.from_env(
+    refresh_cached_data,
+    # Without the shared tier there is nothing to share, so every worker refreshes its own cache
+    lock_path=f'{data_cache.shared.path}.refresher.lock' if data_cache.shared is not None else None
+)
 
-# Background sync thread
-def background_sync():
-    """Background thread to sync data periodically"""
-    while True:
-        try:
-            print("🔄 Background sync started...")
-            # Sync all data
-            all_students = data_entry.get_all_students()
-            data_cache.set_all_data(all_students)
-            
-            # Sync class-wise data (use method if present, otherwise compute)
-            try:
-                if hasattr(data_entry, 'get_class_wise_data') and callable(getattr(data_entry, 'get_class_wise_data')):
-                    class_wise_data = data_entry.get_class_wise_data()
-                else:
-                    # Compute class-wise data using available methods
-                    classes = ['ECE', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
-                    class_wise_data = []
-                    for cls in classes:
-                        try:
-                            student_count = data_entry.get_class_student_count(cls)
-                            male_count = data_entry.get_class_gender_count(cls, 'Male')
-                            female_count = data_entry.get_class_gender_count(cls, 'Female')
-                        except Exception as inner_e:
-                            print(f"Warning: error getting stats for {cls}: {inner_e}")
-                            student_count = male_count = female_count = 0
-                        class_wise_data.append({
-                            'name': cls,
-                            'total_students': student_count,
-                            'male_students': male_count,
-                            'female_students': female_count
-                        })
-                data_cache.set_class_wise_data(class_wise_data)
-            except Exception as e:
-                # Log and continue; don't let missing helper break the entire sync
-                print(f"❌ Background sync error (class-wise): {e}")
-            
-            # Sync individual class data
-            classes = ['ECE', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
-            for class_name in classes:
-                class_data = data_entry.get_class_students(class_name)
-                data_cache.set_class_data(class_name, class_data)
-            
-            print("✅ Background sync completed")
-            time.sleep(300)  # Sync every 5 minutes
-        except Exception as e:
-            # Common network/SSL/HTTP errors can cause transient failures. Log full detail and back off.
-            print(f"❌ Background sync error: {e}")
-            time.sleep(60)  # Wait 1 minute on error
+def get_school_snapshot():
+    """Get the class-sheet snapshot from cache, loading it with one batchGet on a miss"""
+    return data_cache.get_or_load('school_snapshot', data_entry.load_school_snapshot)
 
-def start_background_sync_if_needed():
-        """Start the background sync thread only when appropriate.
+def load_class_aggregates():
+    return build_aggregates(get_school_snapshot(), CLASS_NAMES)
 
-        - If running as the main module (development), start it.
-        - If the environment variable ENABLE_BACKGROUND_SYNC is set to true, start it
-            (useful if you intentionally want the sync running under your process manager).
-        This avoids spinning up background threads in every Gunicorn worker by default.
-        """
-        enabled = os.environ.get('ENABLE_BACKGROUND_SYNC', 'False').lower() in ('1', 'true', 'yes')
-        # Temporarily disable background sync to prevent SSL crashes
-        print(f"Background sync disabled to prevent SSL connection issues (enabled={enabled}, __name__={__name__})")
-        return
-        
-        if __name__ == '__main__' or enabled:
-                print(f"Starting background sync (enabled={enabled}, __name__={__name__})")
-                sync_thread = threading.Thread(target=background_sync, daemon=True)
-                sync_thread.start()
+def get_class_aggregates():
+    """Get the per-class counts from cache, building them from the snapshot on a miss.
+
+    Write events keep them current; they are rebuilt when the day changes so
+    the age bands follow today's date.
+    """
+    aggregates = data_cache.get_or_load('class_aggregates', load_class_aggregates)
+    if not is_current(aggregates):
+        aggregates = data_cache.reload('class_aggregates', load_class_aggregates)
+    return aggregates
+
+def get_class_wise_result():
+    """Get the /api/class_wise_data payload from cache, deriving it from the class aggregates on a miss"""
+    result, stale = data_cache.get_or_load_with_status(
+        'class_wise_data', lambda: class_wise_result(get_class_aggregates(), CLASS_NAMES))
+    return dict(result, stale=True) if stale else result
+
+def warm_up_caches(entry):
+    """Load the snapshot, GR# index and student lists before the first requests need them.
+
+    Entries restored from the on-disk snapshot are served meanwhile and
+    replaced here with fresh loads; the results are then saved back to disk.
+    """
+    with priority(BACKGROUND):
+        if restored_cache_keys:
+            data_cache.reload('school_snapshot', entry.load_school_snapshot)
+            data_cache.reload('class_aggregates', load_class_aggregates)
+            data_cache.reload('class_wise_data', lambda: class_wise_result(get_class_aggregates(), CLASS_NAMES))
+            data_cache.reload('all_students', load_all_students)
+            restored_cache_keys.clear()
         else:
-                print("Background sync not started (set ENABLE_BACKGROUND_SYNC=true to enable under WSGI).")
+            get_class_wise_result()
+            data_cache.get_or_load('all_students', load_all_students)
+        if entry.store is None:
+            entry.rebuild_gr_index()
+    save_cache_snapshot()
+
+# Connects in the background (lazily, once per worker) so the server binds immediately
+sheets_supervisor = SheetsSupervisor.from_env(
+    connect_google_sheets,
+    on_connect=on_sheets_connected,
+    warm_up=warm_up_caches,
+    is_healthy=lambda entry: not entry.circuit_breaker.is_open()
+)
+
+@app.before_request
+def start_sheets_supervisor():
+    if sheets_config.get('spreadsheet_id'):
+        sheets_supervisor.ensure_started()
+
+def wait_for_sheets():
+    """None once Google Sheets is connected, else why not (after waiting up to SHEETS_READY_WAIT_SECONDS)"""
+    if not sheets_config.get('spreadsheet_id'):
+        return 'Google Sheets not configured.'
+    if not sheets_supervisor.wait_ready(float(os.environ.get('SHEETS_READY_WAIT_SECONDS', 5))):
+        return 'Google Sheets is still connecting. Please try again shortly.'
+    return None
+
+def sheets_required(f):
+    """Answer 503 JSON while Google Sheets is still connecting"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        problem = wait_for_sheets()
+        if problem is not None:
+            if not sheets_config.get('spreadsheet_id'):
+                return jsonify({'success': False, 'message': problem}), 503
+            response = jsonify({'success': False, 'ready': False, 'message': problem})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        return f(*args, **kwargs)
+    return decorated_function
+
+def sheets_page_required(f):
+    """Like sheets_required, for pages: renders the error page with a 503 instead of JSON"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        problem = wait_for_sheets()
+        if problem is not None:
+            return render_template('error.html', error=problem), 503, {'Retry-After': '5'}
+        return f(*args, **kwargs)
+    return decorated_function
 
-# Attempt to start background sync only when appropriate
-start_background_sync_if_needed()
 
 @app.route('/')
 def index():
@@ -415,13 +804,7 @@ def dashboard():
     user_role = session.get('role')
     user_access = session.get('access')
     
-    # Check Google Sheets connection
-    if not data_entry:
-        flash("⚠️ Google Sheets connection is not available. Some features may be limited.", "warning")
-        if user_role == 'admin':
-            # Only admin can retry connection
-            return redirect(url_for('admin_dashboard', retry_sheets='1'))
-    
+    # The pages redirected to wait for the Sheets connection themselves
     if user_role == 'admin':
         return redirect(url_for('admin_dashboard'))
     else:
@@ -451,6 +834,7 @@ def form(class_name=None):
 
 @app.route('/submit', methods=['POST'])
 @login_required
+@sheets_required
 def submit_data():
     try:
         # Get form data
@@ -475,8 +859,8 @@ def submit_data():
             'Remarks': request.form.get('remarks')
         }
         
-        # Check for duplicate GR number
-        if data_entry.check_duplicate_gr(student_data['GR#']):
+        # Check for duplicate GR number (confirmed against Sheets, not just this worker's index)
+        if data_entry.check_duplicate_gr(student_data['GR#'], confirm=True):
             return jsonify({
                 'success': False,
                 'message': f'GR Number {student_data["GR#"]} already exists!'
@@ -486,74 +870,7 @@ def submit_data():
         success = data_entry.add_student_record(student_data)
         
         if success:
-            # Clear and refresh caches so admin dashboard shows updated totals immediately
-            try:
-                data_cache.clear()
-
-                # Try to repopulate the all-students cache (if available)
-                try:
-                    if hasattr(data_entry, 'get_all_students'):
-                        all_students = data_entry.get_all_students()
-                        data_cache.set_all_data(all_students)
-                except Exception as _:
-                    # Non-fatal: if repopulate fails, cache was cleared and will be rebuilt later
-                    pass
-
-                # Refresh the class-specific cache for the class we just added
-                try:
-                    cls = student_data.get('Student Class')
-                    if cls:
-                        if hasattr(data_entry, 'get_class_students'):
-                            class_students = data_entry.get_class_students(cls)
-                            data_cache.set_class_data(cls, class_students)
-                except Exception:
-                    pass
-
-                # Refresh overall class-wise summary if helper exists, otherwise compute quickly
-                try:
-                    if hasattr(data_entry, 'get_class_wise_data'):
-                        data_cache.set_class_wise_data(data_entry.get_class_wise_data())
-                    else:
-                        # Quick computation fallback
-                        all_classes = ['ECE', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
-                        classes_data = []
-                        total_students = total_male = total_female = 0
-                        for class_name in all_classes:
-                            try:
-                                c_total = data_entry.get_class_student_count(class_name)
-                                c_male = data_entry.get_class_gender_count(class_name, 'Male')
-                                c_female = data_entry.get_class_gender_count(class_name, 'Female')
-                                next_sno = data_entry.get_next_class_serial_number(class_name)
-                                total_students += c_total
-                                total_male += c_male
-                                total_female += c_female
-                                classes_data.append({
-                                    'name': class_name,
-                                    'total_students': c_total,
-                                    'male_students': c_male,
-                                    'female_students': c_female,
-                                    'next_sno': next_sno
-                                })
-                            except Exception:
-                                classes_data.append({
-                                    'name': class_name,
-                                    'total_students': 0,
-                                    'male_students': 0,
-                                    'female_students': 0,
-                                    'next_sno': 1
-                                })
-                        data_cache.set_class_wise_data({'success': True, 'classes': classes_data, 'summary': {
-                            'total_students': total_students,
-                            'total_male': total_male,
-                            'total_female': total_female
-                        }})
-                except Exception:
-                    pass
-
-            except Exception:
-                # Non-fatal: ensure outer try has an except so syntax is valid
-                pass
-
+            # The write's change event has already patched the cached rosters and counts
             return jsonify({
                 'success': True,
                 'message': 'Student data saved successfully!'
@@ -572,6 +889,7 @@ def submit_data():
 
 @app.route('/check_gr/<gr_number>')
 @login_required
+@sheets_required
 def check_gr(gr_number):
     """Check if GR number already exists"""
     exists = data_entry.check_duplicate_gr(gr_number)
@@ -579,13 +897,15 @@ def check_gr(gr_number):
 
 @app.route('/get_next_class_sno/<student_class>')
 @login_required
+@sheets_required
 def get_next_class_sno(student_class):
     """Get the next serial number for a class"""
     try:
         next_sno = data_entry.get_next_class_serial_number(student_class)
         return jsonify({
             'success': True,
-            'next_sno': next_sno
+            'next_sno': next_sno,
+            'next_class_sno': format_class_serial(student_class, next_sno)
         })
     except Exception as e:
         return jsonify({
@@ -595,6 +915,7 @@ def get_next_class_sno(student_class):
 
 @app.route('/admin_dashboard')
 @admin_required
+@sheets_page_required
 def admin_dashboard():
     """Admin dashboard with full access"""
     try:
@@ -634,22 +955,21 @@ def admin_dashboard():
                 cached = None
 
         if not cached:
-            # Cache miss or invalid cache: query class counts (with error handling)
+            # Cache miss or invalid cache: derive class counts from one snapshot read
             total_students = 0
-            all_classes = ['ECE', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
-            for class_name in all_classes:
-                try:
-                    if data_entry:
-                        class_count = data_entry.get_class_student_count(class_name)
-                        total_students += class_count
-                        class_stats[class_name] = class_count
-                    else:
-                        class_stats[class_name] = 0
-                        sheets_connection_error = True
-                except Exception as e:
-                    print(f"Error getting count for class {class_name}: {e}")
-                    class_stats[class_name] = 0
+            try:
+                if data_entry:
+                    class_wise = get_class_wise_result()
+                    total_students = class_wise['summary']['total_students']
+                    for c in class_wise['classes']:
+                        class_stats[c['name']] = c['total_students']
+                else:
+                    class_stats = {class_name: 0 for class_name in CLASS_NAMES}
                     sheets_connection_error = True
+            except Exception as e:
+                print(f"Error getting class counts: {e}")
+                class_stats = {class_name: 0 for class_name in CLASS_NAMES}
+                sheets_connection_error = True
 
         # If we couldn't get any data, show a warning but don't crash
         if sheets_connection_error or (total_students == 0 and not cached):
@@ -670,6 +990,7 @@ def admin_dashboard():
 
 @app.route('/class_dashboard/<class_name>')
 @login_required
+@sheets_page_required
 def class_dashboard(class_name):
     """Class-specific dashboard for teachers"""
     user_access = session.get('access')
@@ -681,9 +1002,13 @@ def class_dashboard(class_name):
     
     try:
         # Get class-specific statistics
-        class_students = data_entry.get_class_student_count(class_name)
-        boys_students = data_entry.get_class_gender_count(class_name, 'Male')
-        girls_students = data_entry.get_class_gender_count(class_name, 'Female')
+        counts = get_class_aggregates()['classes'].get(class_name) if class_name in CLASS_NAMES else None
+        if counts is not None:
+            class_students, boys_students, girls_students = counts['total'], counts['male'], counts['female']
+        else:
+            class_students = data_entry.get_class_student_count(class_name)
+            boys_students = data_entry.get_class_gender_count(class_name, 'Male')
+            girls_students = data_entry.get_class_gender_count(class_name, 'Female')
         
         # Get next serial number
         next_sno = data_entry.get_next_class_serial_number(class_name)
@@ -708,6 +1033,7 @@ def data_edit():
 
 @app.route('/admin_student_edit')
 @login_required
+@sheets_page_required
 def admin_student_edit():
     """Admin student edit page"""
     sheet_name = request.args.get('sheet')
@@ -719,36 +1045,24 @@ def admin_student_edit():
     
     try:
         row_number = int(row_number)
-        sheet_data = data_entry.get_sheet_data(sheet_name)
+        student = student_at(sheet_name, data_entry.get_sheet_data(sheet_name), row_number)
         
-        if not sheet_data or len(sheet_data) < row_number:
+        if student is None:
             flash('Student not found', 'error')
             return redirect(url_for('admin_dashboard'))
         
-        # Get headers and student data
-        headers = sheet_data[0]
-        student_row = sheet_data[row_number - 1]  # Convert to 0-indexed
-        
-        # Pad student row if needed
-        while len(student_row) < len(headers):
-            student_row.append('')
-        
-        # Create student dictionary
-        student = {}
-        for i, header in enumerate(headers):
-            student[header] = student_row[i] if i < len(student_row) else ''
-        
         return render_template('admin_student_edit.html', 
-                             student=student, 
+                             student=student.as_dict(), 
                              sheet_name=sheet_name, 
                              row_number=row_number,
-                             headers=headers)
+                             headers=list(student.index))
     except Exception as e:
         flash(f'Error loading student: {str(e)}', 'error')
         return redirect(url_for('admin_dashboard'))
 
 @app.route('/teacher_student_edit')
 @login_required
+@sheets_page_required
 def teacher_student_edit():
     """Teacher student edit page"""
     sheet_name = request.args.get('sheet')
@@ -760,30 +1074,17 @@ def teacher_student_edit():
     
     try:
         row_number = int(row_number)
-        sheet_data = data_entry.get_sheet_data(sheet_name)
+        student = student_at(sheet_name, data_entry.get_sheet_data(sheet_name), row_number)
         
-        if not sheet_data or len(sheet_data) < row_number:
+        if student is None:
             flash('Student not found', 'error')
             return redirect(url_for('dashboard'))
         
-        # Get headers and student data
-        headers = sheet_data[0]
-        student_row = sheet_data[row_number - 1]  # Convert to 0-indexed
-        
-        # Pad student row if needed
-        while len(student_row) < len(headers):
-            student_row.append('')
-        
-        # Create student dictionary
-        student = {}
-        for i, header in enumerate(headers):
-            student[header] = student_row[i] if i < len(student_row) else ''
-        
         return render_template('teacher_student_edit.html', 
-                             student=student, 
+                             student=student.as_dict(), 
                              sheet_name=sheet_name, 
                              row_number=row_number,
-                             headers=headers)
+                             headers=list(student.index))
     except Exception as e:
         flash(f'Error loading student: {str(e)}', 'error')
         return redirect(url_for('dashboard'))
@@ -808,6 +1109,7 @@ def settings():
 
 @app.route('/api/class_wise_data')
 @login_required
+@sheets_required
 def api_class_wise_data():
     """API endpoint to get class-wise data overview"""
     if data_entry is None:
@@ -818,59 +1120,8 @@ def api_class_wise_data():
         if cached_data is not None:
             return jsonify(cached_data)
         
-        # Cache miss, fetch from Google Sheets
-        all_classes = ['ECE', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
-        classes_data = []
-        
-        # Summary statistics
-        total_students = 0
-        total_male = 0
-        total_female = 0
-        
-        for class_name in all_classes:
-            try:
-                # Get class statistics
-                class_students = data_entry.get_class_student_count(class_name)
-                male_students = data_entry.get_class_gender_count(class_name, 'Male')
-                female_students = data_entry.get_class_gender_count(class_name, 'Female')
-                next_sno = data_entry.get_next_class_serial_number(class_name)
-                
-                # Add to totals
-                total_students += class_students
-                total_male += male_students
-                total_female += female_students
-                
-                classes_data.append({
-                    'name': class_name,
-                    'total_students': class_students,
-                    'male_students': male_students,
-                    'female_students': female_students,
-                    'next_sno': next_sno
-                })
-            except Exception as e:
-                # If there's an error with a specific class, continue with others
-                classes_data.append({
-                    'name': class_name,
-                    'total_students': 0,
-                    'male_students': 0,
-                    'female_students': 0,
-                    'next_sno': 1
-                })
-        
-        result = {
-            'success': True,
-            'classes': classes_data,
-            'summary': {
-                'total_students': total_students,
-                'total_male': total_male,
-                'total_female': total_female
-            }
-        }
-        
-        # Cache the result
-        data_cache.set_class_wise_data(result)
-        
-        return jsonify(result)
+        # Cache miss, derive everything from one batchGet snapshot (shared by concurrent callers)
+        return jsonify(get_class_wise_result())
     except Exception as e:
         return jsonify({
             'success': False,
@@ -880,23 +1131,15 @@ def api_class_wise_data():
 
 @app.route('/api/next_class_snos')
 @login_required
+@sheets_required
 def api_next_class_snos():
     """Return next serial number for each class in one request to reduce client fetches"""
     try:
         if data_entry is None:
             return jsonify({'success': False, 'message': 'Google Sheets not configured.'}), 503
-        classes = ['ECE', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
-        result = {}
-        for cls in classes:
-            try:
-                # try cache first
-                cached = data_cache.get_class_data(cls)
-                # We don't store next_sno in cache; compute via method
-                next_sno = data_entry.get_next_class_serial_number(cls)
-            except Exception as e:
-                print(f"Error computing next SNo for {cls}: {e}")
-                next_sno = 1
-            result[cls] = next_sno
+        # Served from the shared serial counters; Sheets is only read to seed them.
+        # Cached briefly since every form load fetches it; writes drop the entry.
+        result = data_cache.get_or_load('next_snos', data_entry.get_next_class_serial_numbers)
         return jsonify({'success': True, 'next_snos': result})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -904,6 +1147,7 @@ def api_next_class_snos():
 
 @app.route('/api/consolidate_data', methods=['POST'])
 @admin_required
+@sheets_required
 def api_consolidate_data():
     """Consolidate all student data and return Excel file"""
     try:
@@ -912,6 +1156,9 @@ def api_consolidate_data():
         
         print("🔁 Starting data consolidation...")
         
+        # Imported on first use so workers don't load openpyxl at startup
+        import consolidate_data
+
         # Run consolidation
         consolidate_data.consolidate_student_data()
         
@@ -922,9 +1169,6 @@ def api_consolidate_data():
         
         print("✅ Consolidation completed successfully")
         
-        # Clear cache after consolidation
-        data_cache.clear()
-        
         # Return the file for download
         return send_file(
             output_file,
@@ -944,8 +1188,47 @@ def api_consolidate_data():
         except:
             pass
 
+@app.route('/api/bulk_import', methods=['POST'])
+@admin_required
+@sheets_required
+def api_bulk_import():
+    """Import students from an uploaded CSV or XLSX file and report per-row errors"""
+    try:
+        if data_entry is None:
+            return jsonify({'success': False, 'message': 'Google Sheets not configured.'}), 503
+
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            return jsonify({'success': False, 'message': 'No file uploaded'}), 400
+
+        print(f"📥 Bulk import from {upload.filename}...")
+        start = time.time()
+        report = import_students(data_entry, iter_upload_rows(upload.stream, upload.filename))
+        print(f"✅ Bulk import: {report['imported']} added, {report['failed']} rejected "
+              f"in {time.time() - start:.1f}s")
+
+        report['message'] = f"Imported {report['imported']} of {report['total']} rows"
+        return jsonify(report)
+
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Bulk import failed: {e}")
+        return jsonify({'success': False, 'message': f'Bulk import failed: {str(e)}'})
+
+def load_class_students(class_name):
+    """Read one class sheet and map its rows to the /api/class_data student format"""
+    sheet_name = f"Class_{class_name}"
+    
+    if not data_entry.sheet_exists(sheet_name):
+        return []
+    
+    sheet_data = data_entry.get_sheet_data(sheet_name)
+    return class_entries(sheet_name, sheet_data)
+
 @app.route('/api/class_data/<class_name>')
 @login_required
+@sheets_required
 def api_class_data(class_name):
     """API endpoint to get class student data"""
     user_access = session.get('access')
@@ -966,54 +1249,20 @@ def api_class_data(class_name):
                 'cached': True
             })
         
-        # Cache miss, fetch from Google Sheets
-        sheet_name = f"Class_{class_name}"
-        
-        if not data_entry.sheet_exists(sheet_name):
-            return jsonify({'success': True, 'students': []})
-        
-        sheet_data = data_entry.get_sheet_data(sheet_name)
-        students = []
-        
-        if not sheet_data or len(sheet_data) <= 1:  # Only headers or empty
-            return jsonify({'success': True, 'students': []})
-        
-        # Get headers from first row
-        headers = sheet_data[0] if sheet_data else []
-        header_indices = {header: idx for idx, header in enumerate(headers)}
+        # Cache miss, fetch from Google Sheets (shared by concurrent callers)
+        students, stale = data_cache.get_or_load_with_status(f'class_{class_name}', lambda: load_class_students(class_name))
         
-        # Extract student data
-        for row_idx, row_data in enumerate(sheet_data[1:], start=2):
-            if row_data and len(row_data) > 0 and row_data[0]:  # Check if S.No exists
-                # Pad row_data with empty strings if needed
-                while len(row_data) < len(headers):
-                    row_data.append('')
-                
-                student = {
-                    'sno': row_data[header_indices.get('S.No', 0)] if 'S.No' in header_indices else '',
-                    'row_number': row_idx,
-                    'class_sno': row_data[header_indices.get('Class_S.No', 0)] if 'Class_S.No' in header_indices else '',
-                    'student_name': row_data[header_indices.get('Student Name', 2)] if 'Student Name' in header_indices else '',
-                    'father_name': row_data[header_indices.get("Father's Name", 3)] if "Father's Name" in header_indices else '',
-                    'class_section': row_data[header_indices.get('Class Section', 14)] if 'Class Section' in header_indices else '',
-                    'gr_number': row_data[header_indices.get('GR#', 1)] if 'GR#' in header_indices else '',
-                    'gender': row_data[header_indices.get('Gender', 4)] if 'Gender' in header_indices else '',
-                    'religion': row_data[header_indices.get('Religion', 5)] if 'Religion' in header_indices else '',
-                    'contact_number': row_data[header_indices.get('Contact Number', 6)] if 'Contact Number' in header_indices else '',
-                    'cnic_bform': row_data[header_indices.get('CNIC / B-Form', 7)] if 'CNIC / B-Form' in header_indices else '',
-                    'date_of_birth': row_data[header_indices.get('Date of Birth', 8)] if 'Date of Birth' in header_indices else '',
-                    'guardian_name': row_data[header_indices.get('Guardian Name', 10)] if 'Guardian Name' in header_indices else '',
-                    'guardian_relation': row_data[header_indices.get('Guardian Relation', 12)] if 'Guardian Relation' in header_indices else '',
-                    'remarks': row_data[header_indices.get('Remarks', 17)] if 'Remarks' in header_indices else ''
-                }
-                students.append(student)
-        
-        return jsonify({'success': True, 'students': students})
+        return jsonify({'success': True, 'students': students, 'stale': stale})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+# Columns read by the gender list and class report endpoints (Class_S.No marks real rows)
+GENDER_VIEW_FIELDS = ['Class_S.No', 'GR#', 'Student Name', "Father's Name", 'Gender', 'Class Section', 'Remarks']
+CLASS_REPORT_FIELDS = ['Class_S.No', 'Gender', 'Class Section', 'Date of Birth']
+
 @app.route('/api/gender_data/<class_name>/<gender>')
 @login_required
+@sheets_required
 def api_gender_data(class_name, gender):
     """API endpoint to get gender-specific data for a class"""
     user_access = session.get('access')
@@ -1029,46 +1278,161 @@ def api_gender_data(class_name, gender):
         if not data_entry.sheet_exists(sheet_name):
             return jsonify({'success': True, 'students': []})
         
-        sheet_data = data_entry.get_sheet_data(sheet_name)
-        students = []
-        
-        if not sheet_data or len(sheet_data) <= 1:
-            return jsonify({'success': True, 'students': []})
-        
-        # Get headers from first row
-        headers = sheet_data[0] if sheet_data else []
-        header_indices = {header: idx for idx, header in enumerate(headers)}
-        
-        # Extract student data filtered by gender
-        for row_idx, row_data in enumerate(sheet_data[1:], start=2):
-            if row_data and len(row_data) > 0 and row_data[0]:  # Check if S.No exists
-                # Pad row_data with empty strings if needed
-                while len(row_data) < len(headers):
-                    row_data.append('')
-                
-                student_gender = row_data[header_indices.get('Gender', 4)] if 'Gender' in header_indices else ''
-                
-                # Filter by gender
-                if student_gender.strip().lower() == gender.lower():
-                    student = {
-                        'sno': row_data[header_indices.get('S.No', 0)] if 'S.No' in header_indices else '',
-                        'row_number': row_idx,
-                        'class_sno': row_data[header_indices.get('Class_S.No', 0)] if 'Class_S.No' in header_indices else '',
-                        'student_name': row_data[header_indices.get('Student Name', 2)] if 'Student Name' in header_indices else '',
-                        'father_name': row_data[header_indices.get("Father's Name", 3)] if "Father's Name" in header_indices else '',
-                        'class_section': row_data[header_indices.get('Class Section', 14)] if 'Class Section' in header_indices else '',
-                        'gr_number': row_data[header_indices.get('GR#', 1)] if 'GR#' in header_indices else '',
-                        'gender': student_gender,
-                        'remarks': row_data[header_indices.get('Remarks', 17)] if 'Remarks' in header_indices else ''
-                    }
-                    students.append(student)
+        # Fetch only the columns this view shows
+        sheet_data = data_entry.get_sheet_data(sheet_name, fields=GENDER_VIEW_FIELDS)
+        students = [student.gender_entry() for student in iter_students(sheet_name, sheet_data)
+                    if student.get('Gender').strip().lower() == gender.lower()]
         
         return jsonify({'success': True, 'students': students})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+def load_all_students():
+    """Read every class sheet and map its rows to the /api/all_students format"""
+    all_students = []
+    
+    # Define all class sheets
+    class_sheets = ['Class_ECE', 'Class_I', 'Class_II', 'Class_III', 'Class_IV', 
+                   'Class_V', 'Class_VI', 'Class_VII', 'Class_VIII', 'Class_IX', 'Class_X']
+    
+    # One batchGet covers every class sheet (missing sheets are left out)
+    values_by_sheet = data_entry.load_sheet_values(class_sheets)
+    
+    for sheet_name in class_sheets:
+        all_students.extend(all_students_entries(sheet_name, values_by_sheet.get(sheet_name),
+                                                 first_sno=len(all_students) + 1))
+    
+    return all_students
+
+def snapshot_class_students(snapshot, class_name):
+    """/api/class_data student list for one class, from a school snapshot"""
+    sheet = snapshot.get(class_name) or {'headers': [], 'rows': []}
+    return class_entries(f'Class_{class_name}', sheet['rows'], headers=sheet['headers'])
+
+def snapshot_all_students(snapshot):
+    """/api/all_students list, from a school snapshot"""
+    all_students = []
+    for class_name in CLASS_NAMES:
+        sheet = snapshot.get(class_name) or {'headers': [], 'rows': []}
+        all_students.extend(all_students_entries(f'Class_{class_name}', sheet['rows'], headers=sheet['headers'],
+                                                 first_sno=len(all_students) + 1))
+    return all_students
+
+def _event_row(headers, values):
+    """Change event values laid out in a sheet's column order"""
+    return [str(values.get(header, '') or '') for header in headers]
+
+def _patch_snapshot(events):
+    """Cache patch for the school snapshot; also fills in the old rows of updates and deletes"""
+    def patch(snapshot):
+        snapshot = dict(snapshot)
+        copied = set()
+        for event in events:
+            sheet = snapshot.get(event.class_name)
+            if sheet is None:
+                continue
+            if event.class_name not in copied:
+                sheet = snapshot[event.class_name] = {'headers': sheet['headers'], 'rows': list(sheet['rows'])}
+                copied.add(event.class_name)
+            headers, rows = sheet['headers'], sheet['rows']
+
+            if event.kind == ADDED:
+                # Unknown row (never guessed from our copy), or our copy is behind the sheet
+                if event.row_number is None or event.row_number != len(rows) + 2:
+                    return None
+                rows.append(_event_row(headers, event.values))
+                continue
+
+            index = event.row_number - 2
+            if not 0 <= index < len(rows):
+                return None
+            if event.old_values is None:
+                event.old_values = dict(zip(headers, rows[index]))
+            if event.kind == DELETED:
+                del rows[index]
+            else:
+                rows[index] = _event_row(headers, event.values)
+        return snapshot
+    return patch
+
+def _patch_students(events, class_name=None):
+    """Cache patch for one class's /api/class_data list, or for /api/all_students when class_name is None"""
+    def patch(students):
+        students = list(students)
+        for event in events:
+            if class_name is not None and event.class_name != class_name:
+                continue
+            if event.row_number is None:
+                return None  # Appended row couldn't be placed
+
+            def same_sheet(student):
+                return class_name is not None or student.get('sheet_name') == event.sheet_name
+
+            if event.kind != ADDED:
+                kept = []
+                for student in students:
+                    if same_sheet(student):
+                        if student['row_number'] == event.row_number:
+                            if event.old_values is None:
+                                event.old_values = {'Class_S.No': student.get('class_sno', ''),
+                                                    'Gender': student.get('gender', ''),
+                                                    'Class Section': student.get('class_section', ''),
+                                                    'Date of Birth': student.get('date_of_birth', '')}
+                            continue
+                        if event.kind == DELETED and student['row_number'] > event.row_number:
+                            student = dict(student, row_number=student['row_number'] - 1)
+                    kept.append(student)
+                students = kept
+
+            # Rows without a Class_S.No aren't listed, same as the loaders
+            if event.kind != DELETED and event.values.get('Class_S.No'):
+                headers = list(event.values)
+                student = Student(event.sheet_name, event.row_number, _event_row(headers, event.values),
+                                  header_index(headers))
+                students.append(student.class_entry() if class_name is not None else student.all_students_entry(0))
+
+        if class_name is not None:
+            students.sort(key=lambda student: student['row_number'])
+            return students
+
+        sheet_order = {f'Class_{c}': idx for idx, c in enumerate(CLASS_NAMES)}
+        students.sort(key=lambda student: (sheet_order.get(student['sheet_name'], len(sheet_order)),
+                                           student['row_number']))
+        return [student if student['sno'] == sno else dict(student, sno=sno)
+                for sno, student in enumerate(students, start=1)]
+    return patch
+
+def _patch_aggregates(events):
+    """Cache patch for the per-class counts; yesterday's are dropped so the age bands are rebuilt"""
+    def patch(aggregates):
+        if not is_current(aggregates):
+            return None
+        return apply_events(aggregates, events)
+    return patch
+
+def apply_student_changes(events):
+    """Patch the cached snapshot, rosters and counts with write events instead of clearing them.
+
+    The snapshot goes first because it supplies the old rows the other
+    patches need; anything that can't be patched is dropped and reloaded.
+    """
+    events = [event for event in events if event.class_name in CLASS_NAMES]
+    if not events:
+        return
+    classes = sorted({event.class_name for event in events})
+    data_cache.patch(
+        [('school_snapshot', _patch_snapshot(events))]
+        + [(f'class_{class_name}', _patch_students(events, class_name)) for class_name in classes]
+        + [('all_students', _patch_students(events)), ('class_aggregates', _patch_aggregates(events))]
+        # Derived from the aggregates again on the next read
+        + [('class_wise_data', lambda result: None), ('next_snos', lambda numbers: None)]
+    )
+    if cache_snapshot is not None:
+        cache_snapshot.save_later(snapshot_entries)
+
 @app.route('/api/all_students')
 @admin_required
+@sheets_required
 def api_all_students():
     """API endpoint to get all students data for admin"""
     try:
@@ -1082,60 +1446,15 @@ def api_all_students():
                 'cached': True
             })
         
-        # Cache miss, fetch from Google Sheets
-        all_students = []
-        sno_counter = 1
-        
-        # Define all class sheets
-        class_sheets = ['Class_ECE', 'Class_I', 'Class_II', 'Class_III', 'Class_IV', 
-                       'Class_V', 'Class_VI', 'Class_VII', 'Class_VIII', 'Class_IX', 'Class_X']
-        
-        for sheet_name in class_sheets:
-            if data_entry.sheet_exists(sheet_name):
-                sheet_data = data_entry.get_sheet_data(sheet_name)
-                if not sheet_data or len(sheet_data) <= 1:
-                    continue
-                    
-                headers = sheet_data[0] if sheet_data else []
-                header_indices = {header: idx for idx, header in enumerate(headers)}
-                
-                # Extract student data
-                for row_idx, row_data in enumerate(sheet_data[1:], start=2):
-                    if row_data and len(row_data) > 0 and row_data[0]:  # Check if S.No exists
-                        # Pad row_data with empty strings if needed
-                        while len(row_data) < len(headers):
-                            row_data.append('')
-                        
-                        student = {
-                            'sno': sno_counter,
-                            'sheet_name': sheet_name,
-                            'row_number': row_idx,
-                            'class_sno': row_data[header_indices.get('Class_S.No', 0)] if len(row_data) > header_indices.get('Class_S.No', 0) else '',
-                            'student_name': row_data[header_indices.get('Student Name', 2)] if len(row_data) > header_indices.get('Student Name', 2) else '',
-                            'father_name': row_data[header_indices.get("Father's Name", 3)] if len(row_data) > header_indices.get("Father's Name", 3) else '',
-                            'gr_number': row_data[header_indices.get('GR#', 1)] if len(row_data) > header_indices.get('GR#', 1) else '',
-                            'student_class': sheet_name.replace('Class_', ''),
-                            'class_section': row_data[header_indices.get('Class Section', 14)] if len(row_data) > header_indices.get('Class Section', 14) else '',
-                            'contact_number': row_data[header_indices.get('Contact Number', 6)] if len(row_data) > header_indices.get('Contact Number', 6) else '',
-                            'gender': row_data[header_indices.get('Gender', 4)] if len(row_data) > header_indices.get('Gender', 4) else '',
-                            'religion': row_data[header_indices.get('Religion', 5)] if len(row_data) > header_indices.get('Religion', 5) else '',
-                            'cnic_bform': row_data[header_indices.get('CNIC / B-Form', 7)] if len(row_data) > header_indices.get('CNIC / B-Form', 7) else '',
-                            'date_of_birth': row_data[header_indices.get('Date of Birth', 8)] if len(row_data) > header_indices.get('Date of Birth', 8) else '',
-                            'guardian_name': row_data[header_indices.get('Guardian Name', 10)] if len(row_data) > header_indices.get('Guardian Name', 10) else '',
-                            'guardian_relation': row_data[header_indices.get('Guardian Relation', 12)] if len(row_data) > header_indices.get('Guardian Relation', 12) else '',
-                            'remarks': row_data[header_indices.get('Remarks', 17)] if len(row_data) > header_indices.get('Remarks', 17) else ''
-                        }
-                        all_students.append(student)
-                        sno_counter += 1
-        
-        # Cache the result
-        data_cache.set_all_data(all_students)
+        # Cache miss, fetch from Google Sheets (shared by concurrent callers)
+        all_students, stale = data_cache.get_or_load_with_status('all_students', load_all_students)
         
         return jsonify({
             'success': True,
             'students': all_students,
             'total_count': len(all_students),
-            'cached': False
+            'cached': stale,
+            'stale': stale
         })
         
     except Exception as e:
@@ -1146,6 +1465,7 @@ def api_all_students():
 
 @app.route('/api/student_details/<sheet_name>/<int:row_number>')
 @login_required
+@sheets_required
 def api_student_details(sheet_name, row_number):
     """API endpoint to get student details"""
     try:
@@ -1157,29 +1477,17 @@ def api_student_details(sheet_name, row_number):
         if data_entry is None:
             return jsonify({'success': False, 'message': 'Google Sheets not configured.'}), 503
             
-        sheet_data = data_entry.get_sheet_data(sheet_name)
-        if not sheet_data or len(sheet_data) < row_number:
+        student = student_at(sheet_name, data_entry.get_sheet_data(sheet_name), row_number)
+        if student is None:
             return jsonify({'success': False, 'message': 'Student not found'})
         
-        # Get headers and student data
-        headers = sheet_data[0]
-        student_row = sheet_data[row_number - 1]  # Convert to 0-indexed
-        
-        # Pad student row if needed
-        while len(student_row) < len(headers):
-            student_row.append('')
-        
-        # Create student dictionary
-        student = {}
-        for i, header in enumerate(headers):
-            student[header] = student_row[i] if i < len(student_row) else ''
-        
-        return jsonify({'success': True, 'student': student})
+        return jsonify({'success': True, 'student': student.as_dict()})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/api/teacher_student_details/<sheet_name>/<int:row_number>')
 @login_required
+@sheets_required
 def api_teacher_student_details(sheet_name, row_number):
     """API endpoint to get student details for teachers"""
     try:
@@ -1191,29 +1499,17 @@ def api_teacher_student_details(sheet_name, row_number):
         if data_entry is None:
             return jsonify({'success': False, 'message': 'Google Sheets not configured.'}), 503
             
-        sheet_data = data_entry.get_sheet_data(sheet_name)
-        if not sheet_data or len(sheet_data) < row_number:
+        student = student_at(sheet_name, data_entry.get_sheet_data(sheet_name), row_number)
+        if student is None:
             return jsonify({'success': False, 'message': 'Student not found'})
         
-        # Get headers and student data
-        headers = sheet_data[0]
-        student_row = sheet_data[row_number - 1]  # Convert to 0-indexed
-        
-        # Pad student row if needed
-        while len(student_row) < len(headers):
-            student_row.append('')
-        
-        # Create student dictionary
-        student = {}
-        for i, header in enumerate(headers):
-            student[header] = student_row[i] if i < len(student_row) else ''
-        
-        return jsonify({'success': True, 'student': student})
+        return jsonify({'success': True, 'student': student.as_dict()})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/api/edit_student/<sheet_name>/<int:row_number>', methods=['POST'])
 @login_required
+@sheets_required
 def api_edit_student(sheet_name, row_number):
     """API endpoint to edit a student"""
     try:
@@ -1229,8 +1525,6 @@ def api_edit_student(sheet_name, row_number):
         result = data_entry.update_student_record(sheet_name, row_number, student_data)
         
         if result:
-            # Clear cache after update
-            data_cache.clear()
             return jsonify({
                 'success': True,
                 'message': 'Student updated successfully'
@@ -1248,13 +1542,12 @@ def api_edit_student(sheet_name, row_number):
 
 @app.route('/api/delete_student/<sheet_name>/<int:row_number>', methods=['DELETE'])
 @admin_required
+@sheets_required
 def api_delete_student(sheet_name, row_number):
     """API endpoint to delete a student"""
     try:
         result = data_entry.delete_student_record(sheet_name, row_number)
         if result:
-            # Clear cache after successful deletion
-            data_cache.clear()
             return jsonify({
                 'success': True,
                 'message': 'Student deleted successfully'
@@ -1270,8 +1563,98 @@ def api_delete_student(sheet_name, row_number):
             'message': f'Error deleting student: {str(e)}'
         })
 
+def _row_locations(items):
+    """(sheet_name, row_number) pairs from [{'sheet': ..., 'row': ...}] or [[sheet, row]] JSON"""
+    locations = []
+    for item in items:
+        if isinstance(item, dict):
+            locations.append((str(item['sheet']), int(item['row'])))
+        else:
+            locations.append((str(item[0]), int(item[1])))
+    return locations
+
+@app.route('/api/students', methods=['PATCH'])
+@login_required
+@sheets_required
+def api_update_students():
+    """API endpoint to edit several students with one batched write"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        items = payload.get('updates') or []
+        if not items:
+            return jsonify({'success': False, 'message': 'No updates given'}), 400
+        updates = [(sheet_name, row_number, item.get('data') or {})
+                   for (sheet_name, row_number), item in zip(_row_locations(items), items)]
+
+        # Validate access
+        user_access = session.get('access')
+        for sheet_name, _, _ in updates:
+            if user_access != 'all' and user_access != sheet_name.replace('Class_', ''):
+                return jsonify({'success': False, 'message': 'Access denied'})
+
+        if data_entry.update_student_records(updates):
+            return jsonify({
+                'success': True,
+                'message': f'{len(updates)} student(s) updated successfully'
+            })
+        return jsonify({
+            'success': False,
+            'message': 'Failed to update students'
+        })
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid request: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error updating students: {str(e)}'
+        })
+
+@app.route('/api/students', methods=['DELETE'])
+@admin_required
+@sheets_required
+def api_delete_students():
+    """API endpoint to delete several students with one batched write.
+
+    Row numbers refer to the sheets as last loaded; rows below a deleted row
+    move up, so clients should reload before deleting again.
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        locations = _row_locations(payload.get('rows') or [])
+        if not locations:
+            return jsonify({'success': False, 'message': 'No rows given'}), 400
+
+        deleted = data_entry.delete_student_records(locations)
+        if deleted is None:
+            return jsonify({
+                'success': False,
+                'message': 'Failed to delete students'
+            })
+
+        # Count what was actually deleted, including the mirrored main sheet rows
+        class_rows = sum(1 for sheet_name, _ in deleted if is_class_sheet(sheet_name))
+        other_rows = len(deleted) - class_rows
+        message = f'{class_rows or other_rows} student(s) deleted successfully'
+        if class_rows and other_rows:
+            message += f' ({other_rows} main sheet row(s) removed with them)'
+        elif class_rows:
+            message += ' (no matching main sheet rows found)'
+        return jsonify({
+            'success': True,
+            'message': message,
+            'deleted': [{'sheet': sheet_name, 'row': row_number} for sheet_name, row_number in deleted]
+        })
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid request: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error deleting students: {str(e)}'
+        })
+
 @app.route('/api/class_report_data/<class_name>')
 @login_required
+@sheets_required
 def api_class_report_data(class_name):
     """API endpoint to get class report data for analytics"""
     user_access = session.get('access')
@@ -1281,101 +1664,33 @@ def api_class_report_data(class_name):
         return jsonify({'success': False, 'message': 'Access denied'})
     
     try:
+        # Standard classes are counted once and kept current by write events
+        if class_name in CLASS_NAMES:
+            return jsonify(report_payload(get_class_aggregates()['classes'][class_name]))
+
         sheet_name = f"Class_{class_name}"
         
         if not data_entry.sheet_exists(sheet_name):
-            return jsonify({
-                'success': True,
-                'gender_data': {'Male': 0, 'Female': 0},
-                'section_data': {},
-                'age_data': {},
-                'total_students': 0
-            })
-        
-        sheet_data = data_entry.get_sheet_data(sheet_name)
-        
-        if not sheet_data or len(sheet_data) <= 1:
-            return jsonify({
-                'success': True,
-                'gender_data': {'Male': 0, 'Female': 0},
-                'section_data': {},
-                'age_data': {},
-                'total_students': 0
-            })
-        
-        # Get headers from first row
-        headers = sheet_data[0] if sheet_data else []
-        header_indices = {header: idx for idx, header in enumerate(headers)}
-        
-        # Initialize counters
-        gender_data = {'Male': 0, 'Female': 0}
-        section_data = {}
-        age_data = {}
-        total_students = 0
+            return jsonify(report_payload(count_sheet(class_name, [], [])))
         
-        # Process each student row
-        for row_data in sheet_data[1:]:
-            if row_data and len(row_data) > 0 and row_data[0]:  # Check if S.No exists
-                # Pad row_data with empty strings if needed
-                while len(row_data) < len(headers):
-                    row_data.append('')
-                
-                total_students += 1
-                
-                # Count gender
-                gender = row_data[header_indices.get('Gender', 4)] if 'Gender' in header_indices else ''
-                if gender.strip().lower() in ['male', 'boy']:
-                    gender_data['Male'] += 1
-                elif gender.strip().lower() in ['female', 'girl']:
-                    gender_data['Female'] += 1
-                
-                # Count sections
-                section = row_data[header_indices.get('Class Section', 14)] if 'Class Section' in header_indices else ''
-                if section.strip():
-                    section_data[section.strip()] = section_data.get(section.strip(), 0) + 1
-                
-                # Count ages (calculate from date of birth)
-                dob = row_data[header_indices.get('Date of Birth', 8)] if 'Date of Birth' in header_indices else ''
-                if dob.strip():
-                    try:
-                        # Try to parse date and calculate age
-                        from datetime import datetime
-                        # Handle different date formats
-                        for date_format in ['%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%m/%d/%Y']:
-                            try:
-                                birth_date = datetime.strptime(dob.strip(), date_format)
-                                age = datetime.now().year - birth_date.year
-                                if datetime.now().month < birth_date.month or (datetime.now().month == birth_date.month and datetime.now().day < birth_date.day):
-                                    age -= 1
-                                
-                                # Group ages into ranges
-                                if age <= 5:
-                                    age_group = '0-5'
-                                elif age <= 10:
-                                    age_group = '6-10'
-                                elif age <= 15:
-                                    age_group = '11-15'
-                                else:
-                                    age_group = '16+'
-                                
-                                age_data[age_group] = age_data.get(age_group, 0) + 1
-                                break
-                            except ValueError:
-                                continue
-                    except Exception:
-                        pass  # Skip invalid dates
-        
-        return jsonify({
-            'success': True,
-            'gender_data': gender_data,
-            'section_data': section_data,
-            'age_data': age_data,
-            'total_students': total_students
-        })
+        # Fetch only the columns the report aggregates
+        sheet_data = data_entry.get_sheet_data(sheet_name, fields=CLASS_REPORT_FIELDS)
+        headers, rows = (sheet_data[0], sheet_data[1:]) if sheet_data else ([], [])
+        return jsonify(report_payload(count_sheet(class_name, headers, rows)))
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/cache_stats')
+@admin_required
+def api_cache_stats():
+    """Hit/miss/eviction counters and memory use of this worker's cache, per key family"""
+    stats = data_cache.stats_snapshot()
+    stats['refresher'] = cache_refresher.status()
+    if request.args.get('reset'):
+        data_cache.stats.reset()
+    return jsonify({'success': True, 'cache': stats})
+
 @app.route('/api/refresh_cache', methods=['POST'])
 @admin_required
 def api_refresh_cache():
@@ -1394,6 +1709,7 @@ def api_refresh_cache():
 
 @app.route('/student_details')
 @login_required
+@sheets_page_required
 def student_details():
     """Student details page"""
     sheet_name = request.args.get('sheet')
@@ -1405,25 +1721,14 @@ def student_details():
     
     try:
         row_number = int(row_number)
-        sheet_data = data_entry.get_sheet_data(sheet_name)
+        student = student_at(sheet_name, data_entry.get_sheet_data(sheet_name), row_number)
         
-        if not sheet_data or len(sheet_data) < row_number:
+        if student is None:
             flash('Student not found', 'error')
             return redirect(url_for('dashboard'))
         
-        # Get headers and student data
-        headers = sheet_data[0]
-        student_row = sheet_data[row_number - 1]  # Convert to 0-indexed
-        
-        # Pad student row if needed
-        while len(student_row) < len(headers):
-            student_row.append('')
-        
-        # Create student dictionary
-        student_data = dict(zip(headers, student_row))
-        
         return render_template('student_details.html', 
-                             student=student_data, 
+                             student=student.as_dict(), 
                              sheet_name=sheet_name, 
                              row_number=row_number)
     except Exception as e:
@@ -1440,29 +1745,30 @@ def health():
     """
     return jsonify({'success': True, 'status': 'ok'}), 200
 
+@app.route('/ready')
+def ready():
+    """Readiness probe: 200 once this worker has a Google Sheets connection, 503 until then.
+
+    Like /health it makes no Sheets calls; it only reports the supervisor's state.
+    """
+    if not sheets_config.get('spreadsheet_id'):
+        return jsonify({'success': False, 'ready': False, 'state': 'not_configured'}), 503
+    status = sheets_supervisor.status()
+    return jsonify(dict(status, success=status['ready'])), 200 if status['ready'] else 503
+
 @app.route('/print_student/<sheet_name>/<int:row_number>')
 @login_required
+@sheets_page_required
 def print_student(sheet_name, row_number):
     """Print student details in A4 format"""
     try:
-        sheet_data = data_entry.get_sheet_data(sheet_name)
+        student = student_at(sheet_name, data_entry.get_sheet_data(sheet_name), row_number)
         
-        if not sheet_data or len(sheet_data) < row_number:
+        if student is None:
             return jsonify({'success': False, 'message': 'Student not found'})
         
-        # Get headers and student data
-        headers = sheet_data[0]
-        student_row = sheet_data[row_number - 1]  # Convert to 0-indexed
-        
-        # Pad student row if needed
-        while len(student_row) < len(headers):
-            student_row.append('')
-        
-        # Create student dictionary
-        student_data = dict(zip(headers, student_row))
-        
         return render_template('print_student.html', 
-                             student=student_data, 
+                             student=student.as_dict(), 
                              sheet_name=sheet_name, 
                              row_number=row_number)
     except Exception as e:
@@ -1470,6 +1776,7 @@ def print_student(sheet_name, row_number):
 
 @app.route('/teacher_student_details')
 @login_required
+@sheets_page_required
 def teacher_student_details():
     """Teacher student details page"""
     sheet_name = request.args.get('sheet')
@@ -1481,31 +1788,22 @@ def teacher_student_details():
     
     try:
         row_number = int(row_number)
-        sheet_data = data_entry.get_sheet_data(sheet_name)
+        student = student_at(sheet_name, data_entry.get_sheet_data(sheet_name), row_number)
         
-        if not sheet_data or len(sheet_data) < row_number:
+        if student is None:
             flash('Student not found', 'error')
             return redirect(url_for('dashboard'))
         
-        # Get headers and student data
-        headers = sheet_data[0]
-        student_row = sheet_data[row_number - 1]  # Convert to 0-indexed
-        
-        # Pad student row if needed
-        while len(student_row) < len(headers):
-            student_row.append('')
-        
-        # Create student dictionary
-        student_data = dict(zip(headers, student_row))
-        
         return render_template('teacher_student_details.html', 
-                             student=student_data, 
+                             student=student.as_dict(), 
                              sheet_name=sheet_name, 
                              row_number=row_number)
     except Exception as e:
         flash(f'Error loading student details: {str(e)}', 'error')
         return redirect(url_for('dashboard'))
 
+print(f"⏱️ web_app imported in {time.perf_counter() - _import_started:.2f}s (pid {os.getpid()})")
+
 if __name__ == '__main__':
     # Create templates directory if it doesn't exist
     if not os.path.exists('templates'):